@@ -0,0 +1,212 @@
+"""
+The ACA-Py agents the ID Manager issues and verifies with, configured in
+``settings.ACA_PY_AGENTS``:
+
+    ACA_PY_AGENTS = {
+        "default": {"urls": ["https://agent-1:4001"], "transport_url": "https://agent-1:8100"},
+        "eu": {
+            "urls": ["https://agent-eu-a:4001", "https://agent-eu-b:4001"],
+            "transport_url": "https://agent-eu:8100",
+            "token": "...",
+        },
+    }
+    ACA_PY_AGENT_ROUTES = {"UNHCR": "eu"}
+
+Organizations are routed to their agent by ``ACA_PY_AGENT_ROUTES`` (by name), all the others
+to "default". An agent's connections, credential definitions and revocation registries live in
+its wallet, so everything of an organization stays on its agent. The ``urls`` of an agent are
+instances of it sharing that wallet: requests go to the first one available, and fail over to
+the next one when it cannot be reached. An instance that failed is skipped for
+``ACA_PY_AGENT_RETRY_AFTER`` seconds. ``manage.py check_aca_py_agents`` checks all of them.
+
+Without ``ACA_PY_AGENTS``, "default" is ``ACA_PY_URL``/``ACA_PY_TRANSPORT_URL``.
+"""
+import asyncio
+import threading
+import time
+import weakref
+from typing import Dict, List, Optional
+
+import requests
+import structlog as logging
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from urllib3.exceptions import ConnectTimeoutError
+
+from aca.client import ACAClient
+from id_manager import metrics
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_AGENT = "default"
+
+INSTANCE_UP = metrics.gauge(
+    "acapy_agent_instance_up", "Whether an ACA-Py instance is in use (1) or skipped (0)", ("url",)
+)
+FAILOVERS = metrics.counter(
+    "acapy_agent_failovers_total", "Requests sent to another instance of an agent", ("agent",)
+)
+
+
+def _not_sent(error: requests.ConnectionError) -> bool:
+    """Whether the request never reached the instance, so any other one can take it."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, ConnectTimeoutError)  # NewConnectionError included
+
+
+class FailoverSession(requests.Session):
+    """
+    A session sending the requests made for the first instance of ``agent`` to the first
+    instance available instead, then to the next ones while they cannot be connected to.
+    """
+
+    def __init__(self, agent: "Agent"):
+        super().__init__()
+        self.agent = agent
+
+    def request(self, method, url, *args, **kwargs):
+        primary = self.agent.urls[0]
+        if not url.startswith(primary):
+            return super().request(method, url, *args, **kwargs)
+        path = url[len(primary) :]
+        instances = self.agent.instances()
+        for attempt, instance in enumerate(instances):
+            try:
+                response = super().request(method, instance + path, *args, **kwargs)
+            except requests.ConnectionError as error:
+                self.agent.failed(instance, error)
+                if not _not_sent(error) or attempt == len(instances) - 1:
+                    raise
+                FAILOVERS.inc(agent=self.agent.name)
+                continue
+            self.agent.recovered(instance)
+            return response
+
+
+class Agent:
+    def __init__(self, name: str, urls: List[str], transport_url: str, token: str = None):
+        if not urls:
+            raise ImproperlyConfigured(f"ACA_PY_AGENTS: no urls for the agent '{name}'")
+        self.name = name
+        self.urls = [url.rstrip("/") for url in urls]
+        self.transport_url = transport_url
+        self.token = token
+        self._failed_at: Dict[str, float] = {}
+        self._local = threading.local()
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    def __repr__(self):
+        return f"Agent({self.name})"
+
+    def instances(self) -> List[str]:
+        """The instances in the order to try them: the available ones, then the others."""
+        retry_before = time.monotonic() - settings.ACA_PY_AGENT_RETRY_AFTER
+        available = [url for url in self.urls if self._failed_at.get(url, 0) <= retry_before]
+        return available + [url for url in self.urls if url not in available]
+
+    def failed(self, url: str, error: Exception):
+        if url not in self._failed_at:
+            LOGGER.warning(f"aca-py agent: {self.name}: {url} skipped - {error}")
+        self._failed_at[url] = time.monotonic()
+        INSTANCE_UP.set(0, url=url)
+
+    def recovered(self, url: str):
+        if self._failed_at.pop(url, None) is not None:
+            LOGGER.info(f"aca-py agent: {self.name}: {url} back in use")
+        INSTANCE_UP.set(1, url=url)
+
+    def client(self) -> ACAClient:
+        """The client of the agent for this thread, keeping its connections alive."""
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = ACAClient(
+                self.urls[0],
+                self.transport_url,
+                self.token,
+                session=FailoverSession(self),
+                name=self.name,
+            )
+            self._local.client = client
+        return client
+
+    def async_client(self):
+        """The ``AsyncACAClient`` of the agent for the running event loop."""
+        from aca.async_client import AsyncACAClient
+
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = AsyncACAClient(self)
+        return client
+
+    def check_health(self, timeout: float = 5) -> Dict[str, bool]:
+        """Ask each instance whether it is ready (``/status/ready``), by url."""
+        headers = {"X-API-Key": self.token} if self.token else {}
+        health = {}
+        for url in self.urls:
+            try:
+                response = requests.get(f"{url}/status/ready", headers=headers, timeout=timeout)
+                response.raise_for_status()
+                ready = bool(response.json().get("ready"))
+                error = "not ready"
+            except (requests.RequestException, ValueError) as e:
+                ready, error = False, e
+            if ready:
+                self.recovered(url)
+            else:
+                self.failed(url, error)
+            health[url] = ready
+        return health
+
+
+_agents: Optional[Dict[str, Agent]] = None
+_lock = threading.Lock()
+
+
+def agents() -> Dict[str, Agent]:
+    global _agents
+    if _agents is None:
+        with _lock:
+            if _agents is None:
+                _agents = _load()
+    return _agents
+
+
+def _load() -> Dict[str, Agent]:
+    token = getattr(settings, "ACA_PY_AUTH_TOKEN", None) or None
+    config = getattr(settings, "ACA_PY_AGENTS", None) or {
+        DEFAULT_AGENT: {
+            "urls": [settings.ACA_PY_URL],
+            "transport_url": settings.ACA_PY_TRANSPORT_URL,
+        }
+    }
+    if DEFAULT_AGENT not in config:
+        raise ImproperlyConfigured(f"ACA_PY_AGENTS: no '{DEFAULT_AGENT}' agent")
+    return {
+        name: Agent(name, agent["urls"], agent["transport_url"], agent.get("token", token))
+        for name, agent in config.items()
+    }
+
+
+def get_agent(name: Optional[str] = None) -> Agent:
+    try:
+        return agents()[name or DEFAULT_AGENT]
+    except KeyError:
+        raise ImproperlyConfigured(f"ACA_PY_AGENTS: no agent '{name}'")
+
+
+def agent_for(organization=None) -> Agent:
+    """The agent serving ``organization`` (an ``Organization``, its name or None)."""
+    name = getattr(organization, "name", organization)
+    return get_agent(settings.ACA_PY_AGENT_ROUTES.get(name, DEFAULT_AGENT))
+
+
+@receiver(setting_changed)
+def _reset(setting, **kwargs):
+    global _agents
+    if setting.startswith("ACA_PY_"):
+        _agents = None
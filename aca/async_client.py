@@ -0,0 +1,71 @@
+"""
+The ACA-Py calls of the async views (see ``manager.async_views``), over an ``httpx``
+connection pool shared by the requests in flight of a process.
+
+Like ``ACAClient`` behind ``aca.agents.FailoverSession``, a request goes to the first
+instance of the agent available and to the next ones while they cannot be connected to.
+Errors are raised as the ``requests`` exceptions the rest of the code handles.
+"""
+import httpx
+import requests
+
+from aca.agents import FAILOVERS
+from aca.resilience import guarded, timeout
+
+
+class AsyncACAClient:
+    def __init__(self, agent, client: httpx.AsyncClient = None):
+        self.agent = agent
+        self.name = agent.name
+        self.url = agent.urls[0]
+        self.transport_url = agent.transport_url
+
+        headers = {"accept": "application/json", "Content-Type": "application/json"}
+        if agent.token:
+            headers.update({"X-API-Key": f"{agent.token}"})
+        self.client = client or httpx.AsyncClient(
+            headers=headers,
+            limits=httpx.Limits(max_connections=None, max_keepalive_connections=100),
+        )
+
+    def get_endpoint_url(self):
+        return self.transport_url
+
+    async def _request(self, method: str, path: str, **kwargs) -> dict:
+        connect, read = timeout()
+        instances = self.agent.instances()
+        for attempt, instance in enumerate(instances):
+            try:
+                response = await self.client.request(
+                    method, instance + path, timeout=httpx.Timeout(read, connect=connect), **kwargs
+                )
+            except (httpx.ConnectError, httpx.ConnectTimeout) as error:
+                # not sent: any other instance can take it
+                self.agent.failed(instance, error)
+                if attempt == len(instances) - 1:
+                    raise requests.ConnectTimeout(str(error)) from error
+                FAILOVERS.inc(agent=self.name)
+                continue
+            except httpx.TimeoutException as error:
+                raise requests.ReadTimeout(str(error)) from error
+            except httpx.TransportError as error:
+                raise requests.ConnectionError(str(error)) from error
+            self.agent.recovered(instance)
+            if response.is_error:
+                # what the handlers of requests' HTTPError read: status_code and text
+                raise requests.HTTPError(
+                    f"{response.status_code} Error for url: {response.url}", response=response
+                )
+            return response.json()
+
+    @guarded
+    async def create_connection_invitation(self) -> dict:
+        return await self._request("POST", "/connections/create-invitation")
+
+    @guarded
+    async def send_credential_offer(self, credential: dict, connection_id: str) -> dict:
+        credential.update({"connection_id": connection_id})
+        return await self._request("POST", "/issue-credential/send-offer", json=credential)
+
+    async def aclose(self):
+        await self.client.aclose()
@@ -1,10 +1,20 @@
 import requests
-from django.conf import settings
+
+from aca.resilience import guarded, timeout
 
 
 class ACAClient:
-    def __init__(self, url: str, transport_url: str, token: str = None) -> None:
+    def __init__(
+        self,
+        url: str,
+        transport_url: str,
+        token: str = None,
+        session: requests.Session = None,
+        name: str = None,
+    ) -> None:
         self.url = url
+        # the agent, for the circuit breaker and bulkheads (see aca.resilience)
+        self.name = name or url
         self.transport_url = transport_url
         self.token = token
 
@@ -12,81 +22,120 @@ class ACAClient:
         if self.token:
             headers.update({"X-API-Key": f"{self.token}"})
 
-        self.session = requests.Session()
+        self.session = session or requests.Session()
         self.session.headers.update(headers)
 
     def get_endpoint_url(self):
         return self.transport_url
 
+    @guarded
     def create_proof_request(self, presentation_request: dict) -> dict:
         response = self.session.post(
-            f"{self.url}/present-proof/create-request", json=presentation_request
+            f"{self.url}/present-proof/create-request", json=presentation_request, timeout=timeout()
         )
         response.raise_for_status()
         return response.json()
 
+    @guarded
     def get_public_did(self) -> dict:
-        response = self.session.get(f"{self.url}/wallet/did/public")
+        response = self.session.get(f"{self.url}/wallet/did/public", timeout=timeout())
         response.raise_for_status()
         return response.json()["result"]
 
+    @guarded
     def get_credential_definition(self, cred_def_id: str) -> dict:
-        response = self.session.get(f"{self.url}/credential-definitions/{cred_def_id}")
+        response = self.session.get(
+            f"{self.url}/credential-definitions/{cred_def_id}", timeout=timeout()
+        )
         response.raise_for_status()
         return response.json()["credential_definition"]
 
+    @guarded
     def create_credential_definition(self, cred_def_data: dict) -> dict:
-        response = self.session.post(f"{self.url}/credential-definitions", json=cred_def_data)
+        response = self.session.post(
+            f"{self.url}/credential-definitions", json=cred_def_data, timeout=timeout()
+        )
         response.raise_for_status()
         return response.json()
 
+    @guarded
     def get_schema(self, schema_id: str) -> dict:
-        response = self.session.get(f"{self.url}/schemas/{schema_id}")
+        response = self.session.get(f"{self.url}/schemas/{schema_id}", timeout=timeout())
         response.raise_for_status()
         return response.json()["schema_json"]
 
+    @guarded
     def create_schema(self, schema_data: dict) -> dict:
-        response = self.session.post(f"{self.url}/schemas", json=schema_data)
+        response = self.session.post(f"{self.url}/schemas", json=schema_data, timeout=timeout())
         response.raise_for_status()
         return response.json()
 
+    @guarded
     def create_connection_invitation(self) -> dict:
-        response = self.session.post(f"{self.url}/connections/create-invitation")
+        response = self.session.post(f"{self.url}/connections/create-invitation", timeout=timeout())
         response.raise_for_status()
         return response.json()
 
+    @guarded
     def send_credential_offer(self, credential: dict, connection_id: str) -> dict:
         credential.update({"connection_id": connection_id})
-        response = self.session.post(f"{self.url}/issue-credential/send-offer", json=credential)
+        response = self.session.post(
+            f"{self.url}/issue-credential/send-offer", json=credential, timeout=timeout()
+        )
         response.raise_for_status()
         return response.json()
 
+    @guarded
     def retrieve_issue_credential_by_cred_ex_id(self, cred_ex_id: str) -> dict:
-        response = self.session.get(f"{self.url}/issue-credential/records/{cred_ex_id}")
+        response = self.session.get(
+            f"{self.url}/issue-credential/records/{cred_ex_id}", timeout=timeout()
+        )
         response.raise_for_status()
         return response.json()
 
+    @guarded
+    def list_issue_credential_records(self, **params) -> [dict]:
+        """``params``: role, state, connection_id, thread_id and, on recent ACA-Py, limit/offset"""
+        response = self.session.get(
+            f"{self.url}/issue-credential/records", params=params, timeout=timeout()
+        )
+        response.raise_for_status()
+        return response.json()["results"]
+
+    @guarded
     def send_revocation_revoke(self, credential: dict) -> dict:
-        response = self.session.post(f"{self.url}/revocation/revoke", json=credential)
+        response = self.session.post(
+            f"{self.url}/revocation/revoke", json=credential, timeout=timeout()
+        )
         response.raise_for_status()
         return response.json()
 
+    @guarded
     def out_of_band_receive_invitation(self, invitation: dict) -> dict:
-        response = self.session.post(f"{self.url}/out-of-band/receive-invitation", json=invitation)
+        response = self.session.post(
+            f"{self.url}/out-of-band/receive-invitation", json=invitation, timeout=timeout()
+        )
         response.raise_for_status()
         return response.json()
-    
+
+    @guarded
     def accept_connection_invitation(self, invitation: dict) -> dict:
-        response = self.session.post(f"{self.url}/connections/receive-invitation",  json=invitation)
+        response = self.session.post(
+            f"{self.url}/connections/receive-invitation", json=invitation, timeout=timeout()
+        )
         response.raise_for_status()
         return response.json()
 
 
 class ACAClientFactory:
     @staticmethod
-    def create_client(*args, **kwargs):
-        try:
-            token = settings.ACA_PY_AUTH_TOKEN or None
-        except Exception:
-            token = None
-        return ACAClient(settings.ACA_PY_URL, settings.ACA_PY_TRANSPORT_URL, token)
+    def create_client(organization=None, agent: str = None) -> ACAClient:
+        """
+        The client of the ACA-Py ``agent`` (by name) or else of the agent serving
+        ``organization``, see ``aca.agents``.
+        """
+        from aca import agents
+
+        if agent is not None:
+            return agents.get_agent(agent).client()
+        return agents.agent_for(organization).client()
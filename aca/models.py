@@ -7,6 +7,8 @@ class PresentationData(fields.Field):
     def _serialize(self, value, attr, obj, **kwargs):
         if value is None:
             return ""
+        if isinstance(obj, PresentationAttach):
+            return {"base64": obj.encoded_data}
         return {"base64": encode_base64(value)}
 
     def _deserialize(self, value, attr, data, **kwargs):
@@ -17,6 +19,8 @@ class PresentationData(fields.Field):
 
 
 class PresentationAttach:
+    __slots__ = ("_data", "_encoded_data", "mime_type", "id")
+
     def __init__(
         self,
         data: dict,
@@ -27,15 +31,49 @@ class PresentationAttach:
         self.mime_type = mime_type
         self.id = id
 
+    @property
+    def data(self) -> dict:
+        return self._data
+
+    @data.setter
+    def data(self, data: dict):
+        self._data = data
+        self._encoded_data = None
+
+    @property
+    def encoded_data(self) -> str:
+        """``data`` in base64, encoded once (``data`` must not be mutated in place)."""
+        if self._encoded_data is None and self._data is not None:
+            self._encoded_data = encode_base64(self._data)
+        return self._encoded_data
+
+    def to_json(self) -> dict:
+        return {
+            "@id": self.id,
+            "mime-type": self.mime_type,
+            "data": "" if self._data is None else {"base64": self.encoded_data},
+        }
+
 
 class Service:
+    __slots__ = ("recipient_keys", "routing_keys", "service_endpoint")
+
     def __init__(self, recipient_keys: str, service_endpoint: str, routing_keys: str = None):
         self.recipient_keys = recipient_keys
         self.routing_keys = routing_keys
         self.service_endpoint = service_endpoint
 
+    def to_json(self) -> dict:
+        return {
+            "recipientKeys": list(self.recipient_keys),
+            "routingKeys": None if self.routing_keys is None else list(self.routing_keys),
+            "serviceEndpoint": self.service_endpoint,
+        }
+
 
 class Presentation:
+    __slots__ = ("presentation", "service", "id", "type", "comment")
+
     def __init__(
         self,
         presentation: [PresentationAttach],
@@ -50,6 +88,16 @@ class Presentation:
         self.type = type
         self.comment = comment
 
+    def to_json(self) -> dict:
+        """What ``PresentationSchema().dump`` gives, without going through marshmallow."""
+        return {
+            "@type": self.type,
+            "@id": self.id,
+            "~service": self.service.to_json(),
+            "request_presentations~attach": [attach.to_json() for attach in self.presentation],
+            "comment": self.comment,
+        }
+
 
 class ServiceSchema(Schema):
     recipient_keys = fields.List(fields.Str(), data_key="recipientKeys")
@@ -106,4 +154,4 @@ class PresentationFactory:
         return cls(presentation)
 
     def to_json(self):
-        return self.presentation_schema.dump(self.presentation)
+        return self.presentation.to_json()
@@ -0,0 +1,227 @@
+"""
+Limits on the calls to ACA-Py, so that a slow or unreachable agent (or ledger) ties up
+neither the workers nor the flows that do not need it:
+
+- timeouts, by endpoint (``settings.ACA_PY_TIMEOUTS``: (connect, read) seconds);
+- a bulkhead per agent and endpoint (``settings.ACA_PY_BULKHEADS``): the calls in flight
+  beyond it are turned away at once instead of queuing behind the slow ones;
+- a circuit breaker per agent (``settings.ACA_PY_BREAKER``): after ``failures`` failures in
+  a row (no answer, or a 5xx) the agent is not called for ``reset_after`` seconds, then a
+  single call tries it again and closes the circuit if it succeeds.
+
+A call turned away raises ``ACAPyUnavailable``, a ``requests.ConnectionError``: the outbox
+retries it later on, the API answers it with a 503. The endpoints are the methods of
+``ACAClient`` and ``AsyncACAClient`` decorated with ``guarded``. The state of the breakers,
+the calls in flight and the outcome of the calls are on ``/metrics``.
+"""
+import asyncio
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+import requests
+import structlog as logging
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from id_manager import metrics
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT = "default"
+
+CIRCUIT_STATE = metrics.gauge(
+    "acapy_circuit_state",
+    "State of the ACA-Py circuit breaker: 0 closed, 1 half-open, 2 open",
+    ("agent",),
+)
+CALLS = metrics.counter(
+    "acapy_calls_total",
+    "ACA-Py calls by outcome: ok, error, open (circuit open) or full (bulkhead full)",
+    ("agent", "endpoint", "outcome"),
+)
+IN_FLIGHT = metrics.gauge("acapy_calls_in_flight", "ACA-Py calls in flight", ("agent", "endpoint"))
+CALL_SECONDS = metrics.timer("acapy_call_seconds", "Time of the ACA-Py calls", ("endpoint",))
+
+_endpoint: ContextVar[Optional[str]] = ContextVar("acapy_endpoint", default=None)
+
+
+class ACAPyUnavailable(requests.ConnectionError):
+    """The call was not made: the circuit of the agent is open or its bulkhead is full."""
+
+    def __init__(self, message: str, retry_after: float = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    CLOSED, HALF_OPEN, OPEN = 0, 1, 2
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.set(self.state, agent=name)
+
+    def _set_state(self, state: int):
+        if state != self.state:
+            names = {self.CLOSED: "closed", self.HALF_OPEN: "half-open", self.OPEN: "open"}
+            log = LOGGER.warning if state == self.OPEN else LOGGER.info
+            log(f"aca-py circuit: {self.name}: {names[state]} after {self.failures} failure(s)")
+        self.state = state
+        CIRCUIT_STATE.set(state, agent=self.name)
+
+    def allow(self) -> float:
+        """0 when a call can be made, otherwise the seconds until one may be."""
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = (
+                    self.opened_at + settings.ACA_PY_BREAKER["reset_after"] - time.monotonic()
+                )
+                if remaining > 0:
+                    return remaining
+                self._set_state(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN:
+                # a single call tries the agent again, the others fail fast meanwhile
+                if self._trial:
+                    return 1
+                self._trial = True
+            return 0
+
+    def succeeded(self):
+        with self._lock:
+            self._trial = False
+            self.failures = 0
+            self._set_state(self.CLOSED)
+
+    def failed(self):
+        with self._lock:
+            self._trial = False
+            self.failures += 1
+            threshold = settings.ACA_PY_BREAKER["failures"]
+            if self.state == self.HALF_OPEN or self.failures >= threshold:
+                self.opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_bulkheads: Dict[Tuple[str, str], threading.BoundedSemaphore] = {}
+_lock = threading.Lock()
+
+
+def breaker(agent: str) -> CircuitBreaker:
+    with _lock:
+        if agent not in _breakers:
+            _breakers[agent] = CircuitBreaker(agent)
+        return _breakers[agent]
+
+
+def bulkhead(agent: str, endpoint: str) -> threading.BoundedSemaphore:
+    with _lock:
+        if (agent, endpoint) not in _bulkheads:
+            size = settings.ACA_PY_BULKHEADS.get(endpoint, settings.ACA_PY_BULKHEADS[DEFAULT])
+            _bulkheads[(agent, endpoint)] = threading.BoundedSemaphore(size)
+        return _bulkheads[(agent, endpoint)]
+
+
+def timeout(endpoint: str = None) -> Tuple[float, float]:
+    """(connect, read) timeouts of ``endpoint``, by default of the guarded call in progress."""
+    endpoint = endpoint or _endpoint.get()
+    return settings.ACA_PY_TIMEOUTS.get(endpoint, settings.ACA_PY_TIMEOUTS[DEFAULT])
+
+
+def is_failure(error: Exception) -> bool:
+    """Whether ``error`` tells the agent is unwell: no answer or a server error."""
+    if isinstance(error, requests.HTTPError):
+        status_code = getattr(error.response, "status_code", None)
+        return not isinstance(status_code, int) or status_code >= 500
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+@contextmanager
+def _guard(agent: str, endpoint: str):
+    semaphore = bulkhead(agent, endpoint)
+    if not semaphore.acquire(blocking=False):
+        CALLS.inc(agent=agent, endpoint=endpoint, outcome="full")
+        raise ACAPyUnavailable(f"aca-py: {agent}: too many {endpoint} calls in flight")
+    try:
+        circuit = breaker(agent)
+        retry_after = circuit.allow()
+        if retry_after:
+            CALLS.inc(agent=agent, endpoint=endpoint, outcome="open")
+            raise ACAPyUnavailable(f"aca-py: {agent}: circuit open", retry_after)
+
+        IN_FLIGHT.inc(agent=agent, endpoint=endpoint)
+        token = _endpoint.set(endpoint)
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as error:
+            if is_failure(error):
+                circuit.failed()
+            else:
+                # ACA-Py answered: the agent is fine, the request was not
+                circuit.succeeded()
+            CALLS.inc(agent=agent, endpoint=endpoint, outcome="error")
+            raise
+        else:
+            circuit.succeeded()
+            CALLS.inc(agent=agent, endpoint=endpoint, outcome="ok")
+        finally:
+            CALL_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+            _endpoint.reset(token)
+            IN_FLIGHT.dec(agent=agent, endpoint=endpoint)
+    finally:
+        semaphore.release()
+
+
+def call(agent: str, endpoint: str, function, *args, **kwargs):
+    """Call ``function`` as the ``endpoint`` of ``agent``, within its bulkhead and breaker."""
+    with _guard(agent, endpoint):
+        return function(*args, **kwargs)
+
+
+async def acall(agent: str, endpoint: str, function, *args, **kwargs):
+    """``call`` for a coroutine function."""
+    with _guard(agent, endpoint):
+        return await function(*args, **kwargs)
+
+
+def guarded(method):
+    """
+    Decorate a method of ``ACAClient`` (or of ``AsyncACAClient``: a coroutine function)
+    calling ACA-Py, the endpoint is its name.
+    """
+    if asyncio.iscoroutinefunction(method):
+
+        @functools.wraps(method)
+        async def async_wrapper(client, *args, **kwargs):
+            return await acall(client.name, method.__name__, method, client, *args, **kwargs)
+
+        return async_wrapper
+
+    @functools.wraps(method)
+    def wrapper(client, *args, **kwargs):
+        return call(client.name, method.__name__, method, client, *args, **kwargs)
+
+    return wrapper
+
+
+def reset():
+    """Forget the breakers and bulkheads, as after a restart."""
+    with _lock:
+        _breakers.clear()
+        _bulkheads.clear()
+
+
+@receiver(setting_changed)
+def _reset(setting, **kwargs):
+    if setting in ("ACA_PY_BREAKER", "ACA_PY_BULKHEADS"):
+        reset()
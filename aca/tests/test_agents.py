@@ -0,0 +1,129 @@
+import threading
+
+import pytest
+import requests
+from django.core.exceptions import ImproperlyConfigured
+from django.test import override_settings
+
+from aca import agents
+from aca.client import ACAClientFactory
+
+AGENTS = {
+    "default": {"urls": ["http://default:4001"], "transport_url": "http://default:8100"},
+    "eu": {
+        "urls": ["http://eu-a:4001", "http://eu-b:4001/"],
+        "transport_url": "http://eu:8100",
+        "token": "eu-token",
+    },
+}
+
+
+@pytest.fixture
+def configured():
+    with override_settings(ACA_PY_AGENTS=AGENTS, ACA_PY_AGENT_ROUTES={"UNHCR": "eu"}):
+        yield agents.agents()
+
+
+@pytest.fixture
+def agent():
+    return agents.Agent("eu", ["http://eu-a:4001", "http://eu-b:4001"], "http://eu:8100")
+
+
+@override_settings(ACA_PY_URL="http://aca-py:4001", ACA_PY_TRANSPORT_URL="http://aca-py:8100")
+def test_default_agent_from_aca_py_url():
+    agent = agents.get_agent()
+
+    assert list(agents.agents()) == ["default"]
+    assert agent.urls == ["http://aca-py:4001"]
+    assert agent.client().get_endpoint_url() == "http://aca-py:8100"
+
+
+def test_routes_by_organization(configured):
+    assert agents.agent_for("UNHCR") is configured["eu"]
+    assert agents.agent_for(type("Organization", (), {"name": "UNHCR"})()) is configured["eu"]
+    assert agents.agent_for("UNOG") is configured["default"]
+    assert agents.agent_for(None) is configured["default"]
+    assert configured["eu"].urls == ["http://eu-a:4001", "http://eu-b:4001"]
+    assert configured["eu"].client().session.headers["X-API-Key"] == "eu-token"
+
+
+def test_create_client(configured):
+    assert ACAClientFactory.create_client(organization="UNHCR").url == "http://eu-a:4001"
+    assert ACAClientFactory.create_client(agent="default").url == "http://default:4001"
+    assert ACAClientFactory.create_client() is ACAClientFactory.create_client()
+
+
+def test_misconfigured_agents():
+    with override_settings(ACA_PY_AGENTS={"eu": AGENTS["eu"]}):
+        with pytest.raises(ImproperlyConfigured):
+            agents.agents()
+    with override_settings(ACA_PY_AGENTS=AGENTS):
+        with pytest.raises(ImproperlyConfigured):
+            agents.get_agent("unknown")
+
+
+def test_one_client_per_thread(agent):
+    clients = []
+    thread = threading.Thread(target=lambda: clients.append(agent.client()))
+    thread.start()
+    thread.join()
+
+    assert agent.client() is agent.client()
+    assert clients[0] is not agent.client()
+
+
+def test_fails_over_when_an_instance_cannot_be_reached(agent, requests_mock):
+    requests_mock.post("http://eu-a:4001/schemas", exc=requests.ConnectTimeout)
+    requests_mock.post("http://eu-b:4001/schemas", json={"schema_id": "1"})
+
+    assert agent.client().create_schema({}) == {"schema_id": "1"}
+    assert agent.instances() == ["http://eu-b:4001", "http://eu-a:4001"]
+    assert agents.INSTANCE_UP.value(url="http://eu-a:4001") == 0
+
+    agent.client().create_schema({})
+
+    assert [request.netloc for request in requests_mock.request_history] == [
+        "eu-a:4001",
+        "eu-b:4001",
+        "eu-b:4001",
+    ]
+
+
+@override_settings(ACA_PY_AGENT_RETRY_AFTER=0)
+def test_failed_instance_tried_again(agent, requests_mock):
+    requests_mock.post("http://eu-a:4001/schemas", exc=requests.ConnectTimeout)
+    requests_mock.post("http://eu-b:4001/schemas", json={})
+    agent.client().create_schema({})
+    requests_mock.post("http://eu-a:4001/schemas", json={})
+
+    agent.client().create_schema({})
+
+    assert requests_mock.last_request.netloc == "eu-a:4001"
+    assert agent.instances() == ["http://eu-a:4001", "http://eu-b:4001"]
+
+
+def test_request_that_may_have_been_sent_is_not_sent_again(agent, requests_mock):
+    requests_mock.post("http://eu-a:4001/schemas", exc=requests.ConnectionError("reset"))
+    requests_mock.post("http://eu-b:4001/schemas", json={})
+
+    with pytest.raises(requests.ConnectionError):
+        agent.client().create_schema({})
+
+    assert requests_mock.call_count == 1
+    assert agent.instances() == ["http://eu-b:4001", "http://eu-a:4001"]
+
+
+def test_every_instance_down(agent, requests_mock):
+    requests_mock.post("http://eu-a:4001/schemas", exc=requests.ConnectTimeout)
+    requests_mock.post("http://eu-b:4001/schemas", exc=requests.ConnectTimeout)
+
+    with pytest.raises(requests.ConnectTimeout):
+        agent.client().create_schema({})
+
+
+def test_check_health(agent, requests_mock):
+    requests_mock.get("http://eu-a:4001/status/ready", json={"ready": False})
+    requests_mock.get("http://eu-b:4001/status/ready", json={"ready": True})
+
+    assert agent.check_health() == {"http://eu-a:4001": False, "http://eu-b:4001": True}
+    assert agent.instances() == ["http://eu-b:4001", "http://eu-a:4001"]
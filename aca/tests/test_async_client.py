@@ -0,0 +1,93 @@
+import asyncio
+
+import httpx
+import pytest
+import requests
+import respx
+
+from aca import agents, resilience
+from aca.async_client import AsyncACAClient
+
+
+@pytest.fixture
+def agent():
+    return agents.Agent(
+        "eu", ["http://eu-a:4001", "http://eu-b:4001"], "http://eu:8100", token="eu-token"
+    )
+
+
+def run(agent, method: str, *args):
+    async def call():
+        client = AsyncACAClient(agent)
+        try:
+            return await getattr(client, method)(*args)
+        finally:
+            await client.aclose()
+
+    return asyncio.run(call())
+
+
+@respx.mock
+def test_send_credential_offer(agent):
+    route = respx.post("http://eu-a:4001/issue-credential/send-offer").respond(
+        json={"state": "offer_sent"}
+    )
+
+    assert run(agent, "send_credential_offer", {"cred_def_id": "1"}, "c-1") == {
+        "state": "offer_sent"
+    }
+    request = route.calls.last.request
+    assert request.headers["X-API-Key"] == "eu-token"
+    assert request.content == b'{"cred_def_id": "1", "connection_id": "c-1"}'
+    assert resilience.CALLS.value(agent="eu", endpoint="send_credential_offer", outcome="ok") == 1
+
+
+@respx.mock
+def test_fails_over_when_an_instance_cannot_be_reached(agent):
+    respx.post("http://eu-a:4001/connections/create-invitation").mock(
+        side_effect=httpx.ConnectError
+    )
+    respx.post("http://eu-b:4001/connections/create-invitation").respond(
+        json={"connection_id": "1"}
+    )
+
+    assert run(agent, "create_connection_invitation") == {"connection_id": "1"}
+    assert agent.instances() == ["http://eu-b:4001", "http://eu-a:4001"]
+
+
+@respx.mock
+def test_request_that_may_have_been_sent_is_not_sent_again(agent):
+    first = respx.post("http://eu-a:4001/connections/create-invitation").mock(
+        side_effect=httpx.ReadTimeout
+    )
+    second = respx.post("http://eu-b:4001/connections/create-invitation").respond(json={})
+
+    with pytest.raises(requests.ReadTimeout):
+        run(agent, "create_connection_invitation")
+
+    assert first.called and not second.called
+
+
+@respx.mock
+def test_errors_raised_as_requests_ones(agent):
+    respx.post("http://eu-a:4001/issue-credential/send-offer").respond(
+        403, text="Connection not ready"
+    )
+
+    with pytest.raises(requests.HTTPError) as error:
+        run(agent, "send_credential_offer", {}, "c-1")
+
+    assert error.value.response.status_code == 403
+    assert error.value.response.text == "Connection not ready"
+
+
+@respx.mock
+def test_open_circuit_turns_calls_away(agent, settings):
+    route = respx.post("http://eu-a:4001/connections/create-invitation").respond(json={})
+    for _ in range(settings.ACA_PY_BREAKER["failures"]):
+        resilience.breaker("eu").failed()
+
+    with pytest.raises(resilience.ACAPyUnavailable):
+        run(agent, "create_connection_invitation")
+
+    assert not route.called
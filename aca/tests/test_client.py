@@ -96,6 +96,17 @@ class TestAcaClient:
         result = self.client.retrieve_issue_credential_by_cred_ex_id(cred_ex_id)
         assert result == mock_result
 
+    def test_list_issue_credential_records(self, requests_mock):
+        records = [{"credential_exchange_id": "1", "state": "credential_acked"}]
+        requests_mock.get(f"{self.url}/issue-credential/records", json={"results": records})
+        result = self.client.list_issue_credential_records(role="issuer", limit=10, offset=20)
+        assert result == records
+        assert requests_mock.last_request.qs == {
+            "role": ["issuer"],
+            "limit": ["10"],
+            "offset": ["20"],
+        }
+
     def test_create_credential_definition(self, requests_mock):
         requests_mock.post(f"{self.url}/credential-definitions", json={"mock": "result"})
         result = self.client.create_credential_definition({"some": "data"})
@@ -146,4 +157,4 @@ class TestAcaClient:
     def test_accept_connection_invitation(self, requests_mock):
         requests_mock.post(f"{self.url}/connections/receive-invitation", json={"mock": "result"})
         result = self.client.accept_connection_invitation({"some": "data"})
-        assert result == {"mock": "result"}
\ No newline at end of file
+        assert result == {"mock": "result"}
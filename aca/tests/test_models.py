@@ -1,6 +1,7 @@
 import pytest
 
 from aca.models import PresentationFactory
+from aca.utils import encode_base64
 
 
 @pytest.mark.django_db
@@ -74,3 +75,36 @@ class TestPresentation:
 
         presentation = PresentationFactory.from_json(presentation_json)
         assert presentation.to_json() == presentation_json
+
+    @pytest.fixture
+    def presentation(self):
+        return PresentationFactory.from_params(
+            presentation_request={"name": "Basic Proof", "nonce": "1"},
+            p_id="id",
+            verkey=["verkey"],
+            endpoint="endpoint",
+        )
+
+    def test_to_json_matches_the_schema(self, presentation):
+        assert presentation.to_json() == PresentationFactory.presentation_schema.dump(
+            presentation.presentation
+        )
+
+    def test_attachment_encoded_once(self, presentation, mocker):
+        encode_base64 = mocker.patch("aca.models.encode_base64", return_value="encoded")
+
+        presentation.to_json()
+        presentation.to_json()
+        PresentationFactory.presentation_schema.dump(presentation.presentation)
+
+        encode_base64.assert_called_once_with({"name": "Basic Proof", "nonce": "1"})
+
+    def test_attachment_encoded_again_when_replaced(self, presentation):
+        attach = presentation.presentation.presentation[0]
+        attach.data = {"name": "Other Proof"}
+
+        assert attach.encoded_data == encode_base64({"name": "Other Proof"})
+
+    def test_models_are_slotted(self, presentation):
+        with pytest.raises(AttributeError):
+            presentation.presentation.other = 1
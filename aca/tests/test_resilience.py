@@ -0,0 +1,123 @@
+import pytest
+import requests
+from django.test import override_settings
+
+from aca import resilience
+from aca.client import ACAClient
+from aca.resilience import ACAPyUnavailable, CircuitBreaker
+
+URL = "http://aca-py:4001"
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    resilience.CALLS.clear()
+    resilience.CIRCUIT_STATE.clear()
+
+
+@pytest.fixture
+def client():
+    return ACAClient(URL, "http://aca-py:8100", name="agent")
+
+
+def fail(client, requests_mock, times: int):
+    requests_mock.post(f"{URL}/schemas", exc=requests.ConnectTimeout)
+    for _ in range(times):
+        with pytest.raises(requests.ConnectTimeout):
+            client.create_schema({})
+
+
+@override_settings(ACA_PY_BREAKER={"failures": 3, "reset_after": 30})
+def test_circuit_opens_after_consecutive_failures(client, requests_mock):
+    fail(client, requests_mock, 3)
+
+    with pytest.raises(ACAPyUnavailable) as error:
+        client.get_schema("1")
+
+    assert requests_mock.call_count == 3
+    assert 0 < error.value.retry_after <= 30
+    assert resilience.CIRCUIT_STATE.value(agent="agent") == CircuitBreaker.OPEN
+    assert resilience.CALLS.value(agent="agent", endpoint="create_schema", outcome="error") == 3
+    assert resilience.CALLS.value(agent="agent", endpoint="get_schema", outcome="open") == 1
+
+
+@override_settings(ACA_PY_BREAKER={"failures": 3, "reset_after": 30})
+def test_success_resets_the_failures(client, requests_mock):
+    fail(client, requests_mock, 2)
+    requests_mock.get(f"{URL}/schemas/1", json={"schema_json": {}})
+    client.get_schema("1")
+    fail(client, requests_mock, 2)
+
+    assert client.get_schema("1") == {}
+    assert resilience.CIRCUIT_STATE.value(agent="agent") == CircuitBreaker.CLOSED
+
+
+@override_settings(ACA_PY_BREAKER={"failures": 1, "reset_after": 30})
+def test_client_errors_do_not_open_the_circuit(client, requests_mock):
+    requests_mock.post(f"{URL}/schemas", status_code=400)
+
+    for _ in range(2):
+        with pytest.raises(requests.HTTPError):
+            client.create_schema({})
+
+    assert resilience.CIRCUIT_STATE.value(agent="agent") == CircuitBreaker.CLOSED
+
+
+@override_settings(ACA_PY_BREAKER={"failures": 1, "reset_after": 0})
+def test_half_open_circuit_tries_one_call(client, requests_mock):
+    fail(client, requests_mock, 1)
+    circuit = resilience.breaker("agent")
+
+    assert circuit.allow() == 0
+    assert circuit.state == CircuitBreaker.HALF_OPEN
+    # the trial call is in flight, the others fail fast
+    assert circuit.allow() > 0
+
+    circuit.failed()
+    assert circuit.state == CircuitBreaker.OPEN
+
+    requests_mock.post(f"{URL}/schemas", json={"schema_id": "1"})
+    assert client.create_schema({}) == {"schema_id": "1"}
+    assert circuit.state == CircuitBreaker.CLOSED
+
+
+@override_settings(ACA_PY_BULKHEADS={"default": 4, "create_schema": 1})
+def test_bulkhead_turns_away_the_calls_beyond_its_size(client, requests_mock):
+    requests_mock.post(f"{URL}/schemas", json={})
+    requests_mock.get(f"{URL}/schemas/1", json={"schema_json": {}})
+    in_flight = resilience.bulkhead("agent", "create_schema")
+    in_flight.acquire()
+
+    with pytest.raises(ACAPyUnavailable):
+        client.create_schema({})
+    # other endpoints and agents are not affected
+    client.get_schema("1")
+    ACAClient(URL, "http://aca-py:8100", name="other").create_schema({})
+
+    in_flight.release()
+    client.create_schema({})
+    assert resilience.CALLS.value(agent="agent", endpoint="create_schema", outcome="full") == 1
+    assert resilience.CALLS.value(agent="agent", endpoint="create_schema", outcome="ok") == 1
+
+
+def test_bulkhead_released_on_errors(client, requests_mock):
+    requests_mock.post(f"{URL}/schemas", status_code=500)
+    for _ in range(3):
+        with pytest.raises(requests.HTTPError):
+            client.create_schema({})
+
+    assert resilience.IN_FLIGHT.value(agent="agent", endpoint="create_schema") == 0
+    semaphore = resilience.bulkhead("agent", "create_schema")
+    assert semaphore.acquire(blocking=False)
+    semaphore.release()
+
+
+@override_settings(ACA_PY_TIMEOUTS={"default": (1, 2), "create_schema": (1, 60)})
+def test_timeouts_by_endpoint(client, requests_mock):
+    requests_mock.post(f"{URL}/schemas", json={})
+    requests_mock.get(f"{URL}/schemas/1", json={"schema_json": {}})
+
+    client.create_schema({})
+    assert requests_mock.last_request.timeout == (1, 60)
+    client.get_schema("1")
+    assert requests_mock.last_request.timeout == (1, 2)
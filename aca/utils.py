@@ -3,7 +3,7 @@ import json
 
 
 def encode_base64(payload: dict) -> str:
-    return base64.b64encode(bytes(json.dumps(payload), "utf-8")).decode("utf-8")
+    return base64.b64encode(json.dumps(payload).encode()).decode("ascii")
 
 
 def decode_base64(b64_input: str) -> dict:
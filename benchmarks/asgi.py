@@ -0,0 +1,170 @@
+"""
+Deep links of new credential requests (a connection invitation created by ACA-Py for each)
+under concurrent load, served by one gunicorn worker: WSGI with a pool of threads against
+the async views under ASGI (uvicorn worker). ACA-Py is a stand-in answering after
+``--latency`` seconds.
+
+    python -m benchmarks.asgi [--requests 600] [--concurrency 200] [--latency 1] [--threads 16]
+
+Needs httpx, uvicorn and gunicorn (requirements.txt); the database is a temporary sqlite file.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+FAKE_ACA_PY_PORT = 18100
+SERVER_PORT = 18082
+
+
+async def fake_aca_py(scope, receive, send):
+    """ASGI app answering ``create-invitation`` as ACA-Py, after ``BENCHMARK_LATENCY``."""
+    if scope["type"] != "http":
+        return
+    await asyncio.sleep(float(os.environ.get("BENCHMARK_LATENCY", 1)))
+    connection_id = os.urandom(16).hex()
+    body = json.dumps(
+        {
+            "connection_id": connection_id,
+            "invitation": {"@id": connection_id, "label": "Issuer"},
+            "invitation_url": f"http://aca-py/invite?c_i={connection_id}",
+        }
+    ).encode()
+    headers = [(b"content-type", b"application/json")]
+    await send({"type": "http.response.start", "status": 200, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+def create_credential_requests(number: int) -> [str]:
+    """The codes of ``number`` new credential requests, in a freshly migrated database."""
+    import django
+
+    django.setup()
+
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+
+    from manager.models import CredentialDefinition, CredentialRequest, Schema
+
+    call_command("migrate", verbosity=0)
+
+    user = User.objects.create(username="benchmark")
+    schema = Schema.objects.create(
+        name="schema", schema_id="benchmark:2:schema:1.0", creator=user, schema_json={}
+    )
+    definition = CredentialDefinition.objects.create(
+        name="definition", credential_id="benchmark:3:CL:1:tag", schema=schema, creator=user
+    )
+    requests = CredentialRequest.objects.bulk_create(
+        CredentialRequest(credential_definition=definition, creator=user, credential_data={})
+        for _ in range(number)
+    )
+    return [str(request.code) for request in requests]
+
+
+def start(command: [str], env: dict, port: int) -> subprocess.Popen:
+    import httpx
+
+    process = subprocess.Popen(command, env=env, stderr=subprocess.DEVNULL)
+    for _ in range(200):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{' '.join(command)} did not start")
+
+
+async def load(codes: [str], concurrency: int) -> ([float], float, int):
+    """The latency of each request, the seconds they all took and how many failed."""
+    import httpx
+
+    latencies, failures = [], 0
+    queue = iter(codes)
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=120) as client:
+
+        async def worker():
+            nonlocal failures
+            for code in queue:
+                start = time.perf_counter()
+                response = await client.get(
+                    f"http://127.0.0.1:{SERVER_PORT}/deep-link-redirect/{code}"
+                )
+                latencies.append(time.perf_counter() - start)
+                failures += response.status_code != 302
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return latencies, time.perf_counter() - start, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=1)
+    parser.add_argument("--threads", type=int, default=16)
+    args = parser.parse_args()
+
+    servers = {
+        f"WSGI, {args.threads} threads": (
+            ["-k", "gthread", "--threads", str(args.threads), "id_manager.wsgi:application"],
+            "id_manager.urls",
+        ),
+        "ASGI, uvicorn": (
+            ["-k", "uvicorn.workers.UvicornWorker", "id_manager.asgi:application"],
+            "id_manager.urls_async",
+        ),
+    }
+    gunicorn = [sys.executable, "-m", "gunicorn", "-w", "1", "-b", f"127.0.0.1:{SERVER_PORT}"]
+
+    # in memory when there is a tmpfs: what is measured is not how fast the disk syncs
+    with tempfile.TemporaryDirectory(
+        dir="/dev/shm" if os.path.isdir("/dev/shm") else None
+    ) as directory:
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": "benchmarks.settings",
+            "BENCHMARK_DB": os.path.join(directory, "db.sqlite3"),
+            "BENCHMARK_LATENCY": str(args.latency),
+            "BENCHMARK_ACA_PY_URL": f"http://127.0.0.1:{FAKE_ACA_PY_PORT}",
+        }
+        os.environ.update(env)
+        codes = create_credential_requests(args.requests * len(servers))
+        aca_py = start(
+            [sys.executable, "-m", "uvicorn", "benchmarks.asgi:fake_aca_py"]
+            + ["--port", str(FAKE_ACA_PY_PORT), "--log-level", "warning"],
+            env,
+            FAKE_ACA_PY_PORT,
+        )
+        try:
+            for index, (name, (command, urlconf)) in enumerate(servers.items()):
+                server_env = {**env, "BENCHMARK_URLCONF": urlconf}
+                server = start(gunicorn + command, server_env, SERVER_PORT)
+                try:
+                    server_codes = codes[index * args.requests : (index + 1) * args.requests]
+                    latencies, seconds, failures = asyncio.run(load(server_codes, args.concurrency))
+                finally:
+                    server.terminate()
+                    server.wait()
+                quantiles = statistics.quantiles(latencies, n=100)
+                print(
+                    f"{name:24} {len(latencies) / seconds:8.0f} requests/s "
+                    f"p50 {quantiles[49] * 1000:7.0f} ms  p99 {quantiles[98] * 1000:7.0f} ms  "
+                    f"{failures} failed"
+                )
+        finally:
+            aca_py.terminate()
+            aca_py.wait()
+
+
+if __name__ == "__main__":
+    main()
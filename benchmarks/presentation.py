@@ -0,0 +1,59 @@
+"""
+Connectionless proof requests serialized with ``aca.models``: the marshmallow schema against
+the direct ``to_json`` path, for new presentations and for one sent again.
+
+    python -m benchmarks.presentation [--number 20000] [--attributes 10]
+"""
+import argparse
+import timeit
+
+from aca.models import PresentationFactory
+
+
+def proof_request(attributes: int) -> dict:
+    return {
+        "name": "Proof of identity",
+        "version": "1.0",
+        "nonce": "523327307422556114630448",
+        "requested_attributes": {
+            f"attribute-{index}": {
+                "name": f"attribute_{index}",
+                "restrictions": [{"cred_def_id": "WgWxqztrNooG92RXvxSTWv:3:CL:20:tag"}],
+            }
+            for index in range(attributes)
+        },
+        "requested_predicates": {},
+    }
+
+
+def new_presentation(request: dict) -> PresentationFactory:
+    return PresentationFactory.from_params(request, "id", ["verkey"], "https://agent")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--attributes", type=int, default=10)
+    args = parser.parse_args()
+
+    request = proof_request(args.attributes)
+    schema = PresentationFactory.presentation_schema
+    sent = new_presentation(request)
+    cases = {
+        "marshmallow dump, new presentation": lambda: schema.dump(
+            new_presentation(request).presentation
+        ),
+        "to_json, new presentation": lambda: new_presentation(request).to_json(),
+        "marshmallow dump, same presentation": lambda: schema.dump(sent.presentation),
+        "to_json, same presentation": sent.to_json,
+    }
+    for name, case in cases.items():
+        seconds = min(timeit.repeat(case, number=args.number, repeat=3))
+        print(
+            f"{name:40} {seconds / args.number * 1e6:8.2f} µs/op "
+            f"{args.number / seconds:10.0f} ops/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
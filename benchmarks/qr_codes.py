@@ -0,0 +1,66 @@
+"""
+QR codes of invitation URLs: ``qrcode``'s own image of a code refitted from version 1 (how
+they used to be rendered) against ``manager.qr_codes``, on one core and over a process pool.
+
+    python -m benchmarks.qr_codes [--number 200] [--processes N]
+"""
+import argparse
+import io
+import os
+import time
+import timeit
+
+
+def invitation_url(index: int) -> str:
+    """An invitation URL as long as the ones of ACA-Py, different for each code."""
+    return f"https://aca-py.un-chain.org/invite?c_i={os.urandom(300).hex()[:560]}{index}"
+
+
+def qrcode_image(data: str) -> bytes:
+    import qrcode
+
+    qr = qrcode.QRCode(version=1)
+    qr.add_data(data)
+    output = io.BytesIO()
+    qr.make_image().save(output)
+    return output.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=200)
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "id_manager.settings.test")
+    import django
+
+    django.setup()
+
+    from manager import qr_codes
+
+    urls = [invitation_url(index) for index in range(args.number)]
+    version, level = qr_codes.plan(urls[0])
+    print(f"{len(urls[0])} characters: version {version}, error correction {level}")
+
+    cases = {
+        "qrcode, PIL image": qrcode_image,
+        "qr_codes, palette PNG": lambda url: qr_codes.render(url),
+        "qr_codes, SVG": lambda url: qr_codes.render(url, qr_codes.SVG),
+    }
+    for name, render in cases.items():
+        seconds = timeit.timeit(lambda: [render(url) for url in urls], number=1)
+        size = len(render(urls[0]))
+        print(f"{name:28} {args.number / seconds:8.1f} codes/s {size:8} bytes")
+
+    start = time.perf_counter()
+    count = sum(1 for _ in qr_codes.render_many(urls, processes=args.processes))
+    seconds = time.perf_counter() - start
+    print(
+        f"{f'render_many, {args.processes} process(es)':28} {count / seconds:8.1f} codes/s "
+        f"{count / seconds / args.processes:8.1f} codes/s per process"
+    )
+
+
+if __name__ == "__main__":
+    main()
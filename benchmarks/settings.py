@@ -0,0 +1,18 @@
+"""The settings of the servers started by ``benchmarks.asgi``: the test ones, on a file."""
+from id_manager.settings.test import *  # noqa: F401,F403
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.environ["BENCHMARK_DB"],
+        "OPTIONS": {"timeout": 60},
+    }
+}
+ROOT_URLCONF = os.environ.get("BENCHMARK_URLCONF", ROOT_URLCONF)
+ACA_PY_URL = os.environ.get("BENCHMARK_ACA_PY_URL", ACA_PY_URL)
+
+# what is measured is how many requests a worker keeps waiting on ACA-Py, not the limits
+ADMISSION_CONTROL = {}
+ACA_PY_BULKHEADS = {"default": 10000}
+CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+LOGGING = {"version": 1, "disable_existing_loggers": True}
@@ -0,0 +1,94 @@
+"""
+ACA-Py webhooks through the whole Django stack, on one core: rejected ones (wrong API key,
+malformed body), ones of topics without a handler and accepted connections, one per request
+and in batches.
+
+    python -m benchmarks.webhooks [--number 2000] [--batch 100] [--sample-rate 0.01] 2>/dev/null
+
+Runs on the test settings (sqlite in memory); the logs go to stderr.
+"""
+import argparse
+import json
+import os
+import timeit
+
+
+def connection_message(connection_id: str) -> dict:
+    """The body of a ``connections`` webhook as ACA-Py sends it."""
+    return {
+        "connection_id": connection_id,
+        "state": "response",
+        "rfc23_state": "response-sent",
+        "routing_state": "none",
+        "accept": "auto",
+        "their_role": "invitee",
+        "their_did": "5sEJ5eMJRS9vESbyqpdYZB",
+        "their_label": "Holder wallet",
+        "my_did": "WgWxqztrNooG92RXvxSTWv",
+        "invitation_key": "H3C2AVvLMv6gmMNam3uVAjZpfkcJCwDwnZn6z3wXmqPV",
+        "invitation_mode": "once",
+        "created_at": "2022-11-02 12:11:47.103457Z",
+        "updated_at": "2022-11-02 12:11:48.623218Z",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--sample-rate", type=float, default=0.01)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "id_manager.settings.test")
+    import django
+
+    django.setup()
+
+    from django.conf import settings
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import override_settings, setup_test_environment
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0)
+    client = Client()
+    path = f"/webhooks/{settings.ACA_PY_WEBHOOKS_API_KEY}/topic"
+    body = json.dumps(connection_message("unknown-connection-id"))
+    batch = json.dumps(
+        [
+            {"topic": "connections", "payload": connection_message(f"unknown-{index}")}
+            for index in range(args.batch)
+        ]
+    )
+    # name: (url, body, events per request)
+    cases = {
+        "invalid api key": ("/webhooks/wrong-key/topic/connections/", body, 1),
+        "malformed body": (f"{path}/connections/", body[:-1], 1),
+        "topic without handler": (f"{path}/basicmessages/", body, 1),
+        "connection accepted": (f"{path}/connections/", body, 1),
+        f"connections accepted, {args.batch}/batch": (
+            f"/webhooks/{settings.ACA_PY_WEBHOOKS_API_KEY}/batch/",
+            batch,
+            args.batch,
+        ),
+    }
+    # no admission control: it would turn most of them away
+    with override_settings(ADMISSION_CONTROL={}, WEBHOOKS_LOG_SAMPLE_RATE=args.sample_rate):
+        for name, (url, data, events) in cases.items():
+            number = max(args.number // events, 1)
+            seconds = min(
+                timeit.repeat(
+                    lambda: client.post(url, data=data, content_type="application/json"),
+                    number=number,
+                    repeat=3,
+                )
+            )
+            webhooks = number * events
+            print(
+                f"{name:32} {seconds / webhooks * 1e6:8.1f} µs/webhook "
+                f"{webhooks / seconds:8.0f} webhooks/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,31 @@
 import pytest
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 
+from aca import resilience
+from manager import qr_storage
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_resilience():
+    """No circuit opened by the failures of a test is left open for the next ones."""
+    resilience.reset()
+
+
+@pytest.fixture(autouse=True)
+def reset_qr_storage():
+    """Every test starts with an empty QR code storage (see id_manager.settings.test)."""
+    qr_storage.reset()
+
 
 @pytest.fixture
 def api_client():
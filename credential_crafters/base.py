@@ -1,4 +1,8 @@
 class CredentialCrafter:
+    credential_preview_type = (
+        "did:sov:BzCbsNYhMrjHiqZDTUASHg;spec/issue-credential/1.0/credential-preview"
+    )
+
     def __init__(
         self,
         connection_id: str,
@@ -24,8 +28,23 @@ class CredentialCrafter:
             "connection_id": self.connection_id,
             "cred_def_id": self.credential_definition_id,
             "credential_preview": {
-                "@type": "did:sov:BzCbsNYhMrjHiqZDTUASHg;spec/issue-credential"
-                "/1.0/credential-preview",
+                "@type": self.credential_preview_type,
                 "attributes": self.craft_attributes(),
             },
         }
+
+    @classmethod
+    def craft_many(cls, credential_definition_id: str, items: [(str, dict)]) -> [{}]:
+        """
+        Credential offers for several ``(connection_id, credential_data)`` pairs of the same
+        credential definition, in the same order. Override it to share expensive
+        per-definition work (lookups, templates...) across a bulk issuance.
+        """
+        return [
+            cls(
+                connection_id=connection_id,
+                credential_definition_id=credential_definition_id,
+                credential_data=credential_data,
+            ).craft()
+            for connection_id, credential_data in items
+        ]
@@ -0,0 +1,87 @@
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from credential_crafters.base import CredentialCrafter
+
+
+class CredentialCrafterRegistry:
+    """
+    Crafter class per credential definition id. ``settings.CREDENTIAL_CRAFTERS`` is resolved
+    and validated once (at app startup, see ``ManagerConfig.ready``) instead of on every
+    credential offer; definitions without a custom crafter get ``CredentialCrafter``.
+    """
+
+    default_crafter = CredentialCrafter
+
+    def __init__(self):
+        self._crafters = None
+        self._registered = {}
+        self._lock = threading.Lock()
+
+    def load(self) -> dict:
+        crafters_setting = getattr(settings, "CREDENTIAL_CRAFTERS", {}) or {}
+        if not isinstance(crafters_setting, dict):
+            raise ImproperlyConfigured(
+                "CREDENTIAL_CRAFTERS must be a dict of credential_definition_id: 'module.Class'"
+            )
+
+        crafters = {}
+        for credential_definition_id, crafter_path in crafters_setting.items():
+            try:
+                crafter_class = import_string(crafter_path)
+            except ImportError as error:
+                raise ImproperlyConfigured(
+                    f"CREDENTIAL_CRAFTERS: cannot import '{crafter_path}' for credential "
+                    f"definition '{credential_definition_id}': {error}"
+                ) from error
+            self._check(credential_definition_id, crafter_class)
+            crafters[credential_definition_id] = crafter_class
+
+        crafters.update(self._registered)
+        with self._lock:
+            self._crafters = crafters
+        return crafters
+
+    def register(self, credential_definition_id: str):
+        """Class decorator registering a crafter for a credential definition from code."""
+
+        def decorator(crafter_class):
+            self._check(credential_definition_id, crafter_class)
+            with self._lock:
+                self._registered[credential_definition_id] = crafter_class
+                if self._crafters is not None:
+                    self._crafters[credential_definition_id] = crafter_class
+            return crafter_class
+
+        return decorator
+
+    def get(self, credential_definition_id: str):
+        crafters = self._crafters
+        if crafters is None:
+            crafters = self.load()
+        return crafters.get(credential_definition_id, self.default_crafter)
+
+    def clear(self):
+        with self._lock:
+            self._crafters = None
+
+    def _check(self, credential_definition_id: str, crafter_class):
+        if not (isinstance(crafter_class, type) and issubclass(crafter_class, CredentialCrafter)):
+            raise ImproperlyConfigured(
+                f"Crafter for credential definition '{credential_definition_id}' must extend "
+                f"credential_crafters.base.CredentialCrafter, got {crafter_class!r}"
+            )
+
+
+registry = CredentialCrafterRegistry()
+
+
+@receiver(setting_changed)
+def reset_registry(setting, **kwargs):
+    if setting == "CREDENTIAL_CRAFTERS":
+        registry.clear()
@@ -0,0 +1,64 @@
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.test import override_settings
+
+from credential_crafters.base import CredentialCrafter
+from credential_crafters.registry import CredentialCrafterRegistry
+
+
+class EmployeeCrafter(CredentialCrafter):
+    pass
+
+
+class NotACrafter:
+    pass
+
+
+@override_settings(
+    CREDENTIAL_CRAFTERS={"cred:def:1": "credential_crafters.tests.test_registry.EmployeeCrafter"}
+)
+def test_load_resolves_classes_once(mocker):
+    registry = CredentialCrafterRegistry()
+    import_string = mocker.patch(
+        "credential_crafters.registry.import_string", return_value=EmployeeCrafter
+    )
+
+    assert registry.get("cred:def:1") == EmployeeCrafter
+    assert registry.get("cred:def:1") == EmployeeCrafter
+    assert registry.get("cred:def:2") == CredentialCrafter
+    import_string.assert_called_once()
+
+
+@override_settings(
+    CREDENTIAL_CRAFTERS={"cred:def:1": "credential_crafters.tests.test_registry.NotACrafter"}
+)
+def test_load_rejects_classes_not_extending_credential_crafter():
+    with pytest.raises(ImproperlyConfigured):
+        CredentialCrafterRegistry().load()
+
+
+@override_settings(CREDENTIAL_CRAFTERS={"cred:def:1": "credential_crafters.tests.Typo"})
+def test_load_rejects_typos():
+    with pytest.raises(ImproperlyConfigured):
+        CredentialCrafterRegistry().load()
+
+
+def test_register():
+    registry = CredentialCrafterRegistry()
+
+    registry.register("cred:def:3")(EmployeeCrafter)
+
+    assert registry.get("cred:def:3") == EmployeeCrafter
+    registry.clear()
+    assert registry.get("cred:def:3") == EmployeeCrafter
+    with pytest.raises(ImproperlyConfigured):
+        registry.register("cred:def:4")(NotACrafter)
+
+
+def test_craft_many():
+    offers = CredentialCrafter.craft_many(
+        "cred:def:1", [("conn-1", {"name": "Ada"}), ("conn-2", {"name": "Grace"})]
+    )
+
+    assert [offer["connection_id"] for offer in offers] == ["conn-1", "conn-2"]
+    assert offers[1] == CredentialCrafter("conn-2", "cred:def:1", {"name": "Grace"}).craft()
@@ -0,0 +1,15 @@
+import structlog as logging
+from django.db import connections
+
+LOGGER = logging.getLogger(__name__)
+
+
+def warm_up_connections():
+    """Fill the connection pools of the pooled database backends, at process startup."""
+    for connection in connections.all():
+        if not hasattr(connection, "warm_up"):
+            continue
+        try:
+            connection.warm_up()
+        except Exception as e:
+            LOGGER.error(f"db pool: {connection.alias}: warm-up failed: {e}")
@@ -0,0 +1,82 @@
+"""
+PostgreSQL backend handing out connections from a per-process pool.
+
+    DATABASES = {
+        "default": {
+            "ENGINE": "id_manager.db.backends.postgresql_pool",
+            ...
+            "CONN_MAX_AGE": 0,  # give the connection back to the pool after each request
+            "POOL": {"MIN_SIZE": 2, "MAX_SIZE": 10, "TIMEOUT": 30, "HEALTH_CHECK_AFTER": 30},
+        }
+    }
+
+Closing the Django connection returns it to the pool instead of closing it.
+"""
+import threading
+
+from django.db.backends.postgresql import base
+
+from id_manager.db.backends.postgresql_pool.pool import ConnectionPool
+
+POOL_DEFAULTS = {"MIN_SIZE": 1, "MAX_SIZE": 10, "TIMEOUT": 30, "HEALTH_CHECK_AFTER": 30}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias: str, conn_params: dict, options: dict) -> ConnectionPool:
+    """One pool per alias and connection parameters (tests connect to other databases)."""
+    key = (alias, tuple(sorted((name, repr(value)) for name, value in conn_params.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            options = {**POOL_DEFAULTS, **options}
+            pool = _pools[key] = ConnectionPool(
+                alias,
+                min_size=int(options["MIN_SIZE"]),
+                max_size=int(options["MAX_SIZE"]),
+                timeout=float(options["TIMEOUT"]),
+                health_check_after=float(options["HEALTH_CHECK_AFTER"]),
+            )
+        return pool
+
+
+def close_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    @property
+    def pool(self) -> ConnectionPool:
+        return get_pool(
+            self.alias, self.get_connection_params(), self.settings_dict.get("POOL") or {}
+        )
+
+    def get_new_connection(self, conn_params):
+        pool = get_pool(self.alias, conn_params, self.settings_dict.get("POOL") or {})
+        connection = pool.acquire(
+            lambda: super(DatabaseWrapper, self).get_new_connection(conn_params)
+        )
+        self.isolation_level = self.settings_dict["OPTIONS"].get(
+            "isolation_level", connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            if self.in_atomic_block:
+                # Django keeps a reference to it until the block exits, it cannot be reused
+                self.pool.discard(self.connection)
+            else:
+                self.pool.release(self.connection)
+
+    def warm_up(self):
+        self.pool.warm_up(
+            lambda: super(DatabaseWrapper, self).get_new_connection(self.get_connection_params())
+        )
@@ -0,0 +1,169 @@
+import threading
+import time
+from collections import deque
+
+import structlog as logging
+from psycopg2 import OperationalError, extensions
+
+from id_manager import metrics
+
+LOGGER = logging.getLogger(__name__)
+
+POOL_WAIT = metrics.timer(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a pooled database connection",
+    ("alias",),
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+POOL_CONNECTIONS = metrics.gauge(
+    "db_pool_connections", "Pooled database connections", ("alias", "state")
+)
+POOL_TIMEOUTS = metrics.counter(
+    "db_pool_timeouts_total", "Requests for a pooled connection that timed out", ("alias",)
+)
+POOL_DISCARDED = metrics.counter(
+    "db_pool_discarded_total", "Pooled connections closed as broken or unusable", ("alias",)
+)
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """
+    A thread-safe pool of at most ``max_size`` psycopg2 connections. ``acquire`` waits up to
+    ``timeout`` seconds for one to be released once the pool is full, ``release`` rolls back
+    what the caller left open. Idle connections can be health-checked before being handed
+    out again (a ``SELECT 1`` when they were idle for ``health_check_after`` seconds).
+    """
+
+    def __init__(
+        self,
+        alias: str,
+        min_size: int = 1,
+        max_size: int = 10,
+        timeout: float = 30,
+        health_check_after: float = 30,
+    ):
+        if not 0 <= min_size <= max_size or max_size < 1:
+            raise ValueError(f"Invalid pool sizes: min {min_size}, max {max_size}")
+        self.alias = alias
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self._idle = deque()  # (connection, released at)
+        self._size = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, create):
+        """A connection from the pool, or a new one made by ``create()`` if there is room."""
+        start = time.monotonic()
+        deadline = start + self.timeout
+        while True:
+            with self._condition:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        POOL_TIMEOUTS.inc(alias=self.alias)
+                        raise PoolTimeout(
+                            f"No database connection available in the '{self.alias}' pool "
+                            f"after {self.timeout}s (max size {self.max_size})"
+                        )
+                    self._condition.wait(remaining)
+                if self._idle:
+                    connection, released_at = self._idle.pop()
+                else:
+                    connection, released_at = None, None
+                    self._size += 1
+                self._update_gauges()
+
+            if connection is None:
+                try:
+                    connection = create()
+                except Exception:
+                    self._forget()
+                    raise
+            elif not self._is_usable(connection, released_at):
+                self._discard(connection)
+                continue
+
+            POOL_WAIT.observe(time.monotonic() - start, alias=self.alias)
+            return connection
+
+    def release(self, connection):
+        if connection.closed:
+            self._forget()
+            return
+        try:
+            if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except Exception:
+            self._discard(connection)
+            return
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._update_gauges()
+            self._condition.notify()
+
+    def discard(self, connection):
+        self._discard(connection)
+
+    def warm_up(self, create):
+        """Open connections until ``min_size`` are available."""
+        while True:
+            with self._condition:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                connection = create()
+            except Exception:
+                self._forget()
+                raise
+            self.release(connection)
+
+    def close(self):
+        with self._condition:
+            idle, self._idle = self._idle, deque()
+        for connection, _ in idle:
+            self._discard(connection, count=False)
+
+    def stats(self) -> dict:
+        with self._condition:
+            return {"size": self._size, "idle": len(self._idle), "max_size": self.max_size}
+
+    def _is_usable(self, connection, released_at) -> bool:
+        if connection.closed:
+            return False
+        if time.monotonic() - released_at < self.health_check_after:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+            return True
+        except Exception as e:
+            LOGGER.info(f"db pool: {self.alias}: discarding broken connection: {e}")
+            return False
+
+    def _discard(self, connection, count=True):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        if count:
+            POOL_DISCARDED.inc(alias=self.alias)
+        self._forget()
+
+    def _forget(self):
+        with self._condition:
+            self._size -= 1
+            self._update_gauges()
+            self._condition.notify()
+
+    def _update_gauges(self):
+        POOL_CONNECTIONS.set(len(self._idle), alias=self.alias, state="idle")
+        POOL_CONNECTIONS.set(self._size - len(self._idle), alias=self.alias, state="in_use")
@@ -0,0 +1,54 @@
+"""
+``django_structlog``'s request logging, able to run in front of the async views: under ASGI,
+a middleware which is only sync would have Django run everything after it, the async views
+included, in the thread of the sync code.
+"""
+import asyncio
+import uuid
+
+import structlog
+from django_structlog import middlewares
+from ipware import get_client_ip
+
+LOGGER = structlog.getLogger("django_structlog.middlewares.request")
+
+
+class RequestMiddleware(middlewares.RequestMiddleware):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # as MiddlewareMixin: what tells Django to await us
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self._acall(request)
+        return super().__call__(request)
+
+    async def _acall(self, request):
+        # as the sync one, without binding the user: loading it is a query, which the
+        # async views do on their own
+        request_id = request.headers.get("x-request-id") or str(uuid.uuid4())
+        correlation_id = request.headers.get("x-correlation-id")
+        structlog.contextvars.bind_contextvars(request_id=request_id)
+        if correlation_id:
+            structlog.contextvars.bind_contextvars(correlation_id=correlation_id)
+        ip, _ = get_client_ip(request)
+        structlog.contextvars.bind_contextvars(ip=ip)
+        LOGGER.info(
+            "request_started",
+            request=self.format_request(request),
+            user_agent=request.META.get("HTTP_USER_AGENT"),
+        )
+        try:
+            response = await self.get_response(request)
+            LOGGER.info(
+                "request_finished", code=response.status_code, request=self.format_request(request)
+            )
+            return response
+        finally:
+            structlog.contextvars.clear_contextvars()
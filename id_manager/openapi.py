@@ -0,0 +1,99 @@
+"""
+The OpenAPI schema of the API, generated once per deploy instead of on every request.
+
+``python manage.py generate_openapi_schema`` writes it to ``OPENAPI_SCHEMA_DIR`` (run by
+``start.sh``); each process then reads those files once and serves them with a strong ETag.
+Without them, the schema is generated on first use and kept for the life of the process.
+"""
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, NamedTuple
+
+import structlog as logging
+from django.conf import settings
+from drf_yasg import openapi
+
+LOGGER = logging.getLogger(__name__)
+
+INFO = openapi.Info(
+    title="ID Manager API",
+    default_version="v1",
+    description="REST API definition for ID Manager",
+)
+
+CONTENT_TYPES = {
+    ".json": "application/json",
+    ".yaml": "application/yaml; charset=utf-8",
+}
+
+
+class Document(NamedTuple):
+    content: bytes
+    content_type: str
+    etag: str
+
+
+_documents: Dict[str, Document] = {}
+_lock = threading.Lock()
+
+
+def file_name(format: str) -> str:
+    return f"swagger{format}"
+
+
+def generate() -> Dict[str, bytes]:
+    """Introspect the views and serializers: the encoded schema per format."""
+    # not needed to serve a generated schema, so not imported by the workers
+    from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    schema = OpenAPISchemaGenerator(INFO).get_schema(request=None, public=True)
+    return {
+        ".json": OpenAPICodecJson(validators=[]).encode(schema),
+        ".yaml": OpenAPICodecYaml(validators=[]).encode(schema),
+    }
+
+
+def write(directory=None) -> list:
+    directory = Path(directory or settings.OPENAPI_SCHEMA_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for format, content in generate().items():
+        path = directory / file_name(format)
+        path.write_bytes(content)
+        paths.append(path)
+    return paths
+
+
+def _read() -> Dict[str, bytes]:
+    directory = Path(settings.OPENAPI_SCHEMA_DIR)
+    try:
+        return {format: (directory / file_name(format)).read_bytes() for format in CONTENT_TYPES}
+    except FileNotFoundError:
+        LOGGER.warning(
+            f"openapi: no schema in {directory}, generating it "
+            "(run the generate_openapi_schema command at deploy time)"
+        )
+        return generate()
+
+
+def load() -> Dict[str, Document]:
+    """The served documents, read or generated on the first call only."""
+    if not _documents:
+        with _lock:
+            if not _documents:
+                for format, content in _read().items():
+                    etag = f'"{hashlib.sha256(content).hexdigest()}"'
+                    _documents[format] = Document(content, CONTENT_TYPES[format], etag)
+    return _documents
+
+
+def get(format: str) -> Document:
+    return load()[format]
+
+
+def reset():
+    """Forget the loaded documents (after writing new ones)."""
+    with _lock:
+        _documents.clear()
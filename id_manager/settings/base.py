@@ -59,7 +59,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django.middleware.http.ConditionalGetMiddleware",
-    "django_structlog.middlewares.RequestMiddleware",
+    "id_manager.middleware.RequestMiddleware",
 ]
 
 ROOT_URLCONF = "id_manager.urls"
@@ -110,6 +110,7 @@ REST_FRAMEWORK = {
     ),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 10,
+    "EXCEPTION_HANDLER": "manager.exceptions.exception_handler",
 }
 
 # Internationalization
@@ -144,7 +145,73 @@ CREDENTIAL_CRAFTERS = {
     # "credential_definition_id": "module.CrafterClass"
 }
 
+# Days to keep issuance data around, see `manage.py prune_issuance_data` (None: keep forever)
+ISSUANCE_DATA_RETENTION = {
+    "superseded_invitations": 30,
+    "stale_invitations": 90,
+    "superseded_offers": 90,
+    "qr_codes": 30,
+}
+ISSUANCE_DATA_PRUNE_BATCH_SIZE = 500
+ISSUANCE_DATA_PRUNE_PAUSE = 0.1
+
+# Bulk POST /credential: items accepted per request and offers sent to ACA-Py concurrently
+CREDENTIAL_BULK_MAX_ITEMS = int(os.getenv("CREDENTIAL_BULK_MAX_ITEMS", 1000))
+CREDENTIAL_OFFER_CONCURRENCY = int(os.getenv("CREDENTIAL_OFFER_CONCURRENCY", 8))
+
+# Connection invitations created ahead of time per ACA-Py agent, see manager/invitation_pool.py
+# and `manage.py fill_invitation_pool`: refilled up to HIGH once fewer than LOW are left
+INVITATION_POOL_LOW = int(os.getenv("INVITATION_POOL_LOW", 50))
+INVITATION_POOL_HIGH = int(os.getenv("INVITATION_POOL_HIGH", 200))
+
+# Largest QR code version (1-40) given a higher error correction, see manager/qr_codes.py
+QR_CODE_MAX_VERSION = int(os.getenv("QR_CODE_MAX_VERSION", 20))
+
+# Where the QR code images are kept, shared by the nodes, see manager/qr_storage.py: a Django
+# storage class and its arguments
+QR_CODE_STORAGE = {
+    "BACKEND": "django.core.files.storage.FileSystemStorage",
+    "OPTIONS": {"location": os.getenv("QR_CODE_STORAGE_DIR", os.path.join(ROOT_DIR, "qr_codes"))},
+}
+
+# ACA-Py side effects, see manager/outbox.py and `manage.py dispatch_outbox`
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 5))
+OUTBOX_RETRY_BACKOFF = int(os.getenv("OUTBOX_RETRY_BACKOFF", 30))  # seconds, doubled per attempt
+OUTBOX_PROCESSING_TIMEOUT = int(os.getenv("OUTBOX_PROCESSING_TIMEOUT", 300))
+
+# Seconds values stay in the shared cache, per namespace (see manager/cache.py)
+CACHE_TIMEOUTS = {
+    "credential_definition": 300,
+    "deep_link": 60,
+    "ledger": 24 * 60 * 60,
+    "qr_code": 24 * 60 * 60,
+    "proof_template": 5 * 60,
+}
+
+# Token bucket budgets of the public endpoints, per client identity and for the whole scope,
+# as "<tokens>/<s|min|hour|day>" or None (see manager/throttling.py)
+ADMISSION_CONTROL = {
+    "deep_link": {"ip": "60/min", "code": "20/min", "global": "6000/min"},
+    "webhooks": {"ip": "6000/min", "global": "30000/min"},
+}
+# Answer 503 to every request of the public endpoints, to shed load
+ADMISSION_SHED_LOAD = False
+
+# Written by the generate_openapi_schema command, served by id_manager.views.OpenAPISchemaView
+OPENAPI_SCHEMA_DIR = ROOT_DIR / "openapi"
+SWAGGER_SETTINGS = {"SPEC_URL": ("schema-json", {"format": ".json"})}
+REDOC_SETTINGS = {"SPEC_URL": ("schema-json", {"format": ".json"})}
+
+# credential_data attributes included in the credential request search index (None: all)
+CREDENTIAL_REQUEST_SEARCH_ATTRIBUTES = None
+
 ACA_PY_WEBHOOKS_API_KEY = os.getenv("ACA_PY_WEBHOOKS_API_KEY")
+# Share of the webhooks logged on receipt (topic, state and a digest of the payload)
+WEBHOOKS_LOG_SAMPLE_RATE = float(os.getenv("WEBHOOKS_LOG_SAMPLE_RATE", 0.01))
+# Seconds between an accepted connection and the credential offer sent on it
+WEBHOOKS_OFFER_DELAY = int(os.getenv("WEBHOOKS_OFFER_DELAY", 5))
+# Events accepted at once by the batch webhook endpoint
+WEBHOOKS_BATCH_MAX_EVENTS = int(os.getenv("WEBHOOKS_BATCH_MAX_EVENTS", 1000))
 AWS_ACCESS_KEY_ID = os.environ.get("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = os.environ.get("AWS_SECRET_ACCESS_KEY")
 ICC_ID_MANAGER_AUTH_TOKEN = os.environ.get("ICC_ID_MANAGER_AUTH_TOKEN")
@@ -163,6 +230,30 @@ ACA_PY_TRANSPORT_URL = os.environ.get(
     "ACA_PY_TRANSPORT_URL", f"https://{ACA_PY_BASE_URL}:{ACAPY_TRANSPORT_PORT}"
 )
 
+# ACA-Py agents by name and the organizations each one serves, see aca/agents.py. Without
+# agents, "default" is ACA_PY_URL.
+ACA_PY_AGENTS = None
+ACA_PY_AGENT_ROUTES = {}
+# Seconds an ACA-Py instance that could not be reached is skipped for
+ACA_PY_AGENT_RETRY_AFTER = 30
+
+# Limits on the ACA-Py calls by endpoint (ACAClient method), see aca/resilience.py:
+# (connect, read) timeouts in seconds, calls in flight per agent and process, and the
+# consecutive failures opening the circuit of an agent for reset_after seconds.
+ACA_PY_TIMEOUTS = {
+    "default": (5, int(os.environ.get("ACA_PY_READ_TIMEOUT", 30))),
+    # written on the ledger
+    "create_schema": (5, 120),
+    "create_credential_definition": (5, 600),
+    "send_revocation_revoke": (5, 120),
+}
+ACA_PY_BULKHEADS = {
+    "default": 16,
+    "create_schema": 2,
+    "create_credential_definition": 2,
+}
+ACA_PY_BREAKER = {"failures": 5, "reset_after": 30}
+
 SEND_EMAILS = os.environ.get("SEND_EMAILS", False)
 DEFAULT_EMAIL_FROM = os.environ.get("DEFAULT_EMAIL_FROM", "")
 EMAIL_BACKEND = os.environ.get("EMAIL_BACKEND", "post_office.EmailBackend")
@@ -1,3 +1,4 @@
+import json
 import os
 
 from id_manager.settings.base import *
@@ -11,12 +12,20 @@ ROOT_DIR = Path(__file__).resolve(strict=True).parent.parent.parent
 
 ALLOWED_HOSTS = os.environ.get("ALLOWED_HOSTS", "*")
 
+# Shared by every process and node, see manager/cache.py
+CACHE_BACKEND = os.environ.get(
+    "CACHE_BACKEND", "django.core.cache.backends.memcached.PyMemcacheCache"
+)
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": os.environ.get("LOCATION", "default"),
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": os.environ.get("CACHE_LOCATION", "memcached:11211"),
+        "KEY_PREFIX": os.environ.get("CACHE_KEY_PREFIX", "id_manager"),
     }
 }
+if CACHE_BACKEND.endswith("PyMemcacheCache"):
+    # A memcached outage means cache misses, not errors
+    CACHES["default"]["OPTIONS"] = {"no_delay": True, "ignore_exc": True, "use_pooling": True}
 
 DATABASES = {
     "default": {
@@ -26,8 +35,35 @@ DATABASES = {
         "PASSWORD": os.environ.get("DB_PASSWORD", "change_me"),
         "HOST": os.environ.get("DB_HOST", "127.0.0.1"),
         "PORT": os.environ.get("DB_PORT", 5432),
+        # Seconds a connection is kept open for the next requests of the same thread
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 60)),
+    }
+}
+
+# Per-process connection pool shared by all the threads, see id_manager/db/backends
+if os.environ.get("DB_POOL", "False") == "True":
+    DATABASES["default"].update(
+        {
+            "ENGINE": "id_manager.db.backends.postgresql_pool",
+            "CONN_MAX_AGE": 0,
+            "POOL": {
+                "MIN_SIZE": int(os.environ.get("DB_POOL_MIN_SIZE", 2)),
+                "MAX_SIZE": int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+                "TIMEOUT": float(os.environ.get("DB_POOL_TIMEOUT", 30)),
+                "HEALTH_CHECK_AFTER": float(os.environ.get("DB_POOL_HEALTH_CHECK_AFTER", 30)),
+            },
+        }
+    )
+
+# e.g. ADMISSION_DEEP_LINK_CODE=10/min, "none" to lift a budget
+ADMISSION_CONTROL = {
+    scope: {
+        name: os.environ.get(f"ADMISSION_{scope.upper()}_{name.upper()}", rate)
+        for name, rate in budgets.items()
     }
+    for scope, budgets in ADMISSION_CONTROL.items()
 }
+ADMISSION_SHED_LOAD = os.environ.get("ADMISSION_SHED_LOAD", "False") == "True"
 
 ORGANIZATION = os.environ.get("ORGANIZATION", "UNOG")
 SITE_URL = os.environ.get("SITE_URL")
@@ -43,6 +79,28 @@ ACA_PY_URL = os.environ.get("ACA_PY_URL", f"https://{ACA_PY_BASE_URL}:{ACAPY_ADM
 ACA_PY_TRANSPORT_URL = os.environ.get(
     "ACA_PY_TRANSPORT_URL", f"https://{ACA_PY_BASE_URL}:{ACAPY_TRANSPORT_PORT}"
 )
+# JSON, e.g. ACA_PY_AGENTS='{"default": {"urls": [...], "transport_url": "..."}, "eu": {...}}'
+# and ACA_PY_AGENT_ROUTES='{"UNHCR": "eu"}'
+ACA_PY_AGENTS = json.loads(os.environ.get("ACA_PY_AGENTS") or "null")
+ACA_PY_AGENT_ROUTES = json.loads(os.environ.get("ACA_PY_AGENT_ROUTES") or "{}")
+
+# QR code images, e.g. in an S3 or MinIO bucket with storages.backends.s3boto3.S3Boto3Storage
+QR_CODE_STORAGE = {
+    "BACKEND": os.environ.get("QR_CODE_STORAGE_BACKEND", QR_CODE_STORAGE["BACKEND"]),
+    "OPTIONS": json.loads(os.environ.get("QR_CODE_STORAGE_OPTIONS") or "null")
+    or QR_CODE_STORAGE["OPTIONS"],
+}
+ACA_PY_AGENT_RETRY_AFTER = int(os.environ.get("ACA_PY_AGENT_RETRY_AFTER", 30))
+
+# ASGI: served by uvicorn workers (see start.sh), with the async views on the busiest paths
+ASGI = os.environ.get("ASGI", "False") == "True"
+if ASGI:
+    ROOT_URLCONF = "id_manager.urls_async"
+    # an ACA-Py call waiting in the event loop holds no thread: many more can be in flight
+    ACA_PY_BULKHEADS = {
+        **ACA_PY_BULKHEADS,
+        "default": int(os.environ.get("ACA_PY_ASYNC_BULKHEAD", 500)),
+    }
 
 
 # EMAIL
@@ -1,10 +1,24 @@
+import tempfile
+
 from .base import *
 
 DATABASES = {"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}}
 
+# Stand-in for the shared memcached: visible to every process, unlike LocMemCache
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.path.join(tempfile.gettempdir(), "id_manager_test_cache"),
+    }
+}
+
 ROOT_DIR = Path(__file__).resolve(strict=True).parent.parent.parent
+OPENAPI_SCHEMA_DIR = Path(tempfile.gettempdir()) / "id_manager_test_openapi"
 SITE_URL = "http://test.com"
 
+# Stand-in for an S3-compatible bucket, see manager/tests/storage.py
+QR_CODE_STORAGE = {"BACKEND": "manager.tests.storage.ObjectStorage"}
+
 ACA_PY_WEBHOOKS_API_KEY = "1234"
 
 ORGANIZATION = "ICC_TEST"
@@ -21,3 +35,6 @@ EMAIL_USE_TLS = False
 EMAIL_BACKEND = "post_office.EmailBackend"
 
 SEND_EMAILS = True
+
+# Logged on demand by the tests
+WEBHOOKS_LOG_SAMPLE_RATE = 0
@@ -0,0 +1,201 @@
+import threading
+
+import pytest
+from django.db.backends.postgresql import base as postgresql
+from psycopg2 import extensions
+
+from id_manager.db.backends.postgresql_pool.base import DatabaseWrapper, close_pools
+from id_manager.db.backends.postgresql_pool.pool import POOL_WAIT, ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self, broken=False):
+        self.closed = False
+        self.broken = broken
+        self.in_transaction = False
+        self.rollbacks = 0
+        self.isolation_level = None
+
+    def get_transaction_status(self):
+        if self.in_transaction:
+            return extensions.TRANSACTION_STATUS_INTRANS
+        return extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        self.in_transaction = False
+        self.rollbacks += 1
+
+    def cursor(self):
+        connection = self
+
+        class Cursor:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                pass
+
+            def execute(self, sql):
+                if connection.broken:
+                    raise Exception("server closed the connection unexpectedly")
+
+        return Cursor()
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def created():
+    return []
+
+
+@pytest.fixture
+def create(created):
+    def create():
+        connection = FakeConnection()
+        created.append(connection)
+        return connection
+
+    return create
+
+
+def test_reuses_released_connections(create, created):
+    pool = ConnectionPool("test-reuse", max_size=2)
+
+    connection = pool.acquire(create)
+    pool.release(connection)
+
+    assert pool.acquire(create) is connection
+    assert len(created) == 1
+    assert POOL_WAIT.value(alias="test-reuse")[0] == 2
+
+
+def test_rolls_back_on_release(create):
+    pool = ConnectionPool("test", max_size=1)
+    connection = pool.acquire(create)
+    connection.in_transaction = True
+
+    pool.release(connection)
+
+    assert connection.rollbacks == 1
+    assert pool.stats() == {"size": 1, "idle": 1, "max_size": 1}
+
+
+def test_times_out_when_exhausted(create):
+    pool = ConnectionPool("test", max_size=1, timeout=0.01)
+    pool.acquire(create)
+
+    with pytest.raises(PoolTimeout):
+        pool.acquire(create)
+
+
+def test_waits_for_a_released_connection(create, created):
+    pool = ConnectionPool("test", max_size=1, timeout=5)
+    connection = pool.acquire(create)
+    timer = threading.Timer(0.05, pool.release, (connection,))
+    timer.start()
+
+    assert pool.acquire(create) is connection
+    assert len(created) == 1
+    timer.join()
+
+
+def test_health_check_replaces_broken_connections(create, created):
+    pool = ConnectionPool("test", max_size=1, health_check_after=0)
+    connection = pool.acquire(create)
+    pool.release(connection)
+    connection.broken = True
+
+    replacement = pool.acquire(create)
+
+    assert replacement is not connection
+    assert connection.closed
+    assert pool.stats()["size"] == 1
+
+
+def test_closed_connections_are_not_pooled(create):
+    pool = ConnectionPool("test", max_size=1)
+    connection = pool.acquire(create)
+    connection.close()
+
+    pool.release(connection)
+
+    assert pool.stats() == {"size": 0, "idle": 0, "max_size": 1}
+
+
+def test_failed_creation_frees_the_slot():
+    pool = ConnectionPool("test", max_size=1)
+
+    def fail():
+        raise Exception("could not connect")
+
+    with pytest.raises(Exception):
+        pool.acquire(fail)
+    assert pool.stats()["size"] == 0
+
+
+def test_warm_up_and_close(create, created):
+    pool = ConnectionPool("test", min_size=2, max_size=3)
+
+    pool.warm_up(create)
+    assert len(created) == 2
+    assert pool.stats() == {"size": 2, "idle": 2, "max_size": 3}
+
+    pool.close()
+    assert all(connection.closed for connection in created)
+    assert pool.stats()["size"] == 0
+
+
+def test_invalid_sizes():
+    with pytest.raises(ValueError):
+        ConnectionPool("test", min_size=3, max_size=2)
+
+
+class TestDatabaseWrapper:
+    settings_dict = {
+        "ENGINE": "id_manager.db.backends.postgresql_pool",
+        "NAME": "pooled",
+        "USER": "",
+        "PASSWORD": "",
+        "HOST": "",
+        "PORT": "",
+        "OPTIONS": {},
+        "ATOMIC_REQUESTS": False,
+        "AUTOCOMMIT": True,
+        "CONN_MAX_AGE": 0,
+        "TIME_ZONE": None,
+        "TEST": {},
+        "POOL": {"MIN_SIZE": 1, "MAX_SIZE": 2},
+    }
+
+    @pytest.fixture
+    def wrapper(self, mocker, create):
+        mocker.patch.object(
+            postgresql.DatabaseWrapper, "get_new_connection", side_effect=lambda params: create()
+        )
+        yield DatabaseWrapper(dict(self.settings_dict), alias="pooled")
+        close_pools()
+
+    def test_close_gives_the_connection_back(self, wrapper, created):
+        wrapper.connection = wrapper.get_new_connection(wrapper.get_connection_params())
+        wrapper.close()
+
+        assert wrapper.connection is None
+        assert not created[0].closed
+        assert wrapper.pool.stats() == {"size": 1, "idle": 1, "max_size": 2}
+        assert wrapper.get_new_connection(wrapper.get_connection_params()) is created[0]
+
+    def test_closed_inside_atomic_block_is_discarded(self, wrapper, created):
+        wrapper.connection = wrapper.get_new_connection(wrapper.get_connection_params())
+        wrapper.in_atomic_block = True
+        wrapper.close()
+
+        assert created[0].closed
+        assert wrapper.pool.stats()["size"] == 0
+
+    def test_warm_up(self, wrapper, created):
+        wrapper.warm_up()
+
+        assert len(created) == 1
+        assert wrapper.pool.stats()["idle"] == 1
@@ -0,0 +1,84 @@
+import pytest
+from rest_framework import status
+
+from id_manager import metrics
+
+
+@pytest.fixture
+def registry():
+    return metrics.Registry()
+
+
+def test_counter(registry):
+    requests = registry.register(metrics.Counter, "requests_total", "Requests", ("view",))
+    requests.inc(view="a")
+    requests.inc(2, view="a")
+    requests.inc(view='b"c')
+
+    assert requests.value(view="a") == 3
+    assert registry.render() == (
+        "# HELP requests_total Requests\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{view="a"} 3\n'
+        'requests_total{view="b\\"c"} 1\n'
+    )
+
+
+def test_labels_must_match(registry):
+    requests = registry.register(metrics.Counter, "requests_total", "Requests", ("view",))
+    with pytest.raises(ValueError):
+        requests.inc(other="a")
+
+
+def test_register_once(registry):
+    gauge = registry.register(metrics.Gauge, "size", "Size")
+    assert registry.register(metrics.Gauge, "size", "Size") is gauge
+    with pytest.raises(ValueError):
+        registry.register(metrics.Counter, "size", "Size")
+
+
+def test_gauge(registry):
+    size = registry.register(metrics.Gauge, "size", "Size")
+    size.set(5)
+    size.dec(2)
+    assert size.value() == 3
+
+
+def test_timer(registry):
+    wait = registry.register(metrics.Timer, "wait_seconds", "Wait", buckets=(0.1, 1))
+    wait.observe(0.05)
+    wait.observe(0.5)
+    with wait.time():
+        pass
+
+    count, total = wait.value()
+    assert count == 3
+    assert 0.55 <= total < 0.6
+    rendered = registry.render()
+    assert 'wait_seconds_bucket{le="0.1"} 2' in rendered
+    assert 'wait_seconds_bucket{le="1"} 3' in rendered
+    assert 'wait_seconds_bucket{le="+Inf"} 3' in rendered
+    assert "wait_seconds_count 3" in rendered
+
+
+@pytest.mark.django_db
+class TestMetricsView:
+    url = "/metrics"
+
+    def test_staff_only(self, api_client, django_user_model):
+        assert api_client.get(self.url).status_code == status.HTTP_401_UNAUTHORIZED
+
+        user = django_user_model.objects.create_user(username="someone")
+        api_client.force_authenticate(user)
+        assert api_client.get(self.url).status_code == status.HTTP_403_FORBIDDEN
+
+    def test_renders_registry(self, api_client_admin, admin_user):
+        admin_user.is_staff = True
+        admin_user.save()
+        metrics.counter("test_view_total", "Test").inc()
+
+        response = api_client_admin.get(self.url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"].startswith("text/plain")
+        assert "test_view_total 1" in response.content.decode()
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from drf_yasg.generators import OpenAPISchemaGenerator
+from rest_framework import status
+
+from id_manager import openapi
+
+
+@pytest.fixture(autouse=True)
+def schema_dir(settings, tmp_path):
+    settings.OPENAPI_SCHEMA_DIR = tmp_path
+    openapi.reset()
+    yield tmp_path
+    openapi.reset()
+
+
+def test_command_writes_the_schema(schema_dir):
+    call_command("generate_openapi_schema")
+
+    schema = json.loads((schema_dir / "swagger.json").read_bytes())
+    assert schema["info"]["title"] == "ID Manager API"
+    assert "/credential" in schema["paths"]
+    assert (schema_dir / "swagger.yaml").read_bytes().startswith(b"swagger: '2.0'")
+
+
+def test_served_from_the_artifact(api_client, schema_dir, mocker):
+    call_command("generate_openapi_schema")
+    (schema_dir / "swagger.json").write_bytes(b'{"swagger": "2.0"}')
+    generate = mocker.spy(openapi, "generate")
+
+    response = api_client.get(reverse("schema-json", kwargs={"format": ".json"}))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.content == b'{"swagger": "2.0"}'
+    assert response["Content-Type"] == "application/json"
+    generate.assert_not_called()
+
+
+def test_generated_once_without_artifact(api_client, mocker):
+    generate = mocker.spy(openapi, "generate")
+
+    for format in (".json", ".yaml", ".json"):
+        response = api_client.get(reverse("schema-json", kwargs={"format": format}))
+        assert response.status_code == status.HTTP_200_OK
+
+    generate.assert_called_once()
+
+
+def test_strong_etag(api_client):
+    url = reverse("schema-json", kwargs={"format": ".json"})
+    response = api_client.get(url)
+    etag = response["ETag"]
+
+    assert not etag.startswith("W/")
+    assert "no-cache" in response["Cache-Control"]
+
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+    assert response["ETag"] == etag
+
+    assert api_client.get(url, HTTP_IF_NONE_MATCH='"other"').status_code == status.HTTP_200_OK
+
+
+@pytest.mark.parametrize("name", ["schema-swagger-ui", "schema-redoc"])
+def test_ui_points_to_the_served_schema(api_client, mocker, name):
+    generate = mocker.spy(openapi, "generate")
+    get_schema = mocker.spy(OpenAPISchemaGenerator, "get_schema")
+
+    response = api_client.get(reverse(name))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert b"/swagger.json" in response.content
+    assert b"ID Manager API" in response.content
+    generate.assert_not_called()
+    get_schema.assert_not_called()
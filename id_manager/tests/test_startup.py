@@ -0,0 +1,50 @@
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management import call_command
+
+from manager.management.commands.profile_startup import parse_import_times
+
+DEFERRED_MODULES = ("qrcode", "drf_yasg.views", "drf_yasg.codecs", "drf_yasg.generators")
+
+
+def test_heavy_modules_not_imported_at_startup():
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            "from id_manager.wsgi import application\n"
+            "from django.urls import get_resolver\n"
+            "get_resolver().url_patterns",
+        ],
+        cwd=settings.ROOT_DIR,
+        env={"DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE, "PATH": ""},
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+
+    modules = parse_import_times(output)
+    assert "manager.utils" in modules
+    assert not [module for module in DEFERRED_MODULES if module in modules]
+
+
+def test_parse_import_times():
+    output = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |     qrcode.main\n"
+        "import time:        80 |        200 |   qrcode\n"
+    )
+
+    assert parse_import_times(output) == {"qrcode.main": (120, 120, 2), "qrcode": (80, 200, 1)}
+
+
+def test_profile_startup(capsys):
+    call_command("profile_startup", runs=1, top=3)
+
+    output = capsys.readouterr().out
+    assert "first request ready" in output
+    assert "django" in output
@@ -18,33 +18,23 @@ from django.conf.urls import url
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
-from drf_yasg import openapi
-from drf_yasg.views import get_schema_view
-from rest_framework import permissions
 
-schema_view = get_schema_view(
-    openapi.Info(
-        title="ID Manager API",
-        default_version="v1",
-        description="REST API definition for ID Manager",
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
+from id_manager.views import MetricsView, OpenAPISchemaView, SchemaUIView
 
 urlpatterns = [
     url(
         r"^swagger(?P<format>\.json|\.yaml)$",
-        schema_view.without_ui(cache_timeout=0),
+        OpenAPISchemaView.as_view(),
         name="schema-json",
     ),
     url(
         r"^swagger/$",
-        schema_view.with_ui("swagger", cache_timeout=0),
+        SchemaUIView.as_view(renderer="swagger"),
         name="schema-swagger-ui",
     ),
-    url(r"^redoc/$", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"),
+    url(r"^redoc/$", SchemaUIView.as_view(renderer="redoc"), name="schema-redoc"),
     path("admin/", admin.site.urls),
+    path("metrics", MetricsView.as_view(), name="metrics"),
     path("qr_code/", include("qr_code.urls", namespace="qr_code")),
     path("", include("manager.urls")),
 ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -0,0 +1,18 @@
+"""
+The URL configuration under ASGI (``ASGI=True``): the async views of ``manager.async_views``
+take over the paths of their sync counterparts, the rest is ``id_manager.urls``.
+"""
+from django.urls import include, path
+
+from manager import async_views
+
+urlpatterns = [
+    path("webhooks/<str:api_key>/topic/<str:topic>/", async_views.webhooks, name="webhooks"),
+    path(
+        "deep-link-redirect/<str:code>",
+        async_views.deep_link_redirect,
+        name="deep_link_redirect",
+    ),
+    path("credential", async_views.credential, name="credential"),
+    path("", include("id_manager.urls")),
+]
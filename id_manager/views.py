@@ -0,0 +1,63 @@
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views import View
+from django.views.generic import TemplateView
+from rest_framework import permissions
+from rest_framework.authentication import SessionAuthentication, TokenAuthentication
+from rest_framework.views import APIView
+
+from id_manager import metrics, openapi
+
+
+class MetricsView(APIView):
+    """Prometheus text exposition of ``id_manager.metrics``, for staff users only."""
+
+    authentication_classes = (TokenAuthentication, SessionAuthentication)
+    permission_classes = (permissions.IsAdminUser,)
+    swagger_schema = None
+
+    def get(self, request):
+        return HttpResponse(
+            metrics.registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+
+
+class OpenAPISchemaView(View):
+    """
+    The pre-generated OpenAPI schema (see ``id_manager.openapi``). Clients revalidate it with
+    its strong ETag and get a 304 until the next deploy changes it.
+    """
+
+    def get(self, request, format):
+        document = openapi.get(format)
+        response = get_conditional_response(request, etag=document.etag)
+        if response is None:
+            response = HttpResponse(document.content, content_type=document.content_type)
+        response["ETag"] = document.etag
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+
+class SchemaUIView(TemplateView):
+    """
+    drf_yasg's Swagger UI or ReDoc page. It only points at ``SPEC_URL``, the pre-generated
+    schema served by ``OpenAPISchemaView``: no schema is generated to render it.
+    """
+
+    renderer = None
+
+    def get_template_names(self):
+        return [self._renderer().template]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["request"] = self.request
+        self._renderer().set_context(context)
+        context["title"] = openapi.INFO.title
+        return context
+
+    def _renderer(self):
+        # drf_yasg's renderers import its codecs, which the workers do not need otherwise
+        from drf_yasg.renderers import ReDocRenderer, SwaggerUIRenderer
+
+        return {"swagger": SwaggerUIRenderer, "redoc": ReDocRenderer}[self.renderer]()
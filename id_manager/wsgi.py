@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "id_manager.settings")
 
 application = get_wsgi_application()
+
+from id_manager import openapi  # noqa: E402 (needs the settings loaded)
+from id_manager.db import warm_up_connections  # noqa: E402
+
+warm_up_connections()
+openapi.load()
@@ -1,8 +1,10 @@
 from django.contrib import admin, messages
 from django.http import HttpResponseRedirect
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.safestring import mark_safe
 
+from manager.credential_workflow import connection_agent, credential_request_revoke
 from manager.handlers import ACAPy
 from manager.models import (
     ConnectionInvitation,
@@ -10,8 +12,14 @@ from manager.models import (
     CredentialOffer,
     CredentialRequest,
     Organization,
+    OutboxMessage,
+    PooledInvitation,
+    ProofDefinition,
+    ProofRequest,
     Schema,
 )
+from manager.pagination import EstimatedCountPaginator
+from manager.search import search_credential_requests
 
 
 @admin.register(Organization)
@@ -43,7 +51,11 @@ class SchemaAdmin(admin.ModelAdmin):
         return super().response_change(request, obj)
 
     def upload_schema(self, instance):
-        instance.schema_id = ACAPy().create_schema(instance.schema_json).get("schema_id")
+        instance.schema_id = (
+            ACAPy(organization=instance.organization_id)
+            .create_schema(instance.schema_json)
+            .get("schema_id")
+        )
         instance.save()
 
 
@@ -82,7 +94,7 @@ class CredentialDefinitionAdmin(admin.ModelAdmin):
 
     def upload_cred_def(self, instance):
         instance.credential_id = (
-            ACAPy()
+            ACAPy(organization=instance.schema.organization_id)
             .create_credential_definition(instance.credential_json())
             .get("credential_definition_id")
         )
@@ -99,6 +111,7 @@ class CredentialRequestAdmin(admin.ModelAdmin):
         "invitation_url",
         "connection",
         "credential",
+        "status",
         "revoked_credential",
         "creator",
         "created",
@@ -107,48 +120,49 @@ class CredentialRequestAdmin(admin.ModelAdmin):
     )
     list_display_links = ("id",)
     list_filter = (
+        "status",
         "credential_definition",
         "organization",
     )
     readonly_fields = [
         "revoked_credential",
+        "status",
+        "connected_at",
+        "offered_at",
+        "issued_at",
+        "revoked_at",
     ]
-    search_fields = (
-        "organization",
-        "credential_data",
-        "creator__username",
-        "creator__first_name",
-        "creator__last_name",
-        "credential_definition__name",
-        "credential_definition__credential_id",
-    )
+    list_select_related = ("credential_definition", "creator", "organization")
+    search_fields = ("search_document",)
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
     actions = ["revoke_credential_request"]
 
+    def get_search_results(self, request, queryset, search_term):
+        return search_credential_requests(queryset, search_term), False
+
     @admin.action(description="Revoke credential request")
     def revoke_credential_request(self, request, queryset):
         for cred_request in queryset:
             cred_offer = cred_request.credential_offers.first()
 
             try:
-                ACAPy().send_revoke_credential(
+                ACAPy(agent=connection_agent(cred_offer.connection_id)).send_revoke_credential(
                     {"cred_ex_id": cred_offer.cred_ex_id, "publish": True}
                 )
-                cred_request.revoked_credential = True
-                cred_request.save()
+                credential_request_revoke(cred_request)
                 self.message_user(request, "Credential request revoked", messages.SUCCESS)
 
             except Exception:
                 cred_request.revoked_credential = False
-                cred_request.save()
+                cred_request.save(update_fields=["revoked_credential"])
                 self.message_user(request, "Error revoking credential request", messages.ERROR)
 
     def connection(self, item):
-        connection_invitation = item.connection_invitations.order_by("-created").first()
-        return connection_invitation.accepted if connection_invitation else False
+        return item.is_connected
 
     def credential(self, item):
-        credential_offer = item.credential_offers.order_by("-created").first()
-        return credential_offer.accepted if credential_offer else False
+        return item.is_issued
 
     connection.boolean = True
     credential.boolean = True
@@ -192,3 +206,49 @@ class CredentialOfferAdmin(admin.ModelAdmin):
     list_display_links = ("id",)
     list_filter = ("accepted",)
     search_fields = ("connection_id",)
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ("id", "action", "status", "attempts", "available_at", "created", "modified")
+    list_display_links = ("id",)
+    list_filter = ("status", "action")
+    readonly_fields = ("attempts", "last_error", "result")
+    actions = ["retry_messages"]
+
+    @admin.action(description="Dispatch again")
+    def retry_messages(self, request, queryset):
+        retried = queryset.exclude(status=OutboxMessage.Status.DONE).update(
+            status=OutboxMessage.Status.PENDING, available_at=timezone.now()
+        )
+        self.message_user(
+            request, f"{retried} message(s) will be dispatched again", messages.SUCCESS
+        )
+
+
+@admin.register(PooledInvitation)
+class PooledInvitationAdmin(admin.ModelAdmin):
+    list_display = ("id", "connection_id", "agent", "created")
+    list_display_links = ("id",)
+    list_filter = ("agent",)
+    search_fields = ("connection_id",)
+    readonly_fields = ("invitation_json",)
+
+
+@admin.register(ProofDefinition)
+class ProofDefinitionAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "organization", "enabled", "creator", "created")
+    list_display_links = ("id",)
+    list_filter = ("enabled",)
+    search_fields = ("name", "creator__username")
+
+
+@admin.register(ProofRequest)
+class ProofRequestAdmin(admin.ModelAdmin):
+    list_display = ("id", "code", "proof_definition", "status", "verified_at", "created")
+    list_display_links = ("id",)
+    list_filter = ("status", "proof_definition")
+    search_fields = ("code", "presentation_exchange_id", "thread_id")
+    readonly_fields = ("presentation_json", "revealed_attributes")
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
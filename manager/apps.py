@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class ManagerConfig(AppConfig):
     name = "manager"
+
+    def ready(self):
+        from credential_crafters.registry import registry
+        from manager import signals  # noqa: F401
+
+        registry.load()
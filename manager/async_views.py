@@ -0,0 +1,153 @@
+"""
+Async variants of the views taking most of the traffic, served by ``id_manager.urls_async``
+when the app runs under ASGI (``ASGI=True``): the webhooks, the deep link redirect and the
+credential offers. They answer as their sync counterparts in ``manager.views``, except for
+the deep links of unknown or already issued credential requests: a 404 rather than a 500.
+
+While ACA-Py answers, a request waits in the event loop instead of holding a worker thread:
+ACA-Py is called through ``aca.async_client``. Django 3.2 has no async ORM, so the queries
+run in the thread of the sync code through ``sync_to_async``, one short step at a time.
+Accepted connections queue their offers in the outbox (as the batch webhooks do) instead of
+sleeping ``WEBHOOKS_OFFER_DELAY`` before sending them.
+"""
+import functools
+import math
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import HttpResponse, HttpResponseNotAllowed, HttpResponseRedirect, JsonResponse
+from rest_framework import exceptions, status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.parsers import JSONParser
+
+from aca.resilience import ACAPyUnavailable
+from manager import cache, outbox, webhook_handlers
+from manager.credential_workflow import DEEP_LINK_CACHE, acredential_offers_bulk_create
+from manager.handlers import CredentialOfferHandler
+from manager.models import CredentialRequest
+from manager.serializers import CredentialItemSerializer, CredentialSerializer
+from manager.throttling import admit, client_ip
+from manager.views import CredentialView, _reject_webhook, _webhook_message
+
+
+def _post_only(view):
+    """
+    ``csrf_exempt`` and ``require_POST`` for a coroutine view: Django 3.2's decorators wrap it
+    in a sync function, which would have it run in a thread.
+    """
+
+    @functools.wraps(view)
+    async def wrapped(request, *args, **kwargs):
+        if request.method != "POST":
+            return HttpResponseNotAllowed(["POST"])
+        return await view(request, *args, **kwargs)
+
+    wrapped.csrf_exempt = True
+    return wrapped
+
+
+def _retry_later(status_code: int, retry_after: float) -> HttpResponse:
+    response = JsonResponse({"detail": "Try again later."}, status=status_code)
+    response["Retry-After"] = math.ceil(retry_after)
+    return response
+
+
+def _problem(error: exceptions.APIException) -> JsonResponse:
+    """The answer of DRF's exception handler to ``error``."""
+    detail = error.detail if isinstance(error.detail, (list, dict)) else {"detail": error.detail}
+    response = JsonResponse(detail, status=error.status_code, safe=False)
+    if isinstance(error, exceptions.NotAuthenticated):
+        response["WWW-Authenticate"] = TokenAuthentication().authenticate_header(None)
+    return response
+
+
+@_post_only
+async def webhooks(request, api_key, topic):
+    rejected = await sync_to_async(_reject_webhook)(request, api_key, topic)
+    if rejected is not None:
+        return rejected
+
+    message = _webhook_message(request, topic)
+    if message is not None:
+        # the batch handlers queue the follow-up ACA-Py calls instead of waiting for them
+        await sync_to_async(webhook_handlers.dispatch)(topic, [message], batch=True)
+
+    return HttpResponse()
+
+
+async def deep_link_redirect(request, code):
+    if request.method not in ("GET", "HEAD"):
+        return HttpResponseNotAllowed(["GET", "HEAD"])
+    decision = await sync_to_async(admit)("deep_link", {"ip": client_ip(request), "code": code})
+    if not decision.admitted:
+        return _retry_later(decision.status, decision.retry_after)
+
+    async def invitation_b64():
+        return (await CredentialOfferHandler.aget_credential_offer(code))[1]
+
+    try:
+        invitation_b64 = await cache.aget_or_set(
+            DEEP_LINK_CACHE, code, invitation_b64, timeout=settings.CACHE_TIMEOUTS["deep_link"]
+        )
+    except (ObjectDoesNotExist, RuntimeError):
+        return JsonResponse({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+    except ACAPyUnavailable as error:
+        return _retry_later(status.HTTP_503_SERVICE_UNAVAILABLE, error.retry_after)
+
+    return HttpResponseRedirect(f"didcomm://launch?c_i={invitation_b64}")
+
+
+def _authenticate(request):
+    """The user of the token of ``request``, as ``CredentialView`` authenticates it."""
+    authenticated = TokenAuthentication().authenticate(request)
+    if authenticated is None:
+        raise exceptions.NotAuthenticated()
+    return authenticated[0]
+
+
+def _validated(serializer):
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data
+
+
+@_post_only
+async def credential(request):
+    try:
+        creator = await sync_to_async(_authenticate)(request)
+        data = JSONParser().parse(request)
+        if isinstance(data, list):
+            return await _offer_many(data, creator)
+        return await _offer_one(data, creator)
+    except exceptions.APIException as error:
+        return _problem(error)
+    except ACAPyUnavailable as error:
+        return _retry_later(status.HTTP_503_SERVICE_UNAVAILABLE, error.retry_after)
+
+
+async def _offer_one(data: dict, creator) -> JsonResponse:
+    validated_data = await sync_to_async(_validated)(CredentialSerializer(data=data))
+    cred_request, message = await sync_to_async(CredentialView.enqueue_offer)(
+        validated_data, creator
+    )
+    message = await outbox.adispatch(message.id) or message
+    body, status_code = CredentialView.offer_outcome(message, validated_data, cred_request)
+    return JsonResponse(body, status=status_code)
+
+
+async def _offer_many(data: list, creator) -> JsonResponse:
+    max_items = settings.CREDENTIAL_BULK_MAX_ITEMS
+    if len(data) > max_items:
+        raise exceptions.ValidationError(
+            f"At most {max_items} credentials can be offered per request"
+        )
+    items = await sync_to_async(_validated)(
+        CredentialItemSerializer(data=data, many=True, allow_empty=False)
+    )
+    results = await acredential_offers_bulk_create(items, creator)
+    all_offered = all(result["status"] == CredentialRequest.Status.OFFERED for result in results)
+    return JsonResponse(
+        results,
+        status=status.HTTP_201_CREATED if all_offered else status.HTTP_207_MULTI_STATUS,
+        safe=False,
+    )
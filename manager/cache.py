@@ -0,0 +1,185 @@
+"""
+Helpers over the shared Django cache (memcached in production, see the settings).
+
+Keys live in namespaces, each with a version stored in the cache itself: ``invalidate``
+bumps it, which orphans every key of the namespace at once on every node. Reads fetch the
+version together with the key of the version this process saw last, in one round-trip unless
+the version changed since. ``get_or_set``
+lets a single caller compute a missing value while the concurrent ones wait for it, instead
+of all of them hitting the database or ACA-Py at the same time.
+"""
+import asyncio
+import hashlib
+import time
+from typing import Callable, Optional
+
+import structlog as logging
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+
+LOGGER = logging.getLogger(__name__)
+
+# memcached keys: at most 250 characters, no spaces nor control characters
+MAX_KEY_LENGTH = 200
+
+_NONE = "__none__"
+
+
+def _unwrap(value):
+    return None if isinstance(value, str) and value == _NONE else value
+
+
+def get_cache():
+    return caches["default"]
+
+
+def _version(namespace: str) -> int:
+    cache = get_cache()
+    version_key = f"{namespace}:version"
+    version = cache.get(version_key)
+    if version is None:
+        cache.add(version_key, 1, timeout=None)
+        version = cache.get(version_key, 1)
+    return version
+
+
+# the last version of each namespace seen by this process
+_versions = {}
+
+
+def _versioned_key(namespace: str, version: int, key) -> str:
+    key = str(key)
+    if len(key) > MAX_KEY_LENGTH or any(ord(char) <= 32 or ord(char) == 127 for char in key):
+        key = hashlib.sha256(key.encode()).hexdigest()
+    return f"{namespace}:v{version}:{key}"
+
+
+def make_key(namespace: str, key) -> str:
+    version = _versions[namespace] = _version(namespace)
+    return _versioned_key(namespace, version, key)
+
+
+def _lookup(namespace: str, key, default=None) -> (str, object):
+    """
+    The cache key of ``key`` and its value (``default`` when missing), read along with the
+    version of ``namespace``: a second round-trip only when the version changed.
+    """
+    cache = get_cache()
+    version_key = f"{namespace}:version"
+    seen = _versions.get(namespace, 1)
+    cache_key = _versioned_key(namespace, seen, key)
+    found = cache.get_many([version_key, cache_key])
+    version = found.get(version_key)
+    if version is None:
+        version = _version(namespace)
+    _versions[namespace] = version
+    if version != seen:
+        cache_key = _versioned_key(namespace, version, key)
+        return cache_key, cache.get(cache_key, default)
+    return cache_key, found.get(cache_key, default)
+
+
+def get(namespace: str, key, default=None):
+    _, value = _lookup(namespace, key, default)
+    return _unwrap(value)
+
+
+def set(namespace: str, key, value, timeout: Optional[int] = None):
+    get_cache().set(make_key(namespace, key), _NONE if value is None else value, timeout)
+
+
+def delete(namespace: str, key):
+    get_cache().delete(make_key(namespace, key))
+
+
+def invalidate(namespace: str):
+    """Forget every key of ``namespace``."""
+    cache = get_cache()
+    version_key = f"{namespace}:version"
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        cache.add(version_key, 2, timeout=None)
+
+
+def get_or_set(
+    namespace: str,
+    key,
+    compute: Callable,
+    timeout: Optional[int] = None,
+    lock_timeout: float = 10,
+    poll_interval: float = 0.05,
+):
+    """
+    The cached value, or ``compute()`` stored for ``timeout`` seconds. While one caller
+    computes it, the others poll for up to ``lock_timeout`` seconds before computing it
+    themselves. ``None`` results are cached too.
+    """
+    cache = get_cache()
+    missing = object()
+
+    cache_key, value = _lookup(namespace, key, missing)
+    if value is not missing:
+        return _unwrap(value)
+
+    lock_key = f"{cache_key}:lock"
+    owns_lock = cache.add(lock_key, 1, timeout=int(lock_timeout) or 1)
+    if not owns_lock:
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(poll_interval)
+            value = cache.get(cache_key, missing)
+            if value is not missing:
+                return _unwrap(value)
+        LOGGER.info(f"cache: {cache_key}: gave up waiting for another worker")
+
+    try:
+        value = compute()
+        cache.set(cache_key, _NONE if value is None else value, timeout)
+        return value
+    finally:
+        if owns_lock:
+            cache.delete(lock_key)
+
+
+def _call(method: str, *args, **kwargs):
+    return getattr(get_cache(), method)(*args, **kwargs)
+
+
+async def aget_or_set(
+    namespace: str,
+    key,
+    compute: Callable,
+    timeout: Optional[int] = None,
+    lock_timeout: float = 10,
+    poll_interval: float = 0.05,
+):
+    """
+    ``get_or_set`` for the async views: ``compute`` is a coroutine function, and waiting for
+    another caller to compute the value does not hold a thread.
+    """
+    cache_call = sync_to_async(_call)
+    missing = object()
+
+    cache_key, value = await sync_to_async(_lookup)(namespace, key, missing)
+    if value is not missing:
+        return _unwrap(value)
+
+    lock_key = f"{cache_key}:lock"
+    owns_lock = await cache_call("add", lock_key, 1, timeout=int(lock_timeout) or 1)
+    if not owns_lock:
+        deadline = time.monotonic() + lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(poll_interval)
+            value = await cache_call("get", cache_key, missing)
+            if value is not missing:
+                return _unwrap(value)
+        LOGGER.info(f"cache: {cache_key}: gave up waiting for another worker")
+
+    try:
+        value = await compute()
+        await cache_call("set", cache_key, _NONE if value is None else value, timeout)
+        return value
+    finally:
+        if owns_lock:
+            await cache_call("delete", lock_key)
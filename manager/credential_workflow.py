@@ -1,10 +1,27 @@
+import asyncio
 import base64
 import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
 import structlog as logging
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from requests import HTTPError
 
+from aca import agents
 from aca.client import ACAClientFactory
-from manager.models import ConnectionInvitation, CredentialOffer, CredentialRequest
+from manager import cache, invitation_pool
+from manager.models import (
+    ConnectionInvitation,
+    CredentialDefinition,
+    CredentialOffer,
+    CredentialRequest,
+)
+from manager.search import build_search_document
 from manager.utils import get_credential_crafter_class
 
 LOGGER = logging.getLogger(__name__)
@@ -24,32 +41,130 @@ def credential_offer_accept(connection_id: str) -> CredentialOffer:
         LOGGER.error(f"credential_offer_accept: connection_id: {connection_id} - error: {e}")
 
 
+# Deep link invitations by credential request code, dropped once the connection is accepted
+DEEP_LINK_CACHE = "deep_link"
+
+ACCEPTED_STATUS = {
+    ConnectionInvitation: CredentialRequest.Status.CONNECTED,
+    CredentialOffer: CredentialRequest.Status.ISSUED,
+}
+
+
+@transaction.atomic
 def _step_accept(model_class, connection_id: str):
     model = model_class.objects.filter(connection_id=connection_id).order_by("-created").first()
     if not model:
         raise RuntimeError(f"Not found: {model_class} with connection_id: {connection_id}")
     model.accepted = True
     model.save()
+    if model.credential_request_id:
+        CredentialRequest.objects.filter(id=model.credential_request_id).advance_status(
+            ACCEPTED_STATUS[model_class]
+        )
+        cache.delete(DEEP_LINK_CACHE, model.credential_request.code)
     return model
 
 
+# How the credential requests of each model are reached from CredentialRequest
+ACCEPTED_RELATED_NAME = {
+    ConnectionInvitation: "connection_invitations",
+    CredentialOffer: "credential_offers",
+}
+
+
+@transaction.atomic
+def bulk_accept(model_class, values: [str], field: str = "connection_id") -> int:
+    """
+    ``_step_accept`` for the ``model_class`` rows whose ``field`` is one of ``values``, in
+    set-based UPDATEs whatever their number: how many rows got accepted. Connections are reused
+    by several credential requests, so offers are matched on their ``cred_ex_id``.
+    """
+    accepted = model_class.objects.filter(**{f"{field}__in": values}).update(
+        accepted=True, modified=timezone.now()
+    )
+    credential_requests = CredentialRequest.objects.filter(
+        **{f"{ACCEPTED_RELATED_NAME[model_class]}__{field}__in": values}
+    )
+    codes = list(credential_requests.values_list("code", flat=True))
+    credential_requests.advance_status(ACCEPTED_STATUS[model_class])
+    for code in codes:
+        cache.delete(DEEP_LINK_CACHE, code)
+    return accepted
+
+
+def issuing_agent(credential_request: CredentialRequest) -> agents.Agent:
+    """
+    The agent of the organization of the request's credential definition: the one holding
+    the keys to issue it.
+    """
+    if not settings.ACA_PY_AGENT_ROUTES:
+        return agents.get_agent()
+    organization = (
+        CredentialDefinition.objects.filter(id=credential_request.credential_definition_id)
+        .values_list("schema__organization_id", flat=True)
+        .first()
+    )
+    return agents.agent_for(organization)
+
+
+def connection_agent(connection_id: str) -> str:
+    """The name of the agent ``connection_id`` lives on."""
+    agent = (
+        ConnectionInvitation.objects.filter(connection_id=connection_id)
+        .order_by("-created")
+        .values_list("agent", flat=True)
+        .first()
+    )
+    return agent or agents.DEFAULT_AGENT
+
+
 def connection_invitation_create(credential_request: CredentialRequest) -> (str, str):
+    aca_connection_invitation = _pending_invitation(credential_request)
+    if aca_connection_invitation is None:
+        agent = issuing_agent(credential_request)
+        aca_connection_invitation = (
+            invitation_pool.claim(agent.name) or agent.client().create_connection_invitation()
+        )
+        _record_invitation(credential_request, agent.name, aca_connection_invitation)
+    return _invitation_urls(aca_connection_invitation)
+
+
+async def aconnection_invitation_create(credential_request: CredentialRequest) -> (str, str):
+    """``connection_invitation_create`` for the async views: ACA-Py is called without a thread."""
+    aca_connection_invitation = await sync_to_async(_pending_invitation)(credential_request)
+    if aca_connection_invitation is None:
+        agent = await sync_to_async(issuing_agent)(credential_request)
+        aca_connection_invitation = await sync_to_async(invitation_pool.claim)(agent.name)
+        if aca_connection_invitation is None:
+            aca_connection_invitation = await agent.async_client().create_connection_invitation()
+        await sync_to_async(_record_invitation)(
+            credential_request, agent.name, aca_connection_invitation
+        )
+    return _invitation_urls(aca_connection_invitation)
+
+
+def _pending_invitation(credential_request: CredentialRequest) -> Optional[dict]:
+    """The invitation sent for ``credential_request`` and not accepted yet, if any."""
     connection_invitation_not_accepted = (
         credential_request.connection_invitations.filter(accepted=False)
         .order_by("-created")
         .first()
     )
     if connection_invitation_not_accepted:
-        aca_connection_invitation = connection_invitation_not_accepted.invitation_json
-    else:
-        aca_client = ACAClientFactory.create_client()
-        aca_connection_invitation = aca_client.create_connection_invitation()
-        ConnectionInvitation.objects.create(
-            connection_id=aca_connection_invitation["connection_id"],
-            invitation_json=aca_connection_invitation,
-            credential_request=credential_request,
-        )
+        return connection_invitation_not_accepted.invitation_json
+    return None
+
+
+def _record_invitation(credential_request: CredentialRequest, agent: str, invitation: dict):
+    ConnectionInvitation.objects.create(
+        connection_id=invitation["connection_id"],
+        invitation_json=invitation,
+        credential_request=credential_request,
+        agent=agent,
+    )
 
+
+def _invitation_urls(aca_connection_invitation: dict) -> (str, str):
     invitation_b64 = base64.b64encode(
         bytes(json.dumps(aca_connection_invitation["invitation"]), "utf-8")
     ).decode("utf-8")
@@ -63,6 +178,38 @@ def connection_invitation_create(credential_request: CredentialRequest) -> (str,
 def credential_offer_create(
     connection_id: str, connection_invitation: ConnectionInvitation
 ) -> dict:
+    aca_credential_offer = _craft_offer(connection_id, connection_invitation)
+    aca_client = ACAClientFactory.create_client(agent=connection_invitation.agent)
+    response_cred_offer = aca_client.send_credential_offer(aca_credential_offer, connection_id)
+    _record_offer(connection_id, connection_invitation, aca_credential_offer, response_cred_offer)
+    return aca_credential_offer
+
+
+async def acredential_offer_create(
+    connection_id: str, connection_invitation: ConnectionInvitation
+) -> dict:
+    """``credential_offer_create`` for the async views."""
+    aca_credential_offer = await sync_to_async(_craft_offer)(connection_id, connection_invitation)
+    aca_client = agents.get_agent(connection_invitation.agent).async_client()
+    response_cred_offer = await aca_client.send_credential_offer(
+        aca_credential_offer, connection_id
+    )
+    await sync_to_async(_record_offer)(
+        connection_id, connection_invitation, aca_credential_offer, response_cred_offer
+    )
+    return aca_credential_offer
+
+
+def credential_offer_record(
+    connection_id: str, connection_invitation: ConnectionInvitation, record: dict
+) -> dict:
+    """Record the offer ACA-Py has ``record`` of, as ``credential_offer_create`` would have."""
+    aca_credential_offer = _craft_offer(connection_id, connection_invitation)
+    _record_offer(connection_id, connection_invitation, aca_credential_offer, record)
+    return aca_credential_offer
+
+
+def _craft_offer(connection_id: str, connection_invitation: ConnectionInvitation) -> dict:
     credential_definition_id = (
         connection_invitation.credential_request.credential_definition.credential_id
     )
@@ -72,10 +219,16 @@ def credential_offer_create(
         credential_definition_id=credential_definition_id,
         credential_data=connection_invitation.credential_request.credential_data,
     )
-    aca_credential_offer = credential_crafter.craft()
-    aca_client = ACAClientFactory.create_client()
-    response_cred_offer = aca_client.send_credential_offer(aca_credential_offer, connection_id)
+    return credential_crafter.craft()
+
 
+@transaction.atomic
+def _record_offer(
+    connection_id: str,
+    connection_invitation: ConnectionInvitation,
+    aca_credential_offer: dict,
+    response_cred_offer: dict,
+):
     CredentialOffer.objects.create(
         connection_id=connection_id,
         offer_json=aca_credential_offer,
@@ -84,13 +237,314 @@ def credential_offer_create(
         revocation_id=response_cred_offer.get("revocation_id"),
         credential_id=response_cred_offer.get("credential_id"),
     )
+    CredentialRequest.objects.filter(id=connection_invitation.credential_request_id).advance_status(
+        CredentialRequest.Status.OFFERED
+    )
 
-    return aca_credential_offer
+
+def credential_request_revoke(credential_request: CredentialRequest) -> CredentialRequest:
+    CredentialRequest.objects.filter(id=credential_request.id).advance_status(
+        CredentialRequest.Status.REVOKED, revoked_credential=True
+    )
+    cache.delete(DEEP_LINK_CACHE, credential_request.code)
+    credential_request.refresh_from_db()
+    return credential_request
 
 
 def is_credential_request_ready(code: str) -> CredentialRequest:
     credential_request = CredentialRequest.objects.get(code=code)
-    credential_offers = credential_request.credential_offers.order_by("-created")
-    if credential_offers and credential_offers[0].accepted is True:
+    if credential_request.is_issued:
         raise RuntimeError(f"Credential already accepted - code:{code}")
     return credential_request
+
+
+def credential_offers_bulk_create(items: [dict], creator) -> [dict]:
+    """
+    Offer credentials over already established connections, one per ``items`` entry
+    (``connection_id``, ``cred_def_id``, ``credential_data``). Items are checked with a
+    couple of set-based queries, the credential requests are created in one short
+    transaction and the offers are then sent concurrently, outside of it. Returns one
+    result per item, in order, with either ``cred_request_id`` or ``errors``: "offered", or
+    "pending" when the outbox sends the offer later on.
+    """
+    batch = _BulkOffers(items, creator)
+    if batch.offers:
+        batch.record(_send_credential_offers(batch.offers))
+    return batch.results
+
+
+async def acredential_offers_bulk_create(items: [dict], creator) -> [dict]:
+    """``credential_offers_bulk_create`` for the async views, the offers sent as tasks."""
+    batch = await sync_to_async(_BulkOffers)(items, creator)
+    if batch.offers:
+        limit = asyncio.Semaphore(getattr(settings, "CREDENTIAL_OFFER_CONCURRENCY", 8))
+        responses = await asyncio.gather(
+            *(
+                _asend_credential_offer(limit, offer, connection_id, agent)
+                for _, offer, connection_id, agent in batch.offers
+            )
+        )
+        await sync_to_async(batch.record)(
+            {index: response for (index, *_), response in zip(batch.offers, responses)}
+        )
+    return batch.results
+
+
+class _BulkOffers:
+    """
+    The credential requests of a bulk offer, created on init, and their offers to send:
+    (index, offer, connection_id, agent) for each valid item.
+    """
+
+    def __init__(self, items: [dict], creator):
+        self.items = items
+        self.results = [
+            {"connection_id": item["connection_id"], "cred_def_id": item["cred_def_id"]}
+            for item in items
+        ]
+        self.offers = []
+
+        credential_definitions = {
+            credential_definition.credential_id: credential_definition
+            for credential_definition in CredentialDefinition.objects.select_related(
+                "schema"
+            ).filter(credential_id__in={item["cred_def_id"] for item in items}, enabled=True)
+        }
+        latest_invitations = {}
+        for invitation in ConnectionInvitation.objects.filter(
+            connection_id__in={item["connection_id"] for item in items}
+        ).order_by("connection_id", "-created"):
+            latest_invitations.setdefault(invitation.connection_id, invitation)
+
+        self.valid = []
+        for index, item in enumerate(items):
+            errors = _credential_item_errors(item, credential_definitions, latest_invitations)
+            if errors:
+                self.results[index].update({"status": "error", "errors": errors})
+            else:
+                self.valid.append(index)
+
+        if not self.valid:
+            return
+
+        with transaction.atomic():
+            self.credential_requests = _bulk_create_credential_requests(
+                [items[index] for index in self.valid], credential_definitions, creator
+            )
+            self.invitations, self.invitations_created = _bulk_link_connection_invitations(
+                [items[index]["connection_id"] for index in self.valid],
+                self.credential_requests,
+                latest_invitations,
+            )
+
+        crafted_offers = {}
+        for cred_def_id in {items[index]["cred_def_id"] for index in self.valid}:
+            batch = [index for index in self.valid if items[index]["cred_def_id"] == cred_def_id]
+            crafter_class = get_credential_crafter_class(cred_def_id)
+            crafted = crafter_class.craft_many(
+                cred_def_id,
+                [
+                    (items[index]["connection_id"], items[index]["credential_data"])
+                    for index in batch
+                ],
+            )
+            crafted_offers.update(zip(batch, crafted))
+
+        self.offers = [
+            (
+                index,
+                crafted_offers[index],
+                items[index]["connection_id"],
+                self.invitations[position].agent,
+            )
+            for position, index in enumerate(self.valid)
+        ]
+
+    def record(self, responses: dict):
+        """
+        Record the offers ACA-Py accepted, ``responses`` are by item index. The others are
+        left to the outbox, as the offers of ``CredentialView``.
+        """
+        items, results = self.items, self.results
+        offers = {index: offer for index, offer, _, _ in self.offers}
+        created_offers, failed = [], []
+        for position, index in enumerate(self.valid):
+            credential_request = self.credential_requests[position]
+            results[index]["cred_request_id"] = credential_request.id
+            response = responses[index]
+            if isinstance(response, Exception):
+                failed.append((position, index, response))
+                continue
+            results[index]["status"] = CredentialRequest.Status.OFFERED
+            created_offers.append(
+                CredentialOffer(
+                    connection_id=items[index]["connection_id"],
+                    offer_json=offers[index],
+                    credential_request=self.invitations[position].credential_request,
+                    cred_ex_id=response["credential_exchange_id"],
+                    revocation_id=response.get("revocation_id"),
+                    credential_id=response.get("credential_id"),
+                )
+            )
+
+        if created_offers:
+            with transaction.atomic():
+                CredentialOffer.objects.bulk_create(created_offers)
+                CredentialRequest.objects.filter(
+                    id__in=[offer.credential_request.id for offer in created_offers]
+                ).advance_status(CredentialRequest.Status.OFFERED)
+        if failed:
+            self._retry(failed)
+
+    def _retry(self, failed: [(int, int, Exception)]):
+        """
+        Queue the offers not sent in the outbox, which retries them, or discards their
+        credential requests when ACA-Py refused them.
+        """
+        # imported here: the outbox runs the offers of this module
+        from manager import outbox
+
+        credential_request_ids = [
+            self.credential_requests[position].id for position, _, _ in failed
+        ]
+        # not every backend returns the primary keys of the invitations created in bulk
+        invitation_ids = dict(
+            ConnectionInvitation.objects.filter(
+                credential_request_id__in=credential_request_ids
+            ).values_list("credential_request_id", "id")
+        )
+        messages = outbox.enqueue_retries(
+            "send_credential_offer",
+            [
+                (
+                    {
+                        "connection_invitation": invitation_ids[credential_request_id],
+                        "discard_request": True,
+                        "invitation_created": self.invitations_created[position],
+                    },
+                    error,
+                )
+                for (position, _, error), credential_request_id in zip(
+                    failed, credential_request_ids
+                )
+            ],
+        )
+        for (_, index, error), message in zip(failed, messages):
+            if message is None:
+                del self.results[index]["cred_request_id"]
+                self.results[index].update({"status": "error", "errors": [_offer_error(error)]})
+            else:
+                # as the 202 of a single offer: dispatch_outbox sends it later on
+                self.results[index]["status"] = CredentialRequest.Status.PENDING
+
+
+def _credential_item_errors(item, credential_definitions, latest_invitations) -> [str]:
+    errors = []
+    credential_definition = credential_definitions.get(item["cred_def_id"])
+    if credential_definition is None:
+        errors.append(f"Credential definition '{item['cred_def_id']}' does not exist")
+    else:
+        missing = set(credential_definition.schema.schema_json.get("attributes", [])) - set(
+            item["credential_data"].keys()
+        )
+        if missing:
+            errors.append(f"Attribute(s) not found in the data provided: {missing}")
+
+    invitation = latest_invitations.get(item["connection_id"])
+    if invitation is None:
+        errors.append(f"Connection id '{item['connection_id']}' not found in ConnectionInvitation")
+    elif not invitation.accepted:
+        errors.append(f"Connection id '{item['connection_id']}' is not accepted")
+    return errors
+
+
+def _bulk_create_credential_requests(items, credential_definitions, creator) -> [CredentialRequest]:
+    credential_requests = [
+        CredentialRequest(
+            code=str(uuid.uuid4()),
+            credential_definition=credential_definitions[item["cred_def_id"]],
+            credential_data=item["credential_data"],
+            creator=creator,
+        )
+        for item in items
+    ]
+    for credential_request in credential_requests:
+        credential_request.search_document = build_search_document(credential_request)
+    CredentialRequest.objects.bulk_create(credential_requests)
+
+    # Not every backend returns the primary keys from a bulk insert
+    ids = dict(
+        CredentialRequest.objects.filter(
+            code__in=[credential_request.code for credential_request in credential_requests]
+        ).values_list("code", "id")
+    )
+    for credential_request in credential_requests:
+        credential_request.id = ids[credential_request.code]
+    return credential_requests
+
+
+def _bulk_link_connection_invitations(connection_ids, credential_requests, latest_invitations):
+    """
+    Same as CredentialView._update_connection_invitation, for a whole batch at once: the
+    invitations and whether each was created.
+    """
+    to_update, to_create, invitations = [], [], []
+    for connection_id, credential_request in zip(connection_ids, credential_requests):
+        invitation = latest_invitations[connection_id]
+        if invitation.credential_request_id is None:
+            invitation.credential_request = credential_request
+            to_update.append(invitation)
+        else:
+            invitation = ConnectionInvitation(
+                connection_id=connection_id,
+                invitation_json=invitation.invitation_json,
+                accepted=True,
+                credential_request=credential_request,
+                agent=invitation.agent,
+            )
+            to_create.append(invitation)
+        latest_invitations[connection_id] = invitation
+        invitations.append(invitation)
+
+    ConnectionInvitation.objects.bulk_update(to_update, ["credential_request"])
+    ConnectionInvitation.objects.bulk_create(to_create)
+    created = {id(invitation) for invitation in to_create}
+    return invitations, [id(invitation) in created for invitation in invitations]
+
+
+def _send_credential_offers(offers: [(int, dict, str, str)]) -> dict:
+    max_workers = getattr(settings, "CREDENTIAL_OFFER_CONCURRENCY", 8)
+
+    def send(offer, connection_id, agent):
+        try:
+            # one client per agent and thread
+            client = ACAClientFactory.create_client(agent=agent)
+            return client.send_credential_offer(offer, connection_id)
+        except Exception as error:
+            LOGGER.error(f"credential_offers_bulk_create: connection_id: {connection_id} - {error}")
+            return error
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            index: executor.submit(send, offer, connection_id, agent)
+            for index, offer, connection_id, agent in offers
+        }
+    return {index: future.result() for index, future in futures.items()}
+
+
+async def _asend_credential_offer(
+    limit: asyncio.Semaphore, offer: dict, connection_id: str, agent: str
+):
+    try:
+        async with limit:
+            client = agents.get_agent(agent).async_client()
+            return await client.send_credential_offer(offer, connection_id)
+    except Exception as error:
+        LOGGER.error(f"credential_offers_bulk_create: connection_id: {connection_id} - {error}")
+        return error
+
+
+def _offer_error(error: Exception) -> str:
+    if isinstance(error, HTTPError) and error.response is not None:
+        return error.response.text
+    return str(error)
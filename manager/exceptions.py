@@ -1,7 +1,46 @@
+import math
+
 from rest_framework.exceptions import APIException
+from rest_framework.views import exception_handler as drf_exception_handler
+
+from aca.resilience import ACAPyUnavailable
 
 
 class ConnectionNotReady(APIException):
     status_code = 403
     default_detail = "Connection not ready."
     default_code = "connection_not_ready"
+
+
+class OutboxActionFailed(APIException):
+    status_code = 502
+    default_detail = "ACA-Py rejected the request."
+    default_code = "outbox_action_failed"
+
+
+class ProofRequestFailed(APIException):
+    status_code = 502
+    default_detail = "ACA-Py could not create the proof request."
+    default_code = "proof_request_failed"
+
+
+class ServiceOverloaded(APIException):
+    status_code = 503
+    default_detail = "Too many requests, try again later."
+    default_code = "service_overloaded"
+
+    def __init__(self, detail=None, code=None, wait=None):
+        super().__init__(detail, code)
+        self.wait = wait
+
+
+class AgentUnavailable(ServiceOverloaded):
+    default_detail = "ACA-Py is unavailable, try again later."
+    default_code = "agent_unavailable"
+
+
+def exception_handler(exc, context):
+    """DRF's, answering the ACA-Py calls turned away (see ``aca.resilience``) with a 503."""
+    if isinstance(exc, ACAPyUnavailable):
+        exc = AgentUnavailable(wait=math.ceil(exc.retry_after))
+    return drf_exception_handler(exc, context)
@@ -0,0 +1,44 @@
+from django.db import connections
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, SearchFilter
+
+from manager.search import search_credential_requests
+
+
+class CredentialRequestSearchFilter(SearchFilter):
+    """``?search=`` for credential requests, served by the search index (see manager.search)."""
+
+    def filter_queryset(self, request, queryset, view):
+        search_term = request.query_params.get(self.search_param, "").replace("\x00", "")
+        return search_credential_requests(queryset, search_term)
+
+
+class CredentialDataFilter(BaseFilterBackend):
+    """
+    Attribute-level filters over ``credential_data``, e.g. ``?credential_data__employee_id=7``.
+
+    On PostgreSQL all the attributes are combined in one ``@>`` containment query, served by
+    the ``jsonb_path_ops`` GIN index; other databases compare each extracted key.
+    """
+
+    prefix = "credential_data__"
+
+    def filter_queryset(self, request, queryset, view):
+        attributes = {
+            key[len(self.prefix) :]: value
+            for key, value in request.query_params.items()
+            if key.startswith(self.prefix)
+        }
+        if not attributes:
+            return queryset
+
+        invalid = [key for key in attributes if not key or "__" in key]
+        if invalid:
+            raise ValidationError({"credential_data": f"Invalid attribute name(s): {invalid}"})
+
+        if connections[queryset.db].vendor == "postgresql":
+            return queryset.filter(credential_data__contains=attributes)
+
+        for key, value in attributes.items():
+            queryset = queryset.filter(**{f"{self.prefix}{key}": value})
+        return queryset
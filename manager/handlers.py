@@ -1,26 +1,62 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
 from aca.client import ACAClientFactory
-from manager.credential_workflow import connection_invitation_create, is_credential_request_ready
+from manager import cache
+from manager.credential_workflow import (
+    aconnection_invitation_create,
+    connection_invitation_create,
+    is_credential_request_ready,
+)
 from manager.models import CredentialRequest
 
+LEDGER_CACHE = "ledger"
+
 
 class CredentialOfferHandler:
     @classmethod
     def get_credential_offer(cls, code: str) -> (CredentialRequest, str, str):
         credential_request = is_credential_request_ready(code)
         invitation_url, invitation_b64 = "", ""
-        connection_invitations = credential_request.connection_invitations.order_by("-created")
-        if not connection_invitations or not connection_invitations[0].accepted:
+        if not credential_request.is_connected:
             invitation_url, invitation_b64 = connection_invitation_create(credential_request)
         return credential_request, invitation_b64, invitation_url
 
+    @classmethod
+    async def aget_credential_offer(cls, code: str) -> (CredentialRequest, str, str):
+        """``get_credential_offer`` for the async views."""
+        credential_request = await sync_to_async(is_credential_request_ready)(code)
+        invitation_url, invitation_b64 = "", ""
+        if not credential_request.is_connected:
+            invitation_url, invitation_b64 = await aconnection_invitation_create(credential_request)
+        return credential_request, invitation_b64, invitation_url
+
 
 class ACAPy:
-    def __init__(self):
-        self.client = ACAClientFactory.create_client()
+    def __init__(self, organization=None, agent: str = None):
+        self.client = ACAClientFactory.create_client(organization=organization, agent=agent)
 
     def create_schema(self, schema_json: dict) -> dict:
         return self.client.create_schema(schema_json)
 
+    # Ledger records never change once written, they are cached for a long time
+
+    def get_schema(self, schema_id: str) -> dict:
+        return self._ledger_lookup(f"schema:{schema_id}", lambda: self.client.get_schema(schema_id))
+
+    def get_credential_definition(self, cred_def_id: str) -> dict:
+        return self._ledger_lookup(
+            f"credential_definition:{cred_def_id}",
+            lambda: self.client.get_credential_definition(cred_def_id),
+        )
+
+    def get_public_did(self) -> dict:
+        return self._ledger_lookup(f"public_did:{self.client.url}", self.client.get_public_did)
+
+    @staticmethod
+    def _ledger_lookup(key: str, fetch) -> dict:
+        return cache.get_or_set(LEDGER_CACHE, key, fetch, timeout=settings.CACHE_TIMEOUTS["ledger"])
+
     def create_credential_definition(self, credential_json: dict) -> dict:
         return self.client.create_credential_definition(credential_json)
 
@@ -29,6 +65,6 @@ class ACAPy:
 
     def out_of_band_receive_invitation(self, invitation: dict) -> dict:
         return self.client.out_of_band_receive_invitation(invitation)
-    
+
     def accept_connection_invitation(self, invitation: dict) -> dict:
         return self.client.accept_connection_invitation(invitation)
@@ -0,0 +1,97 @@
+"""
+Connection invitations created ahead of time, so that creating a credential request does
+not wait for ACA-Py: ``connection_invitation_create`` claims one of its agent's pool and
+only calls ACA-Py when the pool is empty.
+
+``manage.py fill_invitation_pool --loop`` keeps the pool of every agent between the
+``INVITATION_POOL_LOW`` and ``INVITATION_POOL_HIGH`` watermarks: once an agent has fewer
+than ``INVITATION_POOL_LOW`` invitations waiting, it is refilled up to
+``INVITATION_POOL_HIGH``. The invitations are single-use: the connection ACA-Py reports on
+the webhooks is the one of the invitation, as for the ones created on demand.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import structlog as logging
+from django.conf import settings
+
+from aca import agents
+from id_manager import metrics
+from manager.models import PooledInvitation
+
+LOGGER = logging.getLogger(__name__)
+
+# candidates tried by a claim, when concurrent claims took the first ones
+CLAIM_CANDIDATES = 5
+
+POOL_SIZE = metrics.gauge(
+    "invitation_pool_size", "Connection invitations waiting in the pool", ("agent",)
+)
+CLAIMS = metrics.counter(
+    "invitation_pool_claims_total",
+    "Connection invitations taken from the pool (hit) or created on demand (miss)",
+    ("agent", "outcome"),
+)
+
+
+def claim(agent: str) -> Optional[dict]:
+    """
+    Take an invitation of ``agent`` out of the pool: the ACA-Py ``create-invitation``
+    answer, or None when the pool is empty. The claim is a conditional DELETE, a pooled
+    invitation goes to a single caller.
+    """
+    candidates = PooledInvitation.objects.filter(agent=agent).values_list("id", "invitation_json")
+    for pooled_id, invitation_json in candidates[:CLAIM_CANDIDATES]:
+        deleted, _ = PooledInvitation.objects.filter(id=pooled_id).delete()
+        if deleted:
+            CLAIMS.inc(agent=agent, outcome="hit")
+            return invitation_json
+    CLAIMS.inc(agent=agent, outcome="miss")
+    return None
+
+
+def fill(agent: agents.Agent, low: int = None, high: int = None, concurrency: int = 4) -> int:
+    """
+    Refill the pool of ``agent`` up to ``high`` when it has fewer than ``low`` invitations:
+    how many were added. ACA-Py is called from ``concurrency`` threads, the invitations are
+    inserted at once.
+    """
+    low = settings.INVITATION_POOL_LOW if low is None else low
+    high = settings.INVITATION_POOL_HIGH if high is None else high
+    size = PooledInvitation.objects.filter(agent=agent.name).count()
+    POOL_SIZE.set(size, agent=agent.name)
+    if size >= low:
+        return 0
+
+    def create(_):
+        try:
+            return agent.client().create_connection_invitation()
+        except Exception as error:
+            return error
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(create, range(high - size)))
+
+    errors = [result for result in results if isinstance(result, Exception)]
+    if errors:
+        LOGGER.error(
+            f"invitation pool: {agent.name}: {len(errors)} invitation(s) not created - {errors[0]}"
+        )
+    pooled = [
+        PooledInvitation(
+            agent=agent.name,
+            connection_id=invitation["connection_id"],
+            invitation_json=invitation,
+        )
+        for invitation in results
+        if not isinstance(invitation, Exception)
+    ]
+    PooledInvitation.objects.bulk_create(pooled)
+    POOL_SIZE.set(size + len(pooled), agent=agent.name)
+    LOGGER.info(f"invitation pool: {agent.name}: {len(pooled)} invitation(s) added to {size}")
+    return len(pooled)
+
+
+def fill_all(concurrency: int = 4) -> int:
+    """``fill`` the pool of each agent."""
+    return sum(fill(agent, concurrency=concurrency) for agent in agents.agents().values())
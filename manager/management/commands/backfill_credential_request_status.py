@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Subquery
+
+from manager.models import ConnectionInvitation, CredentialOffer, CredentialRequest
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill CredentialRequest.status and its timestamps from the existing connection "
+        "invitations and credential offers"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Recompute every request, not only the ones still marked as pending",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        queryset = CredentialRequest.objects.all()
+        if not options["all"]:
+            queryset = queryset.filter(status=CredentialRequest.Status.PENDING)
+
+        latest_invitation = ConnectionInvitation.objects.filter(
+            credential_request=OuterRef("pk")
+        ).order_by("-created")
+        latest_offer = CredentialOffer.objects.filter(credential_request=OuterRef("pk")).order_by(
+            "-created"
+        )
+        queryset = queryset.annotate(
+            invitation_accepted=Subquery(latest_invitation.values("accepted")[:1]),
+            invitation_modified=Subquery(latest_invitation.values("modified")[:1]),
+            has_offer=Exists(latest_offer),
+            offer_accepted=Subquery(latest_offer.values("accepted")[:1]),
+            offer_created=Subquery(latest_offer.values("created")[:1]),
+            offer_modified=Subquery(latest_offer.values("modified")[:1]),
+        ).order_by("pk")
+
+        updated = 0
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            for credential_request in batch:
+                self._fill(credential_request)
+            with transaction.atomic():
+                CredentialRequest.objects.bulk_update(
+                    batch,
+                    ["status", "connected_at", "offered_at", "issued_at", "revoked_at"],
+                )
+            updated += len(batch)
+            last_pk = batch[-1].pk
+
+        self.stdout.write(self.style.SUCCESS(f"{updated} credential request(s) backfilled"))
+
+    @staticmethod
+    def _fill(credential_request: CredentialRequest):
+        status = CredentialRequest.Status.PENDING
+        if credential_request.invitation_accepted:
+            status = CredentialRequest.Status.CONNECTED
+            credential_request.connected_at = credential_request.invitation_modified
+        if credential_request.has_offer:
+            status = CredentialRequest.Status.OFFERED
+            credential_request.offered_at = credential_request.offer_created
+        if credential_request.offer_accepted:
+            status = CredentialRequest.Status.ISSUED
+            credential_request.issued_at = credential_request.offer_modified
+        if credential_request.revoked_credential:
+            status = CredentialRequest.Status.REVOKED
+            credential_request.revoked_at = credential_request.modified
+        credential_request.status = status
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from aca import agents
+
+
+class Command(BaseCommand):
+    help = (
+        "Check that every instance of the ACA-Py agents (settings.ACA_PY_AGENTS) is ready. "
+        "Fails when an agent has no instance ready"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--timeout", type=float, default=5, help="Seconds per instance")
+
+    def handle(self, *args, **options):
+        down = []
+        for name, agent in agents.agents().items():
+            health = agent.check_health(timeout=options["timeout"])
+            for url, ready in health.items():
+                style = self.style.SUCCESS if ready else self.style.ERROR
+                self.stdout.write(style(f"{name}: {url} {'ready' if ready else 'not ready'}"))
+            if not any(health.values()):
+                down.append(name)
+        if down:
+            raise CommandError(f"No instance ready for the agent(s): {', '.join(down)}")
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from manager.outbox import dispatch_pending
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the ACA-Py side effects left in the outbox: messages whose dispatch after "
+        "commit did not complete, and retries that are due"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=100, help="Messages per round")
+        parser.add_argument(
+            "--loop", action="store_true", help="Keep polling instead of running one round"
+        )
+        parser.add_argument(
+            "--interval", type=float, default=5, help="Seconds between rounds with --loop"
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            dispatched = dispatch_pending(limit=options["limit"])
+            if dispatched or not options["loop"]:
+                self.stdout.write(f"{dispatched} outbox message(s) dispatched")
+            if not options["loop"]:
+                break
+            if dispatched < options["limit"]:
+                time.sleep(options["interval"])
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from manager.invitation_pool import fill_all
+
+
+class Command(BaseCommand):
+    help = (
+        "Create connection invitations ahead of time for the ACA-Py agents whose pool is "
+        "below INVITATION_POOL_LOW, up to INVITATION_POOL_HIGH"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int, default=4, help="ACA-Py calls in flight per agent"
+        )
+        parser.add_argument(
+            "--loop", action="store_true", help="Keep polling instead of running one round"
+        )
+        parser.add_argument(
+            "--interval", type=float, default=5, help="Seconds between rounds with --loop"
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            added = fill_all(concurrency=options["concurrency"])
+            if added or not options["loop"]:
+                self.stdout.write(f"{added} connection invitation(s) added to the pool")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
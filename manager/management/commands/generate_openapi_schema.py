@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from id_manager import openapi
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the OpenAPI schema (swagger.json and swagger.yaml) served by the API, "
+        "once per deploy"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output-dir", help="Directory to write to (default: settings.OPENAPI_SCHEMA_DIR)"
+        )
+
+    def handle(self, *args, **options):
+        for path in openapi.write(options["output_dir"]):
+            self.stdout.write(f"OpenAPI schema written to {path}")
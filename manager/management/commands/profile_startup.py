@@ -0,0 +1,76 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What a fresh WSGI worker does before answering its first request
+STARTUP_SCRIPT = """
+import json, time
+start = time.perf_counter()
+from id_manager.wsgi import application
+loaded = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(json.dumps({"application": loaded - start, "urlconf": time.perf_counter() - loaded}))
+"""
+
+IMPORT_TIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+
+def parse_import_times(output: str) -> dict:
+    """``python -X importtime`` output: {module: (self µs, cumulative µs, nesting)}."""
+    modules = {}
+    for line in output.splitlines():
+        match = IMPORT_TIME.match(line)
+        if match:
+            own, cumulative, indent, module = match.groups()
+            modules[module] = (int(own), int(cumulative), len(indent) // 2)
+    return modules
+
+
+class Command(BaseCommand):
+    help = (
+        "Start the WSGI application in fresh interpreters and report the time to the first "
+        "request and the slowest imports"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=3, help="Cold starts to measure")
+        parser.add_argument("--top", type=int, default=20, help="Imports to list")
+
+    def handle(self, *args, **options):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE}
+        timings, modules = [], {}
+        for _ in range(max(options["runs"], 1)):
+            process = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", STARTUP_SCRIPT],
+                cwd=settings.ROOT_DIR,
+                env=env,
+                capture_output=True,
+                text=True,
+            )
+            if process.returncode:
+                raise CommandError(f"The application did not start:\n{process.stderr[-2000:]}")
+            timings.append(json.loads(process.stdout.strip().splitlines()[-1]))
+            modules = parse_import_times(process.stderr)
+
+        application = statistics.median(timing["application"] for timing in timings)
+        urlconf = statistics.median(timing["urlconf"] for timing in timings)
+        self.stdout.write(f"Median of {len(timings)} cold start(s):")
+        self.stdout.write(f"  application loaded  {application * 1000:8.1f} ms")
+        self.stdout.write(f"  URLconf loaded      {urlconf * 1000:8.1f} ms")
+        self.stdout.write(f"  first request ready {(application + urlconf) * 1000:8.1f} ms")
+
+        self.stdout.write(f"\nSelf import time per package ({len(modules)} modules):")
+        packages = {}
+        for module, (own, _, _) in modules.items():
+            package = module.split(".")[0]
+            packages[package] = packages.get(package, 0) + own
+        slowest = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+        for package, own in slowest[: options["top"]]:
+            self.stdout.write(f"  {own / 1000:8.1f} ms  {package}")
@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from manager.retention import configured_policies, prune, prune_qr_codes, vacuum
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete (or archive and delete) issuance data past its retention period, as "
+        "configured in ISSUANCE_DATA_RETENTION. Works in small batches, safe to run online."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=getattr(settings, "ISSUANCE_DATA_PRUNE_BATCH_SIZE")
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=getattr(settings, "ISSUANCE_DATA_PRUNE_PAUSE"),
+            help="Seconds to sleep between batches",
+        )
+        parser.add_argument(
+            "--max-batches", type=int, default=None, help="Stop each policy after N batches"
+        )
+        parser.add_argument(
+            "--archive-dir", default=None, help="Write deleted rows as JSONL files in this folder"
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Only count what would go")
+        parser.add_argument(
+            "--vacuum",
+            action="store_true",
+            help="VACUUM (ANALYZE) the pruned tables afterwards (PostgreSQL)",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        verb = "would be deleted" if dry_run else "deleted"
+        pruned_models = set()
+
+        for policy in configured_policies():
+            count = prune(
+                policy,
+                batch_size=options["batch_size"],
+                pause=options["pause"],
+                dry_run=dry_run,
+                archive_dir=options["archive_dir"],
+                max_batches=options["max_batches"],
+            )
+            if count:
+                pruned_models.add(policy.model)
+            self.stdout.write(f"{policy.name}: {count} row(s) {verb}")
+
+        qr_codes_days = getattr(settings, "ISSUANCE_DATA_RETENTION", {}).get("qr_codes")
+        if qr_codes_days is not None:
+            count = prune_qr_codes(qr_codes_days, dry_run=dry_run)
+            self.stdout.write(f"qr_codes: {count} file(s) {verb}")
+
+        if options["vacuum"] and not dry_run:
+            for model in pruned_models:
+                vacuum(model)
+
+        self.stdout.write(self.style.SUCCESS("Done"))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from manager.models import CredentialRequest
+from manager.search import rebuild_search_documents
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute CredentialRequest.search_document, e.g. after changing "
+        "CREDENTIAL_REQUEST_SEARCH_ATTRIBUTES or renaming a credential definition"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        updated = rebuild_search_documents(
+            CredentialRequest.objects.order_by("pk"), batch_size=options["batch_size"]
+        )
+        self.stdout.write(self.style.SUCCESS(f"{updated} search document(s) rebuilt"))
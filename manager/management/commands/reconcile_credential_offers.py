@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from manager.reconciliation import reconcile_credential_offers
+
+
+class Command(BaseCommand):
+    help = (
+        "Update the credential offers (state, revocation id and credential id) from the "
+        "ACA-Py issue-credential records. Meant to run periodically, e.g. from cron"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--state", default=None, help="Only records in this ACA-Py state")
+        parser.add_argument("--dry-run", action="store_true", help="Only count what would change")
+
+    def handle(self, *args, **options):
+        params = {"state": options["state"]} if options["state"] else {}
+        changed, accepted = reconcile_credential_offers(
+            page_size=options["page_size"], dry_run=options["dry_run"], **params
+        )
+        verb = "would be updated" if options["dry_run"] else "updated"
+        self.stdout.write(
+            self.style.SUCCESS(f"{changed} credential offer(s) {verb}, {accepted} accepted")
+        )
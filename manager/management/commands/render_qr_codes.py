@@ -0,0 +1,55 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from manager import qr_codes, qr_storage
+from manager.models import ConnectionInvitation
+from manager.utils import QRCodeHandler
+
+
+class Command(BaseCommand):
+    help = (
+        "Render ahead of time the QR codes of the pending connection invitations which have "
+        "none yet, e.g. before the invitations of an onboarding campaign are emailed"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format", choices=sorted(qr_codes.CONTENT_TYPES), default=qr_codes.PNG
+        )
+        parser.add_argument(
+            "--processes", type=int, default=os.cpu_count(), help="Processes rendering the codes"
+        )
+        parser.add_argument(
+            "--chunksize", type=int, default=16, help="Codes handed to a process at once"
+        )
+
+    def handle(self, *args, **options):
+        image_format, processes = options["format"], options["processes"]
+        invitation_urls = {
+            invitation_json["invitation_url"]
+            for invitation_json in ConnectionInvitation.objects.filter(
+                accepted=False, credential_request__isnull=False
+            )
+            .values_list("invitation_json", flat=True)
+            .iterator()
+            if isinstance(invitation_json, dict) and invitation_json.get("invitation_url")
+        }
+        names = {url: QRCodeHandler.file_name(url, image_format) for url in sorted(invitation_urls)}
+        stored = qr_storage.names()
+        missing = [url for url, name in names.items() if name not in stored]
+
+        start = time.perf_counter()
+        images = qr_codes.render_many(
+            missing, image_format, processes=processes, chunksize=options["chunksize"]
+        )
+        for url, image in zip(missing, images):
+            qr_storage.put(names[url], image)
+        seconds = time.perf_counter() - start
+
+        rate = len(missing) / seconds if missing else 0
+        self.stdout.write(
+            f"{len(missing)} QR code(s) rendered in {seconds:.1f}s: {rate:.0f}/s, "
+            f"{rate / processes:.0f}/s per process ({len(names) - len(missing)} already there)"
+        )
@@ -0,0 +1,38 @@
+# Generated by Django 3.2.20 on 2026-10-19 00:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manager', '0021_alter_credentialoffer_connection_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='credentialrequest',
+            name='connected_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='credentialrequest',
+            name='issued_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='credentialrequest',
+            name='offered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='credentialrequest',
+            name='revoked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='credentialrequest',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('connected', 'Connected'), ('offered', 'Offered'), ('issued', 'Issued'), ('revoked', 'Revoked')], db_index=True, default='pending', max_length=20),
+        ),
+    ]
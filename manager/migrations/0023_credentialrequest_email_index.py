@@ -0,0 +1,18 @@
+# Generated by Django 3.2.20 on 2026-10-19 00:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manager', '0022_credentialrequest_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='credentialrequest',
+            name='email',
+            field=models.EmailField(blank=None, db_index=True, max_length=254),
+        ),
+    ]
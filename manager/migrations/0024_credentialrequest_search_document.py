@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+from manager.search import install_search_index, rebuild_search_documents, uninstall_search_index
+
+
+def fill_search_documents(apps, schema_editor):
+    CredentialRequest = apps.get_model("manager", "CredentialRequest")
+    rebuild_search_documents(CredentialRequest.objects.using(schema_editor.connection.alias))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manager', '0023_credentialrequest_email_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='credentialrequest',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 3.2.20 on 2026-10-19 00:26
+
+from django.db import migrations, models
+
+from manager.search import install_search_index
+
+JSON_COLUMNS = (
+    ("manager_schema", "schema_json"),
+    ("manager_credentialrequest", "credential_data"),
+    ("manager_connectioninvitation", "invitation_json"),
+    ("manager_credentialoffer", "offer_json"),
+)
+
+GIN_INDEXES = (
+    ("manager_credentialrequest_credential_data_gin", "manager_credentialrequest", "credential_data"),
+    ("manager_schema_schema_json_gin", "manager_schema", "schema_json"),
+)
+
+
+def clean_empty_json(apps, schema_editor):
+    # The text columns may hold '' which cannot be cast to jsonb
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table, column in JSON_COLUMNS:
+        schema_editor.execute(f"UPDATE {table} SET {column} = '{{}}' WHERE {column} = ''")
+
+
+def create_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, table, column in GIN_INDEXES:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin ({column} jsonb_path_ops)"
+        )
+
+
+def drop_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _, _ in GIN_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manager', '0024_credentialrequest_search_document'),
+    ]
+
+    operations = [
+        migrations.RunPython(clean_empty_json, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='connectioninvitation',
+            name='invitation_json',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AlterField(
+            model_name='credentialoffer',
+            name='offer_json',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AlterField(
+            model_name='credentialrequest',
+            name='credential_data',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AlterField(
+            model_name='schema',
+            name='schema_json',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.RunPython(create_gin_indexes, drop_gin_indexes),
+        # SQLite rebuilds manager_credentialrequest on AlterField, dropping the FTS triggers
+        migrations.RunPython(install_search_index, migrations.RunPython.noop),
+    ]
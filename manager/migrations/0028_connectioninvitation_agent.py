@@ -0,0 +1,18 @@
+# Generated by Django 3.2.20 on 2026-10-19 01:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("manager", "0027_proofdefinition_proofrequest"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="connectioninvitation",
+            name="agent",
+            field=models.CharField(default="default", max_length=50),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.2.20 on 2026-10-19 01:28
+
+from django.db import migrations, models
+import django.utils.timezone
+import model_utils.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("manager", "0028_connectioninvitation_agent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PooledInvitation",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                (
+                    "created",
+                    model_utils.fields.AutoCreatedField(
+                        default=django.utils.timezone.now, editable=False, verbose_name="created"
+                    ),
+                ),
+                (
+                    "modified",
+                    model_utils.fields.AutoLastModifiedField(
+                        default=django.utils.timezone.now, editable=False, verbose_name="modified"
+                    ),
+                ),
+                ("agent", models.CharField(db_index=True, max_length=50)),
+                ("connection_id", models.CharField(max_length=100, unique=True)),
+                ("invitation_json", models.JSONField(default=dict)),
+            ],
+            options={
+                "ordering": ("id",),
+            },
+        ),
+    ]
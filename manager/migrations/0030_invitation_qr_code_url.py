@@ -0,0 +1,30 @@
+import os
+
+import structlog as logging
+from django.db import migrations
+from post_office.models import EmailTemplate
+
+logger = logging.getLogger(__name__)
+
+
+def load_email_template(apps, schema_editor):
+    # the QR code is served from the QR code storage (manager.qr_storage), not from the statics
+    template_path = os.path.join("manager", "templates", "emails", "invitation.html")
+
+    with open(template_path, "r") as template_file:
+        try:
+            invitation_template = EmailTemplate.objects.get(name="invitation")
+        except (EmailTemplate.DoesNotExist, EmailTemplate.MultipleObjectsReturned):
+            logger.error(f'Error trying to get the template "invitation" in migration {__file__}')
+            return
+        invitation_template.html_content = template_file.read()
+        invitation_template.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("manager", "0029_pooledinvitation"),
+    ]
+
+    operations = [migrations.RunPython(load_email_template, migrations.RunPython.noop)]
@@ -4,9 +4,12 @@ import uuid
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.db import models
-from django_extensions.db.fields.json import JSONField
+from django.utils import timezone
 from model_utils.models import TimeStampedModel
 
+from manager import cache
+from manager.search import build_search_document
+
 
 class Organization(models.Model):
     name = models.CharField(max_length=100, primary_key=True)
@@ -27,7 +30,7 @@ class Schema(TimeStampedModel):
     organization = models.ForeignKey(
         Organization, null=True, related_name="schemas", on_delete=models.CASCADE
     )
-    schema_json = JSONField()
+    schema_json = models.JSONField(default=dict)
 
     def __str__(self):
         if self.schema_id:
@@ -39,6 +42,30 @@ class Schema(TimeStampedModel):
         ordering = ("-created",)
 
 
+CREDENTIAL_DEFINITION_CACHE = "credential_definition"
+
+
+class CredentialDefinitionQuerySet(models.QuerySet):
+    def get_enabled(self, **lookup) -> "CredentialDefinition":
+        """
+        The enabled definition (with its schema) matching a single ``credential_id`` or
+        ``name`` lookup, through the shared cache. Saving a definition or a schema
+        invalidates every cached one.
+        """
+        ((field, value),) = lookup.items()
+        if field not in ("credential_id", "name"):
+            raise ValueError(f"Unsupported credential definition lookup: '{field}'")
+        credential_definition = cache.get_or_set(
+            CREDENTIAL_DEFINITION_CACHE,
+            f"{field}={value}",
+            lambda: self.select_related("schema").filter(enabled=True, **lookup).first(),
+            timeout=settings.CACHE_TIMEOUTS["credential_definition"],
+        )
+        if credential_definition is None:
+            raise self.model.DoesNotExist(f"No enabled credential definition with {field}={value}")
+        return credential_definition
+
+
 class CredentialDefinition(TimeStampedModel):
     name = models.CharField(max_length=50, unique=True)
     credential_id = models.CharField(max_length=100, blank=True, null=True, unique=True)
@@ -56,6 +83,8 @@ class CredentialDefinition(TimeStampedModel):
     support_revocation = models.BooleanField(default=True)
     revocation_registry_size = models.IntegerField(default=100)
 
+    objects = CredentialDefinitionQuerySet.as_manager()
+
     def credential_json(self):
         return {
             "schema_id": self.schema.schema_id,
@@ -74,7 +103,43 @@ class CredentialDefinition(TimeStampedModel):
         ordering = ("-created",)
 
 
+class CredentialRequestQuerySet(models.QuerySet):
+    def advance_status(self, status: str, **extra_fields) -> int:
+        """
+        Move the matching requests forward to ``status`` in a single UPDATE, stamping the
+        related timestamp. Requests already at (or past) ``status`` are left untouched, so
+        late or duplicated events never move a request backwards.
+        """
+        now = timezone.now()
+        fields = {"status": status, "modified": now, **extra_fields}
+        timestamp_field = CredentialRequest.STATUS_TIMESTAMP_FIELDS.get(status)
+        if timestamp_field:
+            fields[timestamp_field] = now
+        return self.filter(status__in=CredentialRequest.statuses_before(status)).update(**fields)
+
+
 class CredentialRequest(TimeStampedModel):
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        CONNECTED = "connected", "Connected"
+        OFFERED = "offered", "Offered"
+        ISSUED = "issued", "Issued"
+        REVOKED = "revoked", "Revoked"
+
+    STATUS_ORDER = (
+        Status.PENDING,
+        Status.CONNECTED,
+        Status.OFFERED,
+        Status.ISSUED,
+        Status.REVOKED,
+    )
+    STATUS_TIMESTAMP_FIELDS = {
+        Status.CONNECTED: "connected_at",
+        Status.OFFERED: "offered_at",
+        Status.ISSUED: "issued_at",
+        Status.REVOKED: "revoked_at",
+    }
+
     code = models.CharField(max_length=36, default=uuid.uuid4, unique=True)
     credential_definition = models.ForeignKey(
         CredentialDefinition,
@@ -87,14 +152,43 @@ class CredentialRequest(TimeStampedModel):
         on_delete=models.CASCADE,
         related_name="credential_requests",
     )
-    credential_data = JSONField()
-    email = models.EmailField(blank=None, null=False)
+    credential_data = models.JSONField(default=dict)
+    email = models.EmailField(blank=None, null=False, db_index=True)
     organization = models.ForeignKey(Organization, on_delete=models.CASCADE, null=True, blank=True)
     revoked_credential = models.BooleanField(default=False)
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.PENDING, db_index=True
+    )
+    connected_at = models.DateTimeField(blank=True, null=True)
+    offered_at = models.DateTimeField(blank=True, null=True)
+    issued_at = models.DateTimeField(blank=True, null=True)
+    revoked_at = models.DateTimeField(blank=True, null=True)
+    search_document = models.TextField(blank=True, default="", editable=False)
+
+    objects = CredentialRequestQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.code}"
 
+    def save(self, *args, **kwargs):
+        self.search_document = build_search_document(self)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "search_document"}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def statuses_before(cls, status: str) -> tuple:
+        return cls.STATUS_ORDER[: cls.STATUS_ORDER.index(status)]
+
+    @property
+    def is_connected(self) -> bool:
+        return self.status != self.Status.PENDING
+
+    @property
+    def is_issued(self) -> bool:
+        return self.issued_at is not None
+
     @property
     def invitation_url(self):
         return f"{settings.SITE_URL}/deep-link-redirect/{self.code}"
@@ -117,8 +211,10 @@ class CredentialRequest(TimeStampedModel):
 
 class ConnectionInvitation(TimeStampedModel):
     connection_id = models.CharField(max_length=100)
-    invitation_json = JSONField()
+    invitation_json = models.JSONField(default=dict)
     accepted = models.BooleanField(default=False)
+    # the ACA-Py agent (see settings.ACA_PY_AGENTS) the connection lives on
+    agent = models.CharField(max_length=50, default="default")
     credential_request = models.ForeignKey(
         CredentialRequest,
         on_delete=models.CASCADE,
@@ -131,9 +227,26 @@ class ConnectionInvitation(TimeStampedModel):
         return f"Conn:{self.connection_id}-accepted:{self.accepted}"
 
 
+class PooledInvitation(TimeStampedModel):
+    """
+    A single-use connection invitation created ahead of time on ``agent``, waiting to be
+    claimed by a credential request (see ``manager.invitation_pool``).
+    """
+
+    agent = models.CharField(max_length=50, db_index=True)
+    connection_id = models.CharField(max_length=100, unique=True)
+    invitation_json = models.JSONField(default=dict)
+
+    def __str__(self):
+        return f"Pooled:{self.connection_id}-agent:{self.agent}"
+
+    class Meta:
+        ordering = ("id",)
+
+
 class CredentialOffer(TimeStampedModel):
     connection_id = models.CharField(max_length=100)
-    offer_json = JSONField()
+    offer_json = models.JSONField(default=dict)
     accepted = models.BooleanField(default=False)
     credential_request = models.ForeignKey(
         CredentialRequest,
@@ -146,3 +259,105 @@ class CredentialOffer(TimeStampedModel):
 
     def __str__(self):
         return f"Offer:{self.connection_id}-accepted:{self.accepted}"
+
+
+class OutboxMessage(TimeStampedModel):
+    """
+    An ACA-Py side effect recorded in the same transaction as the DB changes it follows
+    from, and executed by ``manager.outbox.dispatch`` once that transaction has committed.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending"
+        PROCESSING = "processing"
+        DONE = "done"
+        FAILED = "failed"
+
+    action = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.PENDING, db_index=True
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now, db_index=True)
+    last_error = models.TextField(blank=True)
+    result = models.JSONField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Outbox:{self.action}-{self.status}"
+
+    class Meta:
+        ordering = ("available_at", "id")
+
+
+# Proof request templates by proof definition id (see manager.proof_workflow)
+PROOF_TEMPLATE_CACHE = "proof_template"
+
+
+class ProofDefinition(TimeStampedModel):
+    """What a verifier asks for: the template of an indy proof request, without its nonce."""
+
+    name = models.CharField(max_length=50, unique=True)
+    proof_request = models.JSONField(default=dict)
+    enabled = models.BooleanField(default=True)
+    creator = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="proof_definitions",
+    )
+    organization = models.ForeignKey(
+        Organization,
+        null=True,
+        blank=True,
+        related_name="proof_definitions",
+        on_delete=models.CASCADE,
+    )
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        ordering = ("-created",)
+
+
+class ProofRequest(TimeStampedModel):
+    """A connectionless proof request, shown as a QR code or a deep link to one holder."""
+
+    class Status(models.TextChoices):
+        REQUESTED = "requested", "Requested"
+        VERIFIED = "verified", "Verified"
+        REJECTED = "rejected", "Rejected"
+
+    code = models.CharField(max_length=36, default=uuid.uuid4, unique=True)
+    proof_definition = models.ForeignKey(
+        ProofDefinition,
+        on_delete=models.CASCADE,
+        related_name="proof_requests",
+    )
+    creator = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="proof_requests",
+    )
+    presentation_exchange_id = models.CharField(max_length=100, unique=True)
+    thread_id = models.CharField(max_length=100, db_index=True)
+    presentation_json = models.JSONField(default=dict)
+    status = models.CharField(
+        max_length=20, choices=Status.choices, default=Status.REQUESTED, db_index=True
+    )
+    verified_at = models.DateTimeField(blank=True, null=True)
+    revealed_attributes = models.JSONField(default=dict, blank=True)
+
+    def __str__(self):
+        return f"{self.code}"
+
+    @property
+    def invitation_url(self):
+        return f"{settings.SITE_URL}/proof-request/{self.code}/deep-link"
+
+    @property
+    def qr_code_url(self):
+        return f"{settings.SITE_URL}/proof-request/{self.code}/qr-code"
+
+    class Meta:
+        ordering = ("-created",)
@@ -0,0 +1,376 @@
+"""
+Transactional outbox for ACA-Py side effects.
+
+Views record their DB changes together with an ``OutboxMessage`` in one short
+transaction and only then run the ACA-Py call, so no row lock or transaction is held
+while ACA-Py (or the ledger behind it) answers. Messages whose dispatch did not complete
+(ACA-Py unreachable, worker restarted...) are retried by ``manage.py dispatch_outbox``.
+Delivery is at least once: actions must tolerate being run again. Before running an action
+again after an attempt that may have reached ACA-Py, its ``recovery`` looks for what that
+attempt did, and a message that ends failed has its ``compensation`` undo the DB changes it
+followed from, as the rollback of a transaction around the ACA-Py call would have.
+"""
+from datetime import timedelta
+from typing import Optional
+
+import structlog as logging
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from requests import HTTPError
+
+from aca.client import ACAClientFactory
+from manager.credential_workflow import (
+    acredential_offer_create,
+    credential_offer_create,
+    credential_offer_record,
+)
+from manager.handlers import ACAPy
+from manager.models import (
+    ConnectionInvitation,
+    CredentialOffer,
+    CredentialRequest,
+    OutboxMessage,
+    Schema,
+)
+from manager.reconciliation import issue_credential_records
+
+LOGGER = logging.getLogger(__name__)
+
+ACTIONS = {}
+# coroutine variants of actions, run by adispatch
+ASYNC_ACTIONS = {}
+# by action: the result of an earlier attempt that reached ACA-Py, None if none did
+RECOVERIES = {}
+# by action: undo the DB changes of a message that ended failed
+COMPENSATIONS = {}
+
+
+def action(name: str):
+    def decorator(function):
+        ACTIONS[name] = function
+        return function
+
+    return decorator
+
+
+def async_action(name: str):
+    """Register the coroutine variant of the ``name`` action, for ``adispatch``."""
+
+    def decorator(function):
+        ASYNC_ACTIONS[name] = function
+        return function
+
+    return decorator
+
+
+def recovery(name: str):
+    """Register how to find the result of an earlier attempt of the ``name`` action."""
+
+    def decorator(function):
+        RECOVERIES[name] = function
+        return function
+
+    return decorator
+
+
+def compensation(name: str):
+    """Register how to undo the DB changes of a failed ``name`` message."""
+
+    def decorator(function):
+        COMPENSATIONS[name] = function
+        return function
+
+    return decorator
+
+
+def _offer_invitation(payload: dict) -> ConnectionInvitation:
+    return ConnectionInvitation.objects.select_related(
+        "credential_request__credential_definition"
+    ).get(id=payload["connection_invitation"])
+
+
+def _sent_offer(connection_invitation: ConnectionInvitation, payload: dict) -> Optional[dict]:
+    """
+    The offer already sent for the credential request of ``connection_invitation``. For an
+    offer sent again (``resend_after``), only one recorded after the offer of that id counts.
+    """
+    offers = CredentialOffer.objects.filter(
+        credential_request_id=connection_invitation.credential_request_id
+    )
+    if payload.get("resend_after") is not None:
+        offers = offers.filter(id__gt=payload["resend_after"])
+    return offers.order_by("-id").values_list("offer_json", flat=True).first()
+
+
+@action("send_credential_offer")
+def send_credential_offer(payload: dict) -> dict:
+    connection_invitation = _offer_invitation(payload)
+    sent = _sent_offer(connection_invitation, payload)
+    if sent is not None:
+        return sent
+    return credential_offer_create(connection_invitation.connection_id, connection_invitation)
+
+
+@async_action("send_credential_offer")
+async def asend_credential_offer(payload: dict) -> dict:
+    connection_invitation = await sync_to_async(_offer_invitation)(payload)
+    sent = await sync_to_async(_sent_offer)(connection_invitation, payload)
+    if sent is not None:
+        return sent
+    return await acredential_offer_create(
+        connection_invitation.connection_id, connection_invitation
+    )
+
+
+@recovery("send_credential_offer")
+def recover_credential_offer(payload: dict) -> Optional[dict]:
+    """
+    The offer an interrupted attempt (timed out, worker restarted...) did send: an exchange of
+    ACA-Py over the connection, for the credential definition, that no offer records.
+    """
+    connection_invitation = _offer_invitation(payload)
+    sent = _sent_offer(connection_invitation, payload)
+    if sent is not None:
+        return sent
+
+    connection_id = connection_invitation.connection_id
+    credential_definition = connection_invitation.credential_request.credential_definition
+    known = set(
+        CredentialOffer.objects.filter(connection_id=connection_id).values_list(
+            "cred_ex_id", flat=True
+        )
+    )
+    client = ACAClientFactory.create_client(agent=connection_invitation.agent)
+    for page in issue_credential_records(client, connection_id=connection_id):
+        for record in page:
+            if (
+                record.get("credential_definition_id") == credential_definition.credential_id
+                and record.get("credential_exchange_id") not in known
+            ):
+                return credential_offer_record(connection_id, connection_invitation, record)
+    return None
+
+
+@compensation("send_credential_offer")
+def discard_credential_request(payload: dict):
+    """
+    Remove the credential request ``CredentialView.enqueue_offer`` created for an offer that
+    was never sent, and unlink the invitation it was given, unless created for it.
+    """
+    if not payload.get("discard_request"):
+        return
+    connection_invitation = ConnectionInvitation.objects.get(id=payload["connection_invitation"])
+    credential_request_id = connection_invitation.credential_request_id
+    if credential_request_id is None or _sent_offer(connection_invitation, payload) is not None:
+        return
+    with transaction.atomic():
+        if not payload.get("invitation_created"):
+            ConnectionInvitation.objects.filter(id=connection_invitation.id).update(
+                credential_request=None
+            )
+        # the invitations created for it go with it
+        CredentialRequest.objects.filter(id=credential_request_id).delete()
+    LOGGER.info(
+        f"outbox: send_credential_offer: credential request {credential_request_id} discarded"
+    )
+
+
+@action("create_schema")
+def create_schema(payload: dict) -> dict:
+    schema = Schema.objects.get(id=payload["schema"])
+    if not schema.schema_id:
+        aca_py = ACAPy(organization=schema.organization_id)
+        schema.schema_id = aca_py.create_schema(schema.schema_json).get("schema_id")
+        # kept before anything else can fail: a retry must not publish the schema again
+        Schema.objects.filter(id=schema.id).update(
+            schema_id=schema.schema_id, enabled=True, modified=timezone.now()
+        )
+    if payload.get("replaces"):
+        Schema.objects.filter(id=payload["replaces"]).update(enabled=False, modified=timezone.now())
+    return {"schema_id": schema.schema_id}
+
+
+@compensation("create_schema")
+def discard_schema(payload: dict):
+    """
+    Remove the schema ``SchemaViewSet.update`` created, disabled, for a schema the ledger
+    did not accept. The schema it replaces stays enabled.
+    """
+    Schema.objects.filter(id=payload["schema"], schema_id__isnull=True).delete()
+
+
+def enqueue(action_name: str, payload: dict, dispatch_on_commit: bool = True) -> OutboxMessage:
+    """
+    Record ``action_name`` in the current transaction. Unless the caller dispatches the
+    message itself, it is dispatched right after the transaction commits.
+    """
+    if action_name not in ACTIONS:
+        raise ValueError(f"Unknown outbox action: '{action_name}'")
+    message = OutboxMessage.objects.create(action=action_name, payload=payload)
+    if dispatch_on_commit:
+        transaction.on_commit(lambda: dispatch(message.id))
+    return message
+
+
+def enqueue_later(action_name: str, payloads: [dict], delay: float) -> [OutboxMessage]:
+    """
+    Record one ``action_name`` message per payload in the current transaction, in a single
+    INSERT. They are due in ``delay`` seconds, for ``dispatch_outbox`` to run.
+    """
+    if action_name not in ACTIONS:
+        raise ValueError(f"Unknown outbox action: '{action_name}'")
+    available_at = timezone.now() + timedelta(seconds=delay)
+    return OutboxMessage.objects.bulk_create(
+        OutboxMessage(action=action_name, payload=payload, available_at=available_at)
+        for payload in payloads
+    )
+
+
+def enqueue_retries(action_name: str, failures: [(dict, Exception)]) -> [Optional[OutboxMessage]]:
+    """
+    Record one ``action_name`` message per payload whose first attempt, made outside of the
+    outbox, failed with the error given: due after the first backoff, for ``dispatch_outbox`` to
+    retry (and recover) it. The failures not worth retrying are compensated at once and have
+    no message (None).
+    """
+    if action_name not in ACTIONS:
+        raise ValueError(f"Unknown outbox action: '{action_name}'")
+    available_at = timezone.now() + timedelta(seconds=getattr(settings, "OUTBOX_RETRY_BACKOFF", 30))
+    messages = [
+        OutboxMessage(
+            action=action_name,
+            payload=payload,
+            attempts=1,
+            available_at=available_at,
+            last_error=_error_text(error),
+        )
+        if _is_retryable(error)
+        else None
+        for payload, error in failures
+    ]
+    OutboxMessage.objects.bulk_create(message for message in messages if message is not None)
+
+    compensate = COMPENSATIONS.get(action_name)
+    for (payload, _), message in zip(failures, messages):
+        if message is None and compensate is not None:
+            compensate(payload)
+    return messages
+
+
+def dispatch(message_id: int) -> Optional[OutboxMessage]:
+    """
+    Run a pending message, unless another dispatcher claimed it first (None is returned
+    then). The claim is a single conditional UPDATE, the action runs outside of any
+    transaction and its outcome is written back to the message.
+    """
+    message = _claim(message_id)
+    if message is None:
+        return None
+    try:
+        result = _recover(message)
+        if result is None:
+            result = ACTIONS[message.action](message.payload)
+    except Exception as error:
+        return _finish(message, error=error)
+    return _finish(message, result=result)
+
+
+async def adispatch(message_id: int) -> Optional[OutboxMessage]:
+    """``dispatch`` from a coroutine: the action's async variant runs without a thread."""
+    message = await sync_to_async(_claim)(message_id)
+    if message is None:
+        return None
+    function = ASYNC_ACTIONS.get(message.action) or sync_to_async(ACTIONS[message.action])
+    try:
+        result = await sync_to_async(_recover)(message)
+        if result is None:
+            result = await function(message.payload)
+    except Exception as error:
+        return await sync_to_async(_finish)(message, error=error)
+    return await sync_to_async(_finish)(message, result=result)
+
+
+def _claim(message_id: int) -> Optional[OutboxMessage]:
+    now = timezone.now()
+    claimed = OutboxMessage.objects.filter(
+        id=message_id, status=OutboxMessage.Status.PENDING, available_at__lte=now
+    ).update(status=OutboxMessage.Status.PROCESSING, attempts=F("attempts") + 1, modified=now)
+    if not claimed:
+        return None
+    return OutboxMessage.objects.get(id=message_id)
+
+
+def _recover(message: OutboxMessage) -> Optional[dict]:
+    """On a retry, what an earlier attempt of ``message`` achieved, if anything."""
+    recover = RECOVERIES.get(message.action)
+    if recover is None or message.attempts <= 1:
+        return None
+    return recover(message.payload)
+
+
+def _compensate(message: OutboxMessage):
+    compensate = COMPENSATIONS.get(message.action)
+    if compensate is None:
+        return
+    try:
+        compensate(message.payload)
+    except Exception as error:
+        LOGGER.error(f"outbox: {message.action}: message {message.id} not compensated: {error}")
+
+
+def _finish(message: OutboxMessage, result: dict = None, error: Exception = None) -> OutboxMessage:
+    """Write the outcome of the action back to ``message``."""
+    if error is not None:
+        message.last_error = _error_text(error)
+        if _is_retryable(error) and message.attempts < getattr(settings, "OUTBOX_MAX_ATTEMPTS", 5):
+            message.status = OutboxMessage.Status.PENDING
+            message.available_at = timezone.now() + timedelta(
+                seconds=getattr(settings, "OUTBOX_RETRY_BACKOFF", 30) * 2 ** (message.attempts - 1)
+            )
+        else:
+            message.status = OutboxMessage.Status.FAILED
+        LOGGER.error(
+            f"outbox: {message.action}: message {message.id} attempt {message.attempts} "
+            f"failed, {message.status}: {message.last_error}"
+        )
+    else:
+        message.result = result
+        message.status = OutboxMessage.Status.DONE
+        message.last_error = ""
+
+    message.save(update_fields=["status", "available_at", "last_error", "result", "modified"])
+    if message.status == OutboxMessage.Status.FAILED:
+        _compensate(message)
+    return message
+
+
+def dispatch_pending(limit: int = 100) -> int:
+    """Dispatch up to ``limit`` due messages, releasing the ones stuck in processing first."""
+    stuck_before = timezone.now() - timedelta(
+        seconds=getattr(settings, "OUTBOX_PROCESSING_TIMEOUT", 300)
+    )
+    OutboxMessage.objects.filter(
+        status=OutboxMessage.Status.PROCESSING, modified__lt=stuck_before
+    ).update(status=OutboxMessage.Status.PENDING)
+
+    ids = OutboxMessage.objects.filter(
+        status=OutboxMessage.Status.PENDING, available_at__lte=timezone.now()
+    ).values_list("id", flat=True)[:limit]
+    return sum(1 for message_id in list(ids) if dispatch(message_id) is not None)
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Only a request ACA-Py answered with a client error is not worth retrying."""
+    if isinstance(error, HTTPError) and error.response is not None:
+        status_code = getattr(error.response, "status_code", None)
+        return isinstance(status_code, int) and status_code >= 500
+    return True
+
+
+def _error_text(error: Exception) -> str:
+    if isinstance(error, HTTPError) and error.response is not None:
+        return error.response.text
+    return str(error)
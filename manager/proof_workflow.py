@@ -0,0 +1,131 @@
+"""
+Connectionless verification: a proof request is created in ACA-Py, wrapped with the agent's
+``~service`` decorator (``aca.models.PresentationFactory``) and handed to the holder as a
+deep link or a QR code. ACA-Py reports the verified presentation on the ``present_proof``
+webhook.
+
+Everything but the nonce is the same for all the requests of a proof definition, so it is
+kept in the shared cache: a check-in costs one ACA-Py call and one INSERT.
+"""
+import base64
+import json
+
+import structlog as logging
+from django.conf import settings
+from django.utils import timezone
+
+from aca import agents
+from aca.client import ACAClientFactory
+from aca.models import PresentationFactory
+from manager import cache
+from manager.handlers import ACAPy
+from manager.models import PROOF_TEMPLATE_CACHE, ProofDefinition, ProofRequest
+
+LOGGER = logging.getLogger(__name__)
+
+
+def proof_request_template(proof_definition_id: int) -> dict:
+    """
+    The cached parts of the requests of an enabled proof definition: the ``proof_request``
+    to send to ACA-Py, the ``agent`` to send it to and the ``verkey`` and ``endpoint`` of the
+    ``~service`` decorator.
+    """
+    template = cache.get_or_set(
+        PROOF_TEMPLATE_CACHE,
+        proof_definition_id,
+        lambda: _build_template(proof_definition_id),
+        timeout=settings.CACHE_TIMEOUTS["proof_template"],
+    )
+    if template is None:
+        raise ProofDefinition.DoesNotExist(
+            f"No enabled proof definition with id={proof_definition_id}"
+        )
+    return template
+
+
+def _build_template(proof_definition_id: int):
+    proof_definition = ProofDefinition.objects.filter(id=proof_definition_id, enabled=True).first()
+    if proof_definition is None:
+        return None
+    proof_request = {
+        "name": proof_definition.name,
+        "version": "1.0",
+        "requested_attributes": {},
+        "requested_predicates": {},
+        **proof_definition.proof_request,
+    }
+    proof_request.pop("nonce", None)
+    aca_py = ACAPy(organization=proof_definition.organization_id)
+    return {
+        "proof_definition_id": proof_definition.id,
+        "name": proof_definition.name,
+        "proof_request": proof_request,
+        "agent": agents.agent_for(proof_definition.organization_id).name,
+        "verkey": aca_py.get_public_did()["verkey"],
+        "endpoint": aca_py.client.get_endpoint_url(),
+    }
+
+
+def proof_request_create(proof_definition_id: int, creator) -> ProofRequest:
+    template = proof_request_template(proof_definition_id)
+    # one client (and its keep-alive connections) per agent and thread, see aca.agents
+    aca_client = ACAClientFactory.create_client(agent=template["agent"])
+    exchange = aca_client.create_proof_request(
+        {"proof_request": template["proof_request"], "comment": template["name"], "trace": False}
+    )
+    presentation = PresentationFactory.from_params(
+        presentation_request=exchange["presentation_request"],
+        p_id=exchange["thread_id"],
+        verkey=[template["verkey"]],
+        endpoint=template["endpoint"],
+    )
+    return ProofRequest.objects.create(
+        proof_definition_id=template["proof_definition_id"],
+        creator=creator,
+        presentation_exchange_id=exchange["presentation_exchange_id"],
+        thread_id=exchange["thread_id"],
+        presentation_json=presentation.to_json(),
+    )
+
+
+def deep_link(proof_request: ProofRequest) -> str:
+    message = json.dumps(proof_request.presentation_json, separators=(",", ":"))
+    return f"didcomm://launch?d_m={base64.urlsafe_b64encode(message.encode()).decode()}"
+
+
+def proof_request_verified(message: dict) -> int:
+    """
+    Record the outcome reported by a ``present_proof`` webhook in ``verified`` state.
+    Requests already verified or rejected are left untouched.
+    """
+    presentation_exchange_id = message.get("presentation_exchange_id")
+    verified = str(message.get("verified")).lower() == "true"
+    updated = ProofRequest.objects.filter(
+        presentation_exchange_id=presentation_exchange_id,
+        status=ProofRequest.Status.REQUESTED,
+    ).update(
+        status=ProofRequest.Status.VERIFIED if verified else ProofRequest.Status.REJECTED,
+        revealed_attributes=revealed_attributes(message) if verified else {},
+        verified_at=timezone.now(),
+        modified=timezone.now(),
+    )
+    if not updated:
+        LOGGER.info(
+            f"proof_request_verified: presentation_exchange_id: {presentation_exchange_id} "
+            "- no pending proof request"
+        )
+    return updated
+
+
+def revealed_attributes(message: dict) -> dict:
+    """The revealed values of a verified presentation, by attribute name."""
+    requested = message.get("presentation_request", {}).get("requested_attributes", {})
+    requested_proof = message.get("presentation", {}).get("requested_proof", {})
+    attributes = {}
+    for referent, value in requested_proof.get("revealed_attrs", {}).items():
+        name = requested.get(referent, {}).get("name", referent)
+        attributes[name] = value.get("raw")
+    for group in requested_proof.get("revealed_attr_groups", {}).values():
+        for name, value in group.get("values", {}).items():
+            attributes[name] = value.get("raw")
+    return attributes
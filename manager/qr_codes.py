@@ -0,0 +1,178 @@
+"""
+QR code rendering, one at a time for the views and in bulk for ``manage.py render_qr_codes``.
+
+The version and error correction of a code are chosen before it is built (``plan``): the
+highest error correction whose code fits in ``QR_CODE_MAX_VERSION``, in the smallest version
+holding the data, so ``qrcode`` neither refits the version nor grows the code past what a
+phone reads from an email. The modules are then written at once, as a 1-bit palette PNG or as
+an SVG with one path, instead of being drawn as a rectangle each.
+
+``render_many`` spreads the codes over a pool of processes: building a code (mostly scoring
+its 8 masks) is pure Python, which threads would not run in parallel.
+"""
+import io
+import os
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+PNG, SVG = "png", "svg"
+CONTENT_TYPES = {PNG: "image/png", SVG: "image/svg+xml"}
+
+# from the most to the least robust
+ERROR_CORRECTIONS = ("H", "Q", "M", "L")
+
+# the first version of each size of the character count field
+_VERSION_CLASSES = (1, 10, 27)
+
+
+def _chunks(data: str) -> list:
+    from qrcode import util
+
+    return list(util.optimal_data_chunks(data, minimum=20))
+
+
+def _data_bits(chunk) -> int:
+    """The bits of ``chunk`` once encoded, whatever the version."""
+    from qrcode import util
+
+    length = len(chunk)
+    if chunk.mode == util.MODE_NUMBER:
+        return 10 * (length // 3) + (0, 4, 7)[length % 3]
+    if chunk.mode == util.MODE_ALPHA_NUM:
+        return 11 * (length // 2) + 6 * (length % 2)
+    return 8 * length
+
+
+def _needed_bits(chunks: list, version: int) -> int:
+    """The bits of ``chunks`` in a code of ``version``: only the length fields depend on it."""
+    from qrcode import util
+
+    return sum(4 + util.length_in_bits(chunk.mode, version) + _data_bits(chunk) for chunk in chunks)
+
+
+def _smallest_version(chunks: list, error_correction: int, min_version: int) -> Optional[int]:
+    from qrcode import util
+
+    limits = util.BIT_LIMIT_TABLE[error_correction]
+    for start, end in zip(_VERSION_CLASSES, _VERSION_CLASSES[1:] + (41,)):
+        if end <= min_version:
+            continue
+        start = max(start, min_version)
+        version = bisect_left(limits, _needed_bits(chunks, start), start, end)
+        if version < end:
+            return version
+    return None
+
+
+def plan(data: str, max_version: int = None, min_version: int = 1) -> Tuple[int, str]:
+    """
+    The version and error correction level ("H", "Q", "M" or "L") of the QR code of ``data``.
+    Raises ``qrcode.exceptions.DataOverflowError`` when it does not fit in any version.
+    """
+    from qrcode import constants, exceptions
+
+    max_version = max_version or settings.QR_CODE_MAX_VERSION
+    chunks = _chunks(data)
+    smallest = None
+    for level in ERROR_CORRECTIONS:
+        version = _smallest_version(
+            chunks, getattr(constants, f"ERROR_CORRECT_{level}"), min_version
+        )
+        if version is not None and version <= max_version:
+            return version, level
+        smallest = (version, level) if version is not None else smallest
+    if smallest is None:
+        raise exceptions.DataOverflowError(f"{len(data)} characters do not fit in a QR code")
+    # too long for max_version: as small as the data allows
+    return smallest
+
+
+def matrix(data: str, version: int, level: str, border: int = 4) -> List[List[bool]]:
+    """The modules of the QR code of ``data``, True for the dark ones, with the quiet zone."""
+    import qrcode
+    from qrcode import constants
+
+    qr = qrcode.QRCode(
+        version=version,
+        error_correction=getattr(constants, f"ERROR_CORRECT_{level}"),
+        border=border,
+    )
+    for chunk in _chunks(data):
+        qr.add_data(chunk)
+    qr.make(fit=False)
+    return qr.get_matrix()
+
+
+def _png(modules: List[List[bool]], box_size: int) -> bytes:
+    from PIL import Image
+
+    size = len(modules)
+    image = Image.frombytes("P", (size, size), bytes(dark for row in modules for dark in row))
+    image.putpalette((255, 255, 255, 0, 0, 0))
+    image = image.resize((size * box_size, size * box_size), Image.Resampling.NEAREST)
+    output = io.BytesIO()
+    image.save(output, "PNG", bits=1)
+    return output.getvalue()
+
+
+def _svg(modules: List[List[bool]]) -> bytes:
+    """
+    One path stroking the runs of dark modules of each row, every run but the first of a row
+    placed relative to the end of the previous one, scaled by the viewer.
+    """
+    size = len(modules)
+    path = []
+    for y, row in enumerate(modules):
+        x = end = 0
+        while x < size:
+            if not row[x]:
+                x += 1
+                continue
+            run = 1
+            while x + run < size and row[x + run]:
+                run += 1
+            path.append(f"m{x - end} 0h{run}" if end else f"M{x} {y}.5h{run}")
+            x = end = x + run
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {size} {size}" '
+        f'shape-rendering="crispEdges"><path fill="#fff" d="M0 0h{size}v{size}H0z"/>'
+        f'<path stroke="#000" d="{"".join(path)}"/></svg>'
+    ).encode()
+
+
+def render(
+    data: str,
+    image_format: str = PNG,
+    box_size: int = 10,
+    border: int = 4,
+    max_version: int = None,
+    min_version: int = 1,
+) -> bytes:
+    """The QR code of ``data`` as a PNG or an SVG image."""
+    if image_format not in CONTENT_TYPES:
+        raise ValueError(f"Unsupported QR code format: '{image_format}'")
+    version, level = plan(data, max_version, min_version)
+    modules = matrix(data, version, level, border)
+    return _png(modules, box_size) if image_format == PNG else _svg(modules)
+
+
+def render_many(
+    texts: Iterable[str],
+    image_format: str = PNG,
+    processes: int = None,
+    chunksize: int = 16,
+    **options,
+) -> Iterator[bytes]:
+    """
+    The QR codes of ``texts``, in order, rendered by ``processes`` processes (one per core by
+    default). ``options`` are those of ``render``.
+    """
+    options.setdefault("max_version", settings.QR_CODE_MAX_VERSION)
+    with ProcessPoolExecutor(max_workers=processes or os.cpu_count()) as executor:
+        yield from executor.map(
+            partial(render, image_format=image_format, **options), texts, chunksize=chunksize
+        )
@@ -0,0 +1,94 @@
+"""
+QR code images kept in a Django storage backend, configured by ``QR_CODE_STORAGE``: the local
+filesystem by default, an S3-compatible bucket (S3, MinIO...) with django-storages. Every node
+reads and writes the same images, none needs a writable filesystem of its own.
+
+An image is named after the hash of what determines its content: the data, the format and the
+rendering settings. The same code is thus stored once, whatever the node or the request
+asking for it, and an image never changes once stored: it is served (``manager.views
+.qr_code_image``) with headers letting browsers and proxies cache it for good.
+"""
+import hashlib
+import re
+from typing import Optional
+
+import structlog as logging
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+from manager import qr_codes
+
+LOGGER = logging.getLogger(__name__)
+
+NAME = re.compile(r"^[0-9a-f]{64}\.(png|svg)$")
+# bumped when the images rendered for the same data change
+RENDERING = 1
+
+_storage = None
+
+
+def storage() -> Storage:
+    global _storage
+    if _storage is None:
+        config = settings.QR_CODE_STORAGE
+        _storage = import_string(config["BACKEND"])(**config.get("OPTIONS", {}))
+    return _storage
+
+
+def reset():
+    global _storage
+    _storage = None
+
+
+@receiver(setting_changed)
+def _reset(setting, **kwargs):
+    if setting in ("QR_CODE_STORAGE", "QR_CODE_MAX_VERSION"):
+        reset()
+
+
+def name(data: str, image_format: str = qr_codes.PNG) -> str:
+    digest = hashlib.sha256(
+        f"{RENDERING}:{settings.QR_CODE_MAX_VERSION}:{image_format}:{data}".encode()
+    ).hexdigest()
+    return f"{digest}.{image_format}"
+
+
+def put(image_name: str, content: bytes) -> str:
+    """Store ``content`` as ``image_name``, unless another node just did."""
+    saved = storage().save(image_name, ContentFile(content))
+    if saved != image_name:
+        # stored concurrently: the backend kept both under different names
+        storage().delete(saved)
+    return image_name
+
+
+def store(data: str, image_format: str = qr_codes.PNG) -> str:
+    """The name of the QR image of ``data``, rendered and stored unless it already is."""
+    image_name = name(data, image_format)
+    if not storage().exists(image_name):
+        put(image_name, qr_codes.render(data, image_format))
+    return image_name
+
+
+def read(image_name: str) -> Optional[bytes]:
+    """The content of ``image_name``, None if it is not stored."""
+    if not NAME.match(image_name) or not storage().exists(image_name):
+        return None
+    with storage().open(image_name) as image:
+        return image.read()
+
+
+def url(image_name: str) -> str:
+    """The absolute URL the image is served from."""
+    return f"{settings.SITE_URL}{reverse('qr_code_image', args=[image_name])}"
+
+
+def names() -> set:
+    """The names of the stored images, in one listing."""
+    _, files = storage().listdir("")
+    return {file for file in files if NAME.match(file)}
@@ -0,0 +1,92 @@
+"""
+Sync the local credential offers with the issue-credential records of ACA-Py, repairing
+whatever a missed or failed webhook left behind. See ``manage.py reconcile_credential_offers``.
+"""
+from typing import Iterator
+
+import structlog as logging
+from django.db import transaction
+from django.utils import timezone
+
+from aca import agents
+from aca.client import ACAClient
+from manager.models import CredentialOffer, CredentialRequest
+
+LOGGER = logging.getLogger(__name__)
+
+ISSUED_STATES = {"credential_issued", "credential_acked"}
+RECONCILED_FIELDS = ("revocation_id", "credential_id")
+
+
+def issue_credential_records(client: ACAClient, page_size: int = 100, **params) -> Iterator[[dict]]:
+    """
+    Pages of issuer records. ACA-Py versions without limit/offset support return every
+    record at once: a page adding nothing new ends the iteration.
+    """
+    offset = 0
+    seen = set()
+    while True:
+        page = client.list_issue_credential_records(
+            role="issuer", limit=page_size, offset=offset, **params
+        )
+        new = [record for record in page if record.get("credential_exchange_id") not in seen]
+        if not new:
+            return
+        yield new
+        if len(page) != page_size:
+            return
+        seen.update(record.get("credential_exchange_id") for record in new)
+        offset += page_size
+
+
+def reconcile_records(records: [dict], dry_run: bool = False) -> (int, int):
+    """
+    Apply ``records`` to the offers with the same credential exchange id, in bulk. Returns
+    how many offers changed and how many of them got accepted.
+    """
+    records = {
+        record["credential_exchange_id"]: record
+        for record in records
+        if record.get("credential_exchange_id")
+    }
+    changed, accepted = [], []
+    for offer in CredentialOffer.objects.filter(cred_ex_id__in=records.keys()):
+        record = records[offer.cred_ex_id]
+        dirty = False
+        for field in RECONCILED_FIELDS:
+            value = record.get(field)
+            if value is not None and getattr(offer, field) != value:
+                setattr(offer, field, value)
+                dirty = True
+        if not offer.accepted and record.get("state") in ISSUED_STATES:
+            offer.accepted = True
+            accepted.append(offer)
+            dirty = True
+        if dirty:
+            offer.modified = timezone.now()
+            changed.append(offer)
+
+    if changed and not dry_run:
+        with transaction.atomic():
+            CredentialOffer.objects.bulk_update(
+                changed, [*RECONCILED_FIELDS, "accepted", "modified"]
+            )
+            CredentialRequest.objects.filter(
+                id__in=[offer.credential_request_id for offer in accepted]
+            ).advance_status(CredentialRequest.Status.ISSUED)
+    return len(changed), len(accepted)
+
+
+def reconcile_credential_offers(
+    page_size: int = 100, dry_run: bool = False, client: ACAClient = None, **params
+) -> (int, int):
+    """The records of ``client``, by default those of every agent (see ``aca.agents``)."""
+    clients = [client] if client else [agent.client() for agent in agents.agents().values()]
+    changed = accepted = 0
+    for client in clients:
+        for page in issue_credential_records(client, page_size=page_size, **params):
+            page_changed, page_accepted = reconcile_records(page, dry_run=dry_run)
+            changed += page_changed
+            accepted += page_accepted
+    LOGGER.info(f"reconcile_credential_offers: {changed} offer(s) updated, {accepted} accepted")
+    return changed, accepted
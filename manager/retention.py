@@ -0,0 +1,175 @@
+"""
+Retention policies for issuance data that is no longer needed once a credential request
+has moved on: superseded or stale connection invitations, superseded credential offers and
+QR codes no pending invitation points to. See the ``prune_issuance_data`` command.
+"""
+import os
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional
+
+import structlog as logging
+from django.conf import settings
+from django.core import serializers
+from django.db import connections, transaction
+from django.db.models import Exists, OuterRef, QuerySet
+from django.utils import timezone
+
+from manager import qr_codes, qr_storage
+from manager.models import ConnectionInvitation, CredentialOffer
+from manager.utils import QRCodeHandler
+
+LOGGER = logging.getLogger(__name__)
+
+
+class RetentionPolicy:
+    name = None
+    model = None
+
+    def __init__(self, days: int):
+        self.days = days
+
+    def cutoff(self):
+        return timezone.now() - timedelta(days=self.days)
+
+    def queryset(self) -> QuerySet:
+        raise NotImplementedError
+
+
+class SupersededInvitationsPolicy(RetentionPolicy):
+    """
+    Invitations never accepted, of a credential request for which a newer invitation exists.
+    Accepted ones are kept: they record the agent their connection lives on (see
+    ``credential_workflow.connection_agent``).
+    """
+
+    name = "superseded_invitations"
+    model = ConnectionInvitation
+
+    def queryset(self) -> QuerySet:
+        newer = ConnectionInvitation.objects.filter(
+            credential_request=OuterRef("credential_request"), created__gt=OuterRef("created")
+        )
+        return ConnectionInvitation.objects.filter(
+            created__lt=self.cutoff(), credential_request__isnull=False, accepted=False
+        ).filter(Exists(newer))
+
+
+class StaleInvitationsPolicy(RetentionPolicy):
+    """Invitations never accepted; a new one is created if the deep link is opened again."""
+
+    name = "stale_invitations"
+    model = ConnectionInvitation
+
+    def queryset(self) -> QuerySet:
+        return ConnectionInvitation.objects.filter(created__lt=self.cutoff(), accepted=False)
+
+
+class SupersededOffersPolicy(RetentionPolicy):
+    """Offers never accepted, for which a newer offer was sent to the same request."""
+
+    name = "superseded_offers"
+    model = CredentialOffer
+
+    def queryset(self) -> QuerySet:
+        newer = CredentialOffer.objects.filter(
+            credential_request=OuterRef("credential_request"), created__gt=OuterRef("created")
+        )
+        return CredentialOffer.objects.filter(created__lt=self.cutoff(), accepted=False).filter(
+            Exists(newer)
+        )
+
+
+POLICIES = (SupersededInvitationsPolicy, StaleInvitationsPolicy, SupersededOffersPolicy)
+
+
+def configured_policies() -> [RetentionPolicy]:
+    retention = getattr(settings, "ISSUANCE_DATA_RETENTION", {})
+    return [
+        policy_class(retention[policy_class.name])
+        for policy_class in POLICIES
+        if retention.get(policy_class.name) is not None
+    ]
+
+
+def prune(
+    policy: RetentionPolicy,
+    batch_size: int = 500,
+    pause: float = 0,
+    dry_run: bool = False,
+    archive_dir: Optional[str] = None,
+    max_batches: Optional[int] = None,
+) -> int:
+    """
+    Delete what ``policy`` selects in short transactions of at most ``batch_size`` rows,
+    sleeping ``pause`` seconds in between so that an online database keeps up. Rows are
+    appended to a JSONL file in ``archive_dir`` before being deleted.
+    """
+    if dry_run:
+        return policy.queryset().count()
+
+    archive = None
+    if archive_dir:
+        os.makedirs(archive_dir, exist_ok=True)
+        archive_path = Path(archive_dir) / (
+            f"{policy.name}-{timezone.now().strftime('%Y%m%d%H%M%S')}.jsonl"
+        )
+        archive = open(archive_path, "a")
+
+    deleted = batches = 0
+    try:
+        while max_batches is None or batches < max_batches:
+            ids = list(policy.queryset().order_by("pk").values_list("pk", flat=True)[:batch_size])
+            if not ids:
+                break
+            with transaction.atomic():
+                batch = policy.model.objects.filter(pk__in=ids)
+                if archive:
+                    archive.write(serializers.serialize("jsonl", batch))
+                batch.delete()
+            deleted += len(ids)
+            batches += 1
+            LOGGER.info(f"prune: {policy.name}: deleted {deleted} row(s)")
+            if pause:
+                time.sleep(pause)
+    finally:
+        if archive:
+            archive.close()
+
+    return deleted
+
+
+def vacuum(model, using: str = "default"):
+    """Give the space of the deleted rows back to PostgreSQL and refresh planner stats."""
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"VACUUM (ANALYZE) {connection.ops.quote_name(model._meta.db_table)}")
+
+
+def prune_qr_codes(days: int, dry_run: bool = False) -> int:
+    """
+    Remove QR images older than ``days`` that no pending invitation points to. QR codes of
+    pending invitations are kept since they are embedded in emails not yet acted upon.
+    """
+    storage = qr_storage.storage()
+    cutoff = time.time() - days * 24 * 60 * 60
+    live = {
+        QRCodeHandler.file_name(invitation_json["invitation_url"], image_format)
+        for invitation_json in ConnectionInvitation.objects.filter(accepted=False)
+        .values_list("invitation_json", flat=True)
+        .iterator()
+        if isinstance(invitation_json, dict) and invitation_json.get("invitation_url")
+        for image_format in qr_codes.CONTENT_TYPES
+    }
+
+    removed = 0
+    for name in sorted(qr_storage.names() - live):
+        if storage.get_modified_time(name).timestamp() >= cutoff:
+            continue
+        if not dry_run:
+            storage.delete(name)
+        removed += 1
+    return removed
@@ -0,0 +1,170 @@
+"""
+Indexed search over credential requests.
+
+Every CredentialRequest keeps a lower-cased ``search_document`` (email, code, credential
+definition name, organization and the credential attributes listed in
+``settings.CREDENTIAL_REQUEST_SEARCH_ATTRIBUTES``, all of them when unset). The document
+is indexed with a GIN trigram index on PostgreSQL and with an FTS5 table on SQLite, both
+installed by the migrations. API and admin search go through ``search_credential_requests``.
+"""
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import QuerySet
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = "manager_credentialrequest_fts"
+TRIGRAM_INDEX = "manager_credentialrequest_search_trgm"
+
+_WORD_SEPARATOR = re.compile(r"\s+")
+
+
+def build_search_document(credential_request) -> str:
+    attributes = getattr(settings, "CREDENTIAL_REQUEST_SEARCH_ATTRIBUTES", None)
+    credential_data = credential_request.credential_data or {}
+    if not isinstance(credential_data, dict):
+        credential_data = {}
+
+    parts = [
+        credential_request.email,
+        credential_request.code,
+        credential_request.credential_definition.name
+        if credential_request.credential_definition_id
+        else None,
+        credential_request.organization_id,
+    ]
+    parts.extend(
+        value for key, value in credential_data.items() if attributes is None or key in attributes
+    )
+    return " ".join(str(part) for part in parts if part not in (None, "")).lower()
+
+
+def search_terms(search_term: str) -> [str]:
+    return [term for term in _WORD_SEPARATOR.split(search_term.strip().lower()) if term]
+
+
+class SearchBackend:
+    """Fallback: LIKE over the search document, one condition per term."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def search(self, queryset: QuerySet, terms: [str]) -> QuerySet:
+        for term in terms:
+            queryset = queryset.filter(search_document__contains=term)
+        return queryset
+
+
+class PostgreSQLSearchBackend(SearchBackend):
+    """
+    ``LIKE '%term%'`` over the lower-cased document is served by the ``gin_trgm_ops``
+    index, so the fallback lookups are already indexed here.
+    """
+
+    @staticmethod
+    def install(schema_editor):
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON manager_credentialrequest "
+            f"USING gin (search_document gin_trgm_ops)"
+        )
+
+    @staticmethod
+    def uninstall(schema_editor):
+        schema_editor.execute(f"DROP INDEX IF EXISTS {TRIGRAM_INDEX}")
+
+
+class SQLiteSearchBackend(SearchBackend):
+    """FTS5 external-content table kept in sync with manager_credentialrequest by triggers."""
+
+    def search(self, queryset: QuerySet, terms: [str]) -> QuerySet:
+        if FTS_TABLE not in self.connection.introspection.table_names():
+            return super().search(queryset, terms)
+
+        match = " ".join('"{0}"*'.format(term.replace('"', '""')) for term in terms)
+        return queryset.filter(
+            pk__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+        )
+
+    @staticmethod
+    def install(schema_editor):
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            f"search_document, content='manager_credentialrequest', content_rowid='id')"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON "
+            f"manager_credentialrequest BEGIN "
+            f"INSERT INTO {FTS_TABLE}(rowid, search_document) "
+            f"VALUES (new.id, new.search_document); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON "
+            f"manager_credentialrequest BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document) "
+            f"VALUES ('delete', old.id, old.search_document); END"
+        )
+        schema_editor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF search_document ON "
+            f"manager_credentialrequest BEGIN "
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document) "
+            f"VALUES ('delete', old.id, old.search_document); "
+            f"INSERT INTO {FTS_TABLE}(rowid, search_document) "
+            f"VALUES (new.id, new.search_document); END"
+        )
+        schema_editor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+    @staticmethod
+    def uninstall(schema_editor):
+        for suffix in ("ai", "ad", "au"):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+SEARCH_BACKENDS = {
+    "postgresql": PostgreSQLSearchBackend,
+    "sqlite": SQLiteSearchBackend,
+}
+
+
+def get_search_backend(using: str = "default") -> SearchBackend:
+    connection = connections[using]
+    return SEARCH_BACKENDS.get(connection.vendor, SearchBackend)(connection)
+
+
+def rebuild_search_documents(queryset: QuerySet, batch_size: int = 1000) -> int:
+    updated = 0
+    batch = []
+    for credential_request in queryset.select_related("credential_definition").iterator(
+        chunk_size=batch_size
+    ):
+        credential_request.search_document = build_search_document(credential_request)
+        batch.append(credential_request)
+        if len(batch) >= batch_size:
+            queryset.model.objects.bulk_update(batch, ["search_document"])
+            updated += len(batch)
+            batch = []
+    if batch:
+        queryset.model.objects.bulk_update(batch, ["search_document"])
+        updated += len(batch)
+    return updated
+
+
+def install_search_index(apps, schema_editor):
+    backend_class = SEARCH_BACKENDS.get(schema_editor.connection.vendor)
+    if backend_class:
+        backend_class.install(schema_editor)
+
+
+def uninstall_search_index(apps, schema_editor):
+    backend_class = SEARCH_BACKENDS.get(schema_editor.connection.vendor)
+    if backend_class:
+        backend_class.uninstall(schema_editor)
+
+
+def search_credential_requests(queryset: QuerySet, search_term: str) -> QuerySet:
+    terms = search_terms(search_term or "")
+    if not terms:
+        return queryset
+    return get_search_backend(queryset.db).search(queryset, terms)
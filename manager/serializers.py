@@ -16,6 +16,8 @@ from manager.models import (
     CredentialOffer,
     CredentialRequest,
     Organization,
+    ProofDefinition,
+    ProofRequest,
     Schema,
 )
 from manager.utils import anonymize_values
@@ -49,7 +51,9 @@ class SchemaSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         validated_data["creator"] = self.context["request"].user
-        schema = ACAPy().create_schema(validated_data["schema_json"])
+        schema = ACAPy(organization=validated_data.get("organization")).create_schema(
+            validated_data["schema_json"]
+        )
         validated_data["schema_id"] = schema.get("schema_id")
         return super(SchemaSerializer, self).create(validated_data)
 
@@ -70,7 +74,8 @@ class CredentialDefinitionSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         validated_data["creator"] = self.context["request"].user
 
-        credential_definition_upload_result = ACAPy().create_credential_definition(
+        aca_py = ACAPy(organization=validated_data["schema"].organization_id)
+        credential_definition_upload_result = aca_py.create_credential_definition(
             {
                 "schema_id": validated_data["schema"].schema_id,
                 "tag": re.sub(r"\W", "", validated_data["name"]),
@@ -110,13 +115,13 @@ class CredentialRequestSerializer(serializers.ModelSerializer):
     def _validate_credential_definition(self, data):
         cred_def_id_or_name = data.get("credential_definition")
         try:
-            self.credential_definition = CredentialDefinition.objects.get(
-                credential_id=cred_def_id_or_name, enabled=True
+            self.credential_definition = CredentialDefinition.objects.get_enabled(
+                credential_id=cred_def_id_or_name
             )
         except ObjectDoesNotExist:
             try:
-                self.credential_definition = CredentialDefinition.objects.get(
-                    name=cred_def_id_or_name, enabled=True
+                self.credential_definition = CredentialDefinition.objects.get_enabled(
+                    name=cred_def_id_or_name
                 )
             except Exception:
                 LOGGER.error(f"CredentialRequest: credential definition not found: '{data}'")
@@ -130,7 +135,11 @@ class CredentialRequestSerializer(serializers.ModelSerializer):
     def _validate_credential_data(self, data):
         schema = set(self.credential_definition.schema.schema_json.get("attributes"))
         try:
-            credential_data = json.loads(data.get("credential_data", "{}"))
+            credential_data = data.get("credential_data", "{}")
+            if isinstance(credential_data, str):
+                credential_data = json.loads(credential_data)
+            if not isinstance(credential_data, dict):
+                raise ValueError("credential_data must be an object")
         except Exception:
             LOGGER.error(
                 f"CredentialRequest: {self.credential_definition.credential_id}: "
@@ -153,6 +162,7 @@ class CredentialRequestSerializer(serializers.ModelSerializer):
                     f"provided: {schema_data_diff}"
                 }
             )
+        data["credential_data"] = credential_data
         return data
 
     def run_validation(self, data=empty):
@@ -164,20 +174,10 @@ class CredentialRequestSerializer(serializers.ModelSerializer):
         return value
 
     def get_connection_accepted(self, obj) -> bool:
-        connection_invitation = (
-            ConnectionInvitation.objects.filter(credential_request=obj.id)
-            .order_by("-created")
-            .first()
-        )
-
-        return connection_invitation.accepted if connection_invitation else False
+        return obj.is_connected
 
     def get_credential_offer_accepted(self, obj) -> bool:
-        credential_offer = (
-            CredentialOffer.objects.filter(credential_request=obj.id).order_by("-created").first()
-        )
-
-        return credential_offer.accepted if credential_offer else False
+        return obj.is_issued
 
     def get_connection_invitation_url(self, obj) -> dict:
         connection_invitation = (
@@ -207,11 +207,12 @@ class CredentialRequestSerializer(serializers.ModelSerializer):
             "organization",
             "id",
             "revoked_credential",
+            "status",
             "connection_accepted",
             "credential_offer_accepted",
             "connection_invitation_url",
         )
-        read_only_fields = ("code", "invitation_url", "id", "revoked_credential")
+        read_only_fields = ("code", "invitation_url", "id", "revoked_credential", "status")
         extra_kwargs = {
             "credential_definition": {"write_only": True},
             "credential_data": {"write_only": True},
@@ -220,7 +221,16 @@ class CredentialRequestSerializer(serializers.ModelSerializer):
         }
 
 
+class JSONTextField(serializers.JSONField):
+    """JSON rendered as a string, as the API exposed it before the column became jsonb."""
+
+    def to_representation(self, value):
+        return json.dumps(value)
+
+
 class CredentialOfferSerializer(serializers.ModelSerializer):
+    offer_json = JSONTextField()
+
     class Meta:
         model = CredentialOffer
         fields = "__all__"
@@ -230,9 +240,15 @@ class ConnectionInvitationSerializer(serializers.Serializer):
     invitation_json = serializers.JSONField()
 
 
-class CredentialSerializer(serializers.Serializer):
+class CredentialItemSerializer(serializers.Serializer):
+    """Shape of an item of a bulk /credential request, checked against the DB in bulk."""
+
     connection_id = serializers.CharField()
     cred_def_id = serializers.CharField()
+    credential_data = serializers.DictField()
+
+
+class CredentialSerializer(CredentialItemSerializer):
     credential_data = serializers.JSONField()
     credential_definition = None
 
@@ -257,8 +273,8 @@ class CredentialSerializer(serializers.Serializer):
 
     def validate_cred_def_id(self, cred_def_id):
         try:
-            self.credential_definition = CredentialDefinition.objects.get(
-                credential_id=cred_def_id, enabled=True
+            self.credential_definition = CredentialDefinition.objects.get_enabled(
+                credential_id=cred_def_id
             )
         except CredentialDefinition.DoesNotExist:
             msg = f"Credential definition '{cred_def_id}' does not exist"
@@ -284,3 +300,45 @@ class CredentialSerializer(serializers.Serializer):
             raise ValidationError(msg)
 
         return credential_data
+
+
+class ProofDefinitionSerializer(serializers.ModelSerializer):
+    creator = CreatorSerializer(read_only=True)
+
+    def validate_proof_request(self, proof_request):
+        if not isinstance(proof_request, dict):
+            raise ValidationError("Should be an indy proof request object")
+        requested = {}
+        for field in ("requested_attributes", "requested_predicates"):
+            value = proof_request.get(field, {})
+            if not isinstance(value, dict):
+                raise ValidationError(f"'{field}' should be an object by referent")
+            requested.update(value)
+        if not requested:
+            raise ValidationError("At least one attribute or predicate should be requested")
+        return proof_request
+
+    class Meta:
+        model = ProofDefinition
+        fields = "__all__"
+        read_only_fields = ("creator",)
+
+
+class ProofRequestSerializer(serializers.ModelSerializer):
+    proof_definition = serializers.IntegerField(source="proof_definition_id")
+    invitation_url = serializers.ReadOnlyField()
+    qr_code_url = serializers.ReadOnlyField()
+
+    class Meta:
+        model = ProofRequest
+        fields = (
+            "code",
+            "proof_definition",
+            "status",
+            "revealed_attributes",
+            "verified_at",
+            "invitation_url",
+            "qr_code_url",
+            "created",
+        )
+        read_only_fields = tuple(field for field in fields if field != "proof_definition")
@@ -0,0 +1,25 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from manager import cache
+from manager.models import (
+    CREDENTIAL_DEFINITION_CACHE,
+    PROOF_TEMPLATE_CACHE,
+    CredentialDefinition,
+    ProofDefinition,
+    Schema,
+)
+
+
+@receiver(post_save, sender=CredentialDefinition)
+@receiver(post_delete, sender=CredentialDefinition)
+@receiver(post_save, sender=Schema)
+@receiver(post_delete, sender=Schema)
+def invalidate_credential_definitions(sender, **kwargs):
+    cache.invalidate(CREDENTIAL_DEFINITION_CACHE)
+
+
+@receiver(post_save, sender=ProofDefinition)
+@receiver(post_delete, sender=ProofDefinition)
+def invalidate_proof_templates(sender, **kwargs):
+    cache.invalidate(PROOF_TEMPLATE_CACHE)
@@ -11,6 +11,8 @@ from manager.models import (
     CredentialOffer,
     CredentialRequest,
     Organization,
+    ProofDefinition,
+    ProofRequest,
     Schema,
 )
 from manager.tests.factories import ConnectionInvitationFactory
@@ -164,3 +166,52 @@ def id_manager_create_response():
 @pytest.fixture
 def some_organization():
     return Organization.objects.create(name="UNICC")
+
+
+@pytest.fixture
+def proof_definition(admin_user):
+    return ProofDefinition.objects.create(
+        name="proof_definition",
+        creator=admin_user,
+        proof_request={
+            "requested_attributes": {
+                "email": {
+                    "name": "email",
+                    "restrictions": [{"cred_def_id": "testcredentialdefinition:1:2:3:test"}],
+                }
+            },
+        },
+    )
+
+
+@pytest.fixture
+def proof_exchange():
+    """The presentation exchange record returned by ACA-Py for a new proof request."""
+    return {
+        "presentation_exchange_id": "pres-ex-1",
+        "thread_id": "thread-1",
+        "state": "request_sent",
+        "presentation_request": {
+            "name": "proof_definition",
+            "version": "1.0",
+            "nonce": "1234",
+            "requested_attributes": {
+                "email": {
+                    "name": "email",
+                    "restrictions": [{"cred_def_id": "testcredentialdefinition:1:2:3:test"}],
+                }
+            },
+            "requested_predicates": {},
+        },
+    }
+
+
+@pytest.fixture
+def proof_request(proof_definition, admin_user, proof_exchange):
+    return ProofRequest.objects.create(
+        proof_definition=proof_definition,
+        creator=admin_user,
+        presentation_exchange_id=proof_exchange["presentation_exchange_id"],
+        thread_id=proof_exchange["thread_id"],
+        presentation_json={"@id": proof_exchange["thread_id"]},
+    )
@@ -0,0 +1,49 @@
+import io
+
+from django.core.files.base import File
+from django.core.files.storage import Storage
+from django.utils import timezone
+
+
+class ObjectStorage(Storage):
+    """
+    In memory stand-in for an S3-compatible bucket (S3, MinIO...) as django-storages reaches
+    it: flat keys, no local path, and the objects of a key overwritten unless
+    ``file_overwrite`` is False.
+    """
+
+    def __init__(self, file_overwrite: bool = True):
+        self.file_overwrite = file_overwrite
+        self.objects = {}
+
+    def _open(self, name, mode="rb"):
+        content, _ = self.objects[name]
+        return File(io.BytesIO(content), name=name)
+
+    def _save(self, name, content):
+        content.seek(0)
+        self.objects[name] = (content.read(), timezone.now())
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        if self.file_overwrite:
+            return name
+        return super().get_available_name(name, max_length)
+
+    def exists(self, name):
+        return name in self.objects
+
+    def delete(self, name):
+        self.objects.pop(name, None)
+
+    def listdir(self, path):
+        return [], sorted(self.objects)
+
+    def size(self, name):
+        return len(self.objects[name][0])
+
+    def get_modified_time(self, name):
+        return self.objects[name][1]
+
+    def url(self, name):
+        return f"http://objects.test/{name}"
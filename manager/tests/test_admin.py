@@ -6,6 +6,8 @@ from django.urls import reverse
 from rest_framework import status
 
 from manager.handlers import ACAPy
+from manager.models import CredentialRequest
+from manager.pagination import EstimatedCountPaginator, estimated_row_count
 
 
 @pytest.mark.django_db
@@ -161,3 +163,75 @@ class TestCredentialRequestAdmin:
 
         second_credential_request.refresh_from_db()
         assert second_credential_request.revoked_credential is False
+
+
+@pytest.mark.django_db
+class TestCredentialRequestAdminChangelist:
+    @pytest.fixture
+    def logged_client(self, client):
+        User.objects.create_superuser("content_tester", "test@example.com", "goldenstandard")
+        client.login(username="content_tester", password="goldenstandard")
+        return client
+
+    @pytest.fixture
+    def changelist_url(self):
+        return reverse("admin:manager_credentialrequest_changelist")
+
+    def test_queries_do_not_grow_with_rows(
+        self,
+        logged_client,
+        changelist_url,
+        credential_offer,
+        second_credential_offer,
+        django_assert_max_num_queries,
+    ):
+        with django_assert_max_num_queries(10):
+            response = logged_client.get(changelist_url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.context["cl"].result_count == 2
+
+    def test_search_by_exact_code(
+        self, logged_client, changelist_url, credential_request, second_credential_request
+    ):
+        response = logged_client.get(changelist_url, {"q": credential_request.code})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert list(response.context["cl"].result_list) == [credential_request]
+
+    def test_search_by_exact_email(
+        self, logged_client, changelist_url, credential_request, second_credential_request
+    ):
+        response = logged_client.get(changelist_url, {"q": second_credential_request.email})
+
+        assert list(response.context["cl"].result_list) == [second_credential_request]
+
+
+@pytest.mark.django_db
+class TestEstimatedCountPaginator:
+    def test_uses_estimate_for_unfiltered_big_tables(self, mocker, credential_request):
+        mocker.patch("manager.pagination.estimated_row_count", return_value=50000)
+
+        paginator = EstimatedCountPaginator(CredentialRequest.objects.all(), 10)
+
+        assert paginator.count == 50000
+
+    def test_exact_count_when_filtered(self, mocker, credential_request):
+        estimated_row_count = mocker.patch(
+            "manager.pagination.estimated_row_count", return_value=50000
+        )
+
+        paginator = EstimatedCountPaginator(CredentialRequest.objects.filter(email="x@y.z"), 10)
+
+        assert paginator.count == 0
+        estimated_row_count.assert_not_called()
+
+    def test_exact_count_when_estimate_is_small(self, mocker, credential_request):
+        mocker.patch("manager.pagination.estimated_row_count", return_value=5)
+
+        paginator = EstimatedCountPaginator(CredentialRequest.objects.all(), 10)
+
+        assert paginator.count == 1
+
+    def test_no_estimate_outside_postgresql(self):
+        assert estimated_row_count(CredentialRequest) is None
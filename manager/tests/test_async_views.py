@@ -0,0 +1,177 @@
+import json
+
+import pytest
+import respx
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from aca import resilience
+from manager import outbox
+from manager.models import ConnectionInvitation, CredentialOffer, CredentialRequest, OutboxMessage
+from manager.tests.factories import ConnectionInvitationFactory
+
+ACA_PY = "http://aca-py:4001"
+
+pytestmark = [pytest.mark.django_db, pytest.mark.urls("id_manager.urls_async")]
+
+
+@pytest.fixture(autouse=True)
+def aca_py(settings):
+    settings.ACA_PY_URL = ACA_PY
+    with respx.mock(base_url=ACA_PY, assert_all_called=False) as routes:
+        yield routes
+
+
+@async_to_sync
+async def get(path: str, **extra):
+    return await AsyncClient().get(path, **extra)
+
+
+@async_to_sync
+async def post(path: str, data, **extra):
+    return await AsyncClient().post(path, data, content_type="application/json", **extra)
+
+
+@pytest.fixture
+def token(admin_user):
+    return f"Token {Token.objects.create(user=admin_user)}"
+
+
+@pytest.fixture
+def sent_offers(aca_py):
+    return aca_py.post("/issue-credential/send-offer").respond(
+        json={"credential_exchange_id": "ex-1"}
+    )
+
+
+class TestWebhooks:
+    def test_accepted_connection_queues_the_offer(self, connection_invitation, credential_offer):
+        response = post(
+            "/webhooks/1234/topic/connections/", {"state": "response", "connection_id": "1"}
+        )
+
+        assert response.status_code == 200
+        connection_invitation.refresh_from_db()
+        assert connection_invitation.accepted
+        message = OutboxMessage.objects.get()
+        assert message.action == "send_credential_offer"
+        assert message.payload == {
+            "connection_invitation": connection_invitation.id,
+            "resend_after": credential_offer.id,
+        }
+
+    def test_queued_offer_reaches_aca_py(
+        self, connection_invitation, credential_offer, sent_offers
+    ):
+        post("/webhooks/1234/topic/connections/", {"state": "response", "connection_id": "1"})
+        message = OutboxMessage.objects.get()
+        OutboxMessage.objects.update(available_at=timezone.now())
+
+        message = async_to_sync(outbox.adispatch)(message.id)
+
+        assert message.status == OutboxMessage.Status.DONE
+        assert sent_offers.call_count == 1
+        assert json.loads(sent_offers.calls.last.request.content)["connection_id"] == "1"
+        assert CredentialOffer.objects.filter(cred_ex_id="ex-1").exists()
+
+    def test_invalid_api_key(self, connection_invitation):
+        response = post(
+            "/webhooks/wrong/topic/connections/", {"state": "response", "connection_id": "1"}
+        )
+
+        assert response.status_code == 200
+        connection_invitation.refresh_from_db()
+        assert not connection_invitation.accepted
+
+
+class TestDeepLinkRedirect:
+    def test_redirects_to_a_new_invitation(self, aca_py, credential_request):
+        created = aca_py.post("/connections/create-invitation").respond(
+            json={
+                "connection_id": "new",
+                "invitation": {"@id": "new"},
+                "invitation_url": f"{ACA_PY}/invite?c_i=new",
+            }
+        )
+
+        responses = [get(f"/deep-link-redirect/{credential_request.code}") for _ in range(2)]
+
+        assert [response.status_code for response in responses] == [302, 302]
+        assert responses[0]["Location"] == "didcomm://launch?c_i=eyJAaWQiOiAibmV3In0="
+        assert created.call_count == 1
+        invitation = ConnectionInvitation.objects.get(credential_request=credential_request)
+        assert invitation.connection_id == "new"
+
+    def test_unknown_code(self, aca_py):
+        assert get("/deep-link-redirect/unknown").status_code == 404
+
+    def test_aca_py_unavailable(self, aca_py, credential_request, settings):
+        created = aca_py.post("/connections/create-invitation").respond(json={})
+        for _ in range(settings.ACA_PY_BREAKER["failures"]):
+            resilience.breaker("default").failed()
+
+        response = get(f"/deep-link-redirect/{credential_request.code}")
+
+        assert response.status_code == 503
+        assert int(response["Retry-After"]) <= settings.ACA_PY_BREAKER["reset_after"]
+        assert not created.called
+
+
+class TestCredential:
+    @pytest.fixture
+    def body(self, credential_definition):
+        ConnectionInvitationFactory(connection_id="c-1", accepted=True, credential_request=None)
+        return {
+            "connection_id": "c-1",
+            "cred_def_id": credential_definition.credential_id,
+            "credential_data": {"schema_key_1": "1", "schema_key_2": "2"},
+        }
+
+    def test_unauthenticated(self, body):
+        response = post("/credential", body)
+
+        assert response.status_code == 401
+        assert response["WWW-Authenticate"] == "Token"
+
+    def test_invalid(self, token, body):
+        response = post("/credential", {**body, "cred_def_id": ""}, authorization=token)
+
+        assert response.status_code == 400
+        assert "cred_def_id" in response.json()
+
+    def test_offers_the_credential(self, token, body, sent_offers):
+        response = post("/credential", body, authorization=token)
+
+        assert response.status_code == 201
+        credential_request = CredentialRequest.objects.get()
+        assert response.json() == {
+            "connection_id": "c-1",
+            "cred_def_id": body["cred_def_id"],
+            "cred_request_id": credential_request.id,
+        }
+        assert credential_request.status == CredentialRequest.Status.OFFERED
+        assert CredentialOffer.objects.get().cred_ex_id == "ex-1"
+        assert OutboxMessage.objects.get().status == OutboxMessage.Status.DONE
+        assert sent_offers.calls.last.request.url == f"{ACA_PY}/issue-credential/send-offer"
+
+    def test_accepted_while_aca_py_is_unreachable(self, token, body, aca_py):
+        aca_py.post("/issue-credential/send-offer").mock(side_effect=ConnectionRefusedError)
+
+        response = post("/credential", body, authorization=token)
+
+        assert response.status_code == 202
+        assert OutboxMessage.objects.get().status == OutboxMessage.Status.PENDING
+
+    def test_offers_in_bulk(self, token, body, sent_offers):
+        ConnectionInvitationFactory(connection_id="c-2", accepted=True, credential_request=None)
+
+        response = post(
+            "/credential", [body, {**body, "connection_id": "c-2"}], authorization=token
+        )
+
+        assert response.status_code == 201
+        assert [result["status"] for result in response.json()] == ["offered", "offered"]
+        assert sent_offers.call_count == 2
+        assert CredentialOffer.objects.count() == 2
@@ -0,0 +1,131 @@
+import threading
+
+import pytest
+from django.core.cache import cache as django_cache
+
+from aca.client import ACAClient
+from manager import cache
+from manager.credential_workflow import DEEP_LINK_CACHE, connection_invitation_accept
+from manager.handlers import ACAPy
+from manager.models import CredentialDefinition
+from manager.utils import QRCodeHandler
+
+
+class TestCache:
+    def test_namespaced_keys(self):
+        cache.set("a", "key", 1)
+        cache.set("b", "key", 2)
+        assert cache.get("a", "key") == 1
+        assert cache.get("b", "key") == 2
+
+    def test_long_or_invalid_keys_are_hashed(self):
+        assert " " not in cache.make_key("a", "with space")
+        assert len(cache.make_key("a", "x" * 1000)) < 250
+
+    def test_invalidate_namespace(self):
+        cache.set("a", "key", 1)
+        cache.set("b", "key", 2)
+
+        cache.invalidate("a")
+
+        assert cache.get("a", "key") is None
+        assert cache.get("b", "key") == 2
+
+    def test_read_in_one_round_trip(self, mocker):
+        cache.set("a", "key", 1)
+        # one get_many each: a single memcached request
+        get_many = mocker.spy(cache.get_cache(), "get_many")
+        version = mocker.spy(cache, "_version")
+
+        assert cache.get("a", "key") == 1
+        assert cache.get_or_set("a", "key", mocker.Mock()) == 1
+
+        assert get_many.call_count == 2
+        version.assert_not_called()
+
+    def test_invalidated_by_another_node(self):
+        cache.set("a", "key", 1)
+        cache.get("a", "key")
+
+        # as invalidate() on another node: this process still knows the former version
+        django_cache.incr("a:version")
+
+        assert cache.get("a", "key") is None
+        cache.set("a", "key", 2)
+        assert cache.get("a", "key") == 2
+
+    def test_get_or_set_caches_none(self, mocker):
+        compute = mocker.Mock(return_value=None)
+
+        assert cache.get_or_set("a", "key", compute) is None
+        assert cache.get_or_set("a", "key", compute) is None
+        compute.assert_called_once()
+
+    def test_get_or_set_waits_for_the_worker_computing_it(self, mocker):
+        lock_key = f"{cache.make_key('a', 'key')}:lock"
+        django_cache.add(lock_key, 1)
+        threading.Timer(0.1, cache.set, ("a", "key", "computed elsewhere")).start()
+        compute = mocker.Mock(return_value="computed here")
+
+        assert cache.get_or_set("a", "key", compute, poll_interval=0.01) == "computed elsewhere"
+        compute.assert_not_called()
+
+    def test_get_or_set_computes_when_the_other_worker_takes_too_long(self):
+        django_cache.add(f"{cache.make_key('a', 'key')}:lock", 1)
+
+        assert cache.get_or_set("a", "key", lambda: 1, lock_timeout=0.05) == 1
+
+
+@pytest.mark.django_db
+class TestCredentialDefinitionLookup:
+    def test_cached(self, credential_definition, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            first = CredentialDefinition.objects.get_enabled(
+                credential_id=credential_definition.credential_id
+            )
+            second = CredentialDefinition.objects.get_enabled(
+                credential_id=credential_definition.credential_id
+            )
+        assert first == second == credential_definition
+        assert first.schema == credential_definition.schema
+
+    def test_invalidated_on_save(self, credential_definition):
+        CredentialDefinition.objects.get_enabled(name=credential_definition.name)
+        credential_definition.enabled = False
+        credential_definition.save()
+
+        with pytest.raises(CredentialDefinition.DoesNotExist):
+            CredentialDefinition.objects.get_enabled(name=credential_definition.name)
+
+    def test_unsupported_lookup(self):
+        with pytest.raises(ValueError):
+            CredentialDefinition.objects.get_enabled(pk=1)
+
+
+@pytest.mark.django_db
+def test_deep_link_dropped_once_connected(connection_invitation):
+    code = connection_invitation.credential_request.code
+    cache.set(DEEP_LINK_CACHE, code, "invitation")
+
+    connection_invitation_accept(connection_invitation.connection_id)
+
+    assert cache.get(DEEP_LINK_CACHE, code) is None
+
+
+def test_ledger_lookups_are_cached(mocker):
+    get_schema = mocker.patch.object(ACAClient, "get_schema", return_value={"id": "schema:1"})
+
+    assert ACAPy().get_schema("schema:1") == {"id": "schema:1"}
+    assert ACAPy().get_schema("schema:1") == {"id": "schema:1"}
+    get_schema.assert_called_once_with("schema:1")
+
+
+@pytest.mark.django_db
+def test_qr_codes_rendered_once(mocker):
+    render = mocker.spy(QRCodeHandler, "render")
+
+    first = QRCodeHandler.png("some data")
+    second = QRCodeHandler.png("some data")
+
+    assert render.call_count == 1
+    assert first == second and first.startswith(b"\x89PNG")
@@ -0,0 +1,115 @@
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+
+from manager.models import ConnectionInvitation, CredentialRequest
+from manager.tests.factories import ConnectionInvitationFactory
+
+
+@pytest.mark.django_db
+class TestBackfillCredentialRequestStatus:
+    def test_pending_when_nothing_happened(self, credential_request):
+        call_command("backfill_credential_request_status")
+
+        credential_request.refresh_from_db()
+        assert credential_request.status == CredentialRequest.Status.PENDING
+
+    def test_connected(self, credential_request):
+        ConnectionInvitationFactory(
+            connection_id="1", accepted=True, credential_request=credential_request
+        )
+
+        call_command("backfill_credential_request_status")
+
+        credential_request.refresh_from_db()
+        assert credential_request.status == CredentialRequest.Status.CONNECTED
+        assert credential_request.connected_at is not None
+
+    def test_offered(self, credential_offer):
+        call_command("backfill_credential_request_status")
+
+        credential_request = CredentialRequest.objects.get(
+            id=credential_offer.credential_request_id
+        )
+        assert credential_request.status == CredentialRequest.Status.OFFERED
+        assert credential_request.offered_at == credential_offer.created
+
+    def test_issued(self, credential_offer):
+        credential_offer.accepted = True
+        credential_offer.save()
+
+        call_command("backfill_credential_request_status", batch_size=1)
+
+        credential_request = CredentialRequest.objects.get(
+            id=credential_offer.credential_request_id
+        )
+        assert credential_request.status == CredentialRequest.Status.ISSUED
+        assert credential_request.issued_at is not None
+
+    def test_revoked(self, credential_offer, second_credential_offer):
+        credential_request = credential_offer.credential_request
+        credential_request.revoked_credential = True
+        credential_request.save()
+
+        call_command("backfill_credential_request_status", batch_size=1)
+
+        credential_request.refresh_from_db()
+        assert credential_request.status == CredentialRequest.Status.REVOKED
+        second_credential_offer.credential_request.refresh_from_db()
+        assert second_credential_offer.credential_request.status == CredentialRequest.Status.OFFERED
+
+    def test_only_pending_unless_all(self, credential_offer):
+        credential_request = credential_offer.credential_request
+        CredentialRequest.objects.filter(id=credential_request.id).update(
+            status=CredentialRequest.Status.ISSUED
+        )
+
+        call_command("backfill_credential_request_status")
+        credential_request.refresh_from_db()
+        assert credential_request.status == CredentialRequest.Status.ISSUED
+
+        call_command("backfill_credential_request_status", "--all")
+        credential_request.refresh_from_db()
+        assert credential_request.status == CredentialRequest.Status.OFFERED
+
+
+@pytest.mark.django_db
+class TestPruneIssuanceData:
+    @override_settings(ISSUANCE_DATA_RETENTION={"stale_invitations": 0})
+    def test_prune(self, credential_request):
+        ConnectionInvitationFactory(
+            connection_id="1", accepted=False, credential_request=credential_request
+        )
+        out = StringIO()
+
+        call_command("prune_issuance_data", "--dry-run", stdout=out)
+        assert "stale_invitations: 1 row(s) would be deleted" in out.getvalue()
+        assert ConnectionInvitation.objects.count() == 1
+
+        call_command("prune_issuance_data", "--vacuum", stdout=out)
+        assert "stale_invitations: 1 row(s) deleted" in out.getvalue()
+        assert not ConnectionInvitation.objects.exists()
+
+
+@override_settings(
+    ACA_PY_AGENTS={
+        "default": {"urls": ["http://a:4001", "http://b:4001"], "transport_url": "http://a:8100"},
+        "eu": {"urls": ["http://eu:4001"], "transport_url": "http://eu:8100"},
+    }
+)
+def test_check_aca_py_agents(requests_mock):
+    requests_mock.get("http://a:4001/status/ready", status_code=503)
+    requests_mock.get("http://b:4001/status/ready", json={"ready": True})
+    requests_mock.get("http://eu:4001/status/ready", json={"ready": False})
+    out = StringIO()
+
+    with pytest.raises(CommandError, match="eu"):
+        call_command("check_aca_py_agents", stdout=out)
+
+    assert out.getvalue().splitlines() == [
+        "default: http://a:4001 not ready",
+        "default: http://b:4001 ready",
+        "eu: http://eu:4001 not ready",
+    ]
@@ -4,13 +4,15 @@ from django.test import override_settings
 from aca.client import ACAClient
 from manager.credential_workflow import (
     _step_accept,
+    connection_agent,
     connection_invitation_accept,
     connection_invitation_create,
     credential_offer_accept,
     credential_offer_create,
+    credential_request_revoke,
     is_credential_request_ready,
 )
-from manager.models import ConnectionInvitation, CredentialOffer
+from manager.models import ConnectionInvitation, CredentialOffer, CredentialRequest
 
 
 @pytest.mark.django_db
@@ -219,9 +221,108 @@ def test_is_credential_request_ready(credential_offer):
 
 @pytest.mark.django_db
 def test_is_credential_request_ready_accepted_offer(credential_offer):
-    credential_offer.accepted = True
-    credential_offer.save()
+    credential_offer_accept(credential_offer.connection_id)
     code = "12345"
     with pytest.raises(RuntimeError):
         request = is_credential_request_ready(code)
         assert not request
+
+
+@pytest.mark.django_db
+def test_connection_invitation_accept_marks_request_connected(connection_invitation):
+    connection_invitation_accept(connection_invitation.connection_id)
+
+    credential_request = CredentialRequest.objects.get(
+        id=connection_invitation.credential_request_id
+    )
+    assert credential_request.status == CredentialRequest.Status.CONNECTED
+    assert credential_request.connected_at is not None
+    assert credential_request.is_connected
+    assert not credential_request.is_issued
+
+
+@pytest.mark.django_db
+@override_settings(ACA_PY_URL="aca.py.url", ACA_PY_TRANSPORT_URL="aca.py.transport.url")
+def test_credential_offer_create_marks_request_offered(mocker, connection_invitation):
+    mocker.patch.object(
+        ACAClient,
+        "send_credential_offer",
+        return_value={"credential_exchange_id": "40b771aa-3d77-4171-b8d5-e1da4fcc4620"},
+    )
+    connection_invitation_accept(connection_invitation.connection_id)
+    credential_offer_create(connection_invitation.connection_id, connection_invitation)
+
+    credential_request = CredentialRequest.objects.get(
+        id=connection_invitation.credential_request_id
+    )
+    assert credential_request.status == CredentialRequest.Status.OFFERED
+    assert credential_request.offered_at is not None
+
+
+@pytest.mark.django_db
+def test_credential_offer_accept_marks_request_issued(credential_offer):
+    credential_offer_accept(credential_offer.connection_id)
+
+    credential_request = CredentialRequest.objects.get(id=credential_offer.credential_request_id)
+    assert credential_request.status == CredentialRequest.Status.ISSUED
+    assert credential_request.issued_at is not None
+    assert credential_request.is_issued
+
+
+@pytest.mark.django_db
+def test_late_connection_accept_does_not_move_status_backwards(
+    credential_offer, connection_invitation
+):
+    credential_offer_accept(credential_offer.connection_id)
+    connection_invitation_accept(connection_invitation.connection_id)
+
+    credential_request = CredentialRequest.objects.get(id=credential_offer.credential_request_id)
+    assert credential_request.status == CredentialRequest.Status.ISSUED
+    assert credential_request.connected_at is None
+
+
+@pytest.mark.django_db
+def test_credential_request_revoke(credential_request):
+    credential_request_revoke(credential_request)
+
+    assert credential_request.status == CredentialRequest.Status.REVOKED
+    assert credential_request.revoked_credential is True
+    assert credential_request.revoked_at is not None
+
+
+AGENTS = {
+    "default": {"urls": ["http://default:4001"], "transport_url": "http://default:8100"},
+    "unicc": {"urls": ["http://unicc:4001"], "transport_url": "http://unicc:8100"},
+}
+
+
+@pytest.mark.django_db
+@override_settings(ACA_PY_AGENTS=AGENTS, ACA_PY_AGENT_ROUTES={"UNICC": "unicc"})
+def test_connections_and_offers_stay_on_the_agent_of_the_organization(
+    mocker, credential_request, some_organization
+):
+    schema = credential_request.credential_definition.schema
+    schema.organization = some_organization
+    schema.save()
+    create_connection_invitation = mocker.patch.object(
+        ACAClient,
+        "create_connection_invitation",
+        autospec=True,
+        return_value={"connection_id": "7", "invitation": {}, "invitation_url": "url"},
+    )
+    send_credential_offer = mocker.patch.object(
+        ACAClient,
+        "send_credential_offer",
+        autospec=True,
+        return_value={"credential_exchange_id": "ex-7"},
+    )
+
+    connection_invitation_create(credential_request)
+    invitation = ConnectionInvitation.objects.get(connection_id="7")
+    credential_offer_create("7", invitation)
+
+    assert invitation.agent == "unicc"
+    assert create_connection_invitation.call_args.args[0].url == "http://unicc:4001"
+    assert send_credential_offer.call_args.args[0].url == "http://unicc:4001"
+    assert connection_agent("7") == "unicc"
+    assert connection_agent("unknown") == "default"
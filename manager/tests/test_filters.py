@@ -0,0 +1,91 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from manager.filters import CredentialDataFilter
+from manager.models import CredentialRequest
+
+
+@pytest.mark.django_db
+class TestCredentialDataFilter:
+    url = reverse("CredentialRequestListCreate")
+
+    @pytest.fixture
+    def other_request(self, second_credential_request):
+        second_credential_request.credential_data = {
+            "credential_data_key_1": "other_value",
+            "credential_data_key_2": "credential_data_value_2",
+        }
+        second_credential_request.save()
+        return second_credential_request
+
+    def test_filter_by_attribute(self, api_client_admin, credential_request, other_request):
+        response = api_client_admin.get(
+            self.url, {"credential_data__credential_data_key_1": "other_value"}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [item["code"] for item in response.data["results"]] == [other_request.code]
+
+    def test_filter_by_several_attributes(
+        self, api_client_admin, credential_request, other_request
+    ):
+        response = api_client_admin.get(
+            self.url,
+            {
+                "credential_data__credential_data_key_1": "credential_data_value_1",
+                "credential_data__credential_data_key_2": "credential_data_value_2",
+            },
+        )
+
+        assert [item["code"] for item in response.data["results"]] == [credential_request.code]
+
+    def test_nested_lookups_are_rejected(self, api_client_admin, credential_request):
+        response = api_client_admin.get(
+            self.url, {"credential_data__credential_data_key_1__regex": ".*"}
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_postgresql_uses_containment(self, mocker):
+        request = APIView().initialize_request(
+            APIRequestFactory().get("/", {"credential_data__employee_id": "7"})
+        )
+        queryset = mocker.Mock()
+        queryset.db = "default"
+        mocker.patch(
+            "manager.filters.connections",
+            {"default": mocker.Mock(vendor="postgresql")},
+        )
+
+        CredentialDataFilter().filter_queryset(request, queryset, None)
+
+        queryset.filter.assert_called_once_with(credential_data__contains={"employee_id": "7"})
+
+
+@pytest.mark.django_db
+def test_credential_data_is_stored_as_json_object(
+    api_client_admin, mocker, credential_definition, invitation_template
+):
+    mocker.patch(
+        "manager.handlers.connection_invitation_create",
+        return_value=("invitation.url", "e30="),
+    )
+    mocker.patch("manager.views.QRCodeHandler.text_to_qr", return_value="invitation.url")
+    response = api_client_admin.post(
+        reverse("CredentialRequestListCreate"),
+        {
+            "credential_definition": credential_definition.credential_id,
+            "email": "test@mail.com",
+            "credential_data": '{"schema_key_1": "1", "schema_key_2": "2"}',
+        },
+    )
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert CredentialRequest.objects.get(code=response.data["code"]).credential_data == {
+        "schema_key_1": "1",
+        "schema_key_2": "2",
+    }
+    assert CredentialRequest.objects.filter(credential_data__schema_key_1="1").exists()
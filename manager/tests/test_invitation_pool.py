@@ -0,0 +1,117 @@
+from io import StringIO
+
+import pytest
+import requests
+from django.core.management import call_command
+
+from aca import agents
+from aca.client import ACAClient
+from manager import invitation_pool
+from manager.credential_workflow import connection_invitation_create
+from manager.models import ConnectionInvitation, PooledInvitation
+
+
+def aca_invitation(connection_id: str) -> dict:
+    return {
+        "connection_id": connection_id,
+        "invitation": {"@id": connection_id},
+        "invitation_url": f"http://aca-py/invite?c_i={connection_id}",
+    }
+
+
+def pool(agent: str, *connection_ids: str):
+    PooledInvitation.objects.bulk_create(
+        PooledInvitation(
+            agent=agent, connection_id=connection_id, invitation_json=aca_invitation(connection_id)
+        )
+        for connection_id in connection_ids
+    )
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    invitation_pool.CLAIMS.clear()
+    invitation_pool.POOL_SIZE.clear()
+
+
+@pytest.fixture
+def created(mocker):
+    """ACA-Py creating invitations 0, 1, 2..."""
+    count = iter(range(1000))
+    return mocker.patch.object(
+        ACAClient,
+        "create_connection_invitation",
+        side_effect=lambda: aca_invitation(str(next(count))),
+    )
+
+
+@pytest.mark.django_db
+def test_claim_takes_each_invitation_once():
+    pool("default", "1", "2")
+    pool("eu", "3")
+
+    assert invitation_pool.claim("default") == aca_invitation("1")
+    assert invitation_pool.claim("default") == aca_invitation("2")
+    assert invitation_pool.claim("default") is None
+    assert list(PooledInvitation.objects.values_list("connection_id", flat=True)) == ["3"]
+    assert invitation_pool.CLAIMS.value(agent="default", outcome="hit") == 2
+    assert invitation_pool.CLAIMS.value(agent="default", outcome="miss") == 1
+
+
+@pytest.mark.django_db
+def test_fill_up_to_the_high_watermark_below_the_low_one(created):
+    agent = agents.get_agent()
+    pool("default", "a", "b")
+
+    assert invitation_pool.fill(agent, low=3, high=5) == 3
+    assert PooledInvitation.objects.filter(agent="default").count() == 5
+    assert invitation_pool.POOL_SIZE.value(agent="default") == 5
+
+    invitation_pool.claim("default")
+    invitation_pool.claim("default")
+    assert invitation_pool.fill(agent, low=3, high=5) == 0
+    assert created.call_count == 3
+
+
+@pytest.mark.django_db
+def test_fill_keeps_the_invitations_created(mocker):
+    mocker.patch.object(
+        ACAClient,
+        "create_connection_invitation",
+        side_effect=[aca_invitation("1"), requests.ConnectionError("down"), aca_invitation("2")],
+    )
+
+    assert invitation_pool.fill(agents.get_agent(), low=1, high=3, concurrency=1) == 2
+    assert set(PooledInvitation.objects.values_list("connection_id", flat=True)) == {"1", "2"}
+
+
+@pytest.mark.django_db
+def test_fill_invitation_pool_command(created, settings):
+    settings.INVITATION_POOL_LOW, settings.INVITATION_POOL_HIGH = 1, 4
+    out = StringIO()
+
+    call_command("fill_invitation_pool", stdout=out)
+
+    assert out.getvalue() == "4 connection invitation(s) added to the pool\n"
+    assert PooledInvitation.objects.filter(agent="default").count() == 4
+
+
+@pytest.mark.django_db
+def test_connection_invitation_create_claims_from_the_pool(credential_request, created):
+    pool("default", "pooled")
+
+    invitation_url, _ = connection_invitation_create(credential_request)
+
+    assert invitation_url == aca_invitation("pooled")["invitation_url"]
+    created.assert_not_called()
+    invitation = ConnectionInvitation.objects.get(credential_request=credential_request)
+    assert invitation.connection_id == "pooled"
+    assert invitation.agent == "default"
+    assert not PooledInvitation.objects.exists()
+
+    # once the pool is empty, on demand
+    invitation.accepted = True
+    invitation.save()
+    invitation_url, _ = connection_invitation_create(credential_request)
+
+    assert invitation_url == aca_invitation("0")["invitation_url"]
@@ -0,0 +1,329 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from requests import ConnectionError, HTTPError, ReadTimeout
+
+from aca.client import ACAClient
+from manager import outbox
+from manager.models import (
+    ConnectionInvitation,
+    CredentialOffer,
+    CredentialRequest,
+    OutboxMessage,
+    Schema,
+)
+from manager.tests.factories import SchemaFactory
+
+
+@pytest.fixture
+def echo_action():
+    calls = []
+
+    @outbox.action("echo")
+    def echo(payload):
+        calls.append(payload)
+        return payload
+
+    yield calls
+    del outbox.ACTIONS["echo"]
+
+
+@pytest.fixture
+def failing_action():
+    errors = []
+
+    @outbox.action("fail")
+    def fail(payload):
+        raise errors.pop(0)
+
+    yield errors
+    del outbox.ACTIONS["fail"]
+
+
+def http_error(status_code, text="error"):
+    error = HTTPError(text)
+    error.response = type("Response", (), {"status_code": status_code, "text": text})()
+    return error
+
+
+@pytest.mark.django_db
+class TestEnqueue:
+    def test_unknown_action(self):
+        with pytest.raises(ValueError):
+            outbox.enqueue("unknown", {})
+
+    def test_dispatched_on_commit(self, echo_action, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            message = outbox.enqueue("echo", {"a": 1})
+        assert echo_action == [{"a": 1}]
+
+        message.refresh_from_db()
+        assert message.status == OutboxMessage.Status.DONE
+        assert message.result == {"a": 1}
+        assert message.attempts == 1
+
+    def test_not_dispatched_on_commit_when_dispatched_by_the_caller(
+        self, echo_action, django_capture_on_commit_callbacks
+    ):
+        with django_capture_on_commit_callbacks() as callbacks:
+            outbox.enqueue("echo", {}, dispatch_on_commit=False)
+        assert callbacks == []
+
+    def test_enqueue_later(self, echo_action, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks() as callbacks:
+            outbox.enqueue_later("echo", [{"a": 1}, {"a": 2}], delay=60)
+
+        assert callbacks == []
+        messages = OutboxMessage.objects.all()
+        assert [message.payload for message in messages] == [{"a": 1}, {"a": 2}]
+        assert all(message.available_at > timezone.now() for message in messages)
+        assert outbox.dispatch_pending() == 0
+        assert echo_action == []
+
+    def test_enqueue_later_unknown_action(self):
+        with pytest.raises(ValueError):
+            outbox.enqueue_later("unknown", [{}], delay=0)
+
+
+@pytest.mark.django_db
+class TestDispatch:
+    def test_runs_once(self, echo_action):
+        message = outbox.enqueue("echo", {}, dispatch_on_commit=False)
+
+        assert outbox.dispatch(message.id).status == OutboxMessage.Status.DONE
+        assert outbox.dispatch(message.id) is None
+        assert len(echo_action) == 1
+
+    def test_not_due(self, echo_action):
+        message = outbox.enqueue("echo", {}, dispatch_on_commit=False)
+        OutboxMessage.objects.update(available_at=timezone.now() + timedelta(minutes=1))
+
+        assert outbox.dispatch(message.id) is None
+        assert echo_action == []
+
+    @override_settings(OUTBOX_MAX_ATTEMPTS=2, OUTBOX_RETRY_BACKOFF=10)
+    def test_retries_unreachable_aca_py(self, failing_action):
+        failing_action.extend([ConnectionError("refused"), http_error(502)])
+        message = outbox.enqueue("fail", {}, dispatch_on_commit=False)
+
+        message = outbox.dispatch(message.id)
+        assert message.status == OutboxMessage.Status.PENDING
+        assert message.last_error == "refused"
+        assert message.available_at > timezone.now() + timedelta(seconds=9)
+
+        OutboxMessage.objects.update(available_at=timezone.now())
+        message = outbox.dispatch(message.id)
+        assert message.status == OutboxMessage.Status.FAILED
+        assert message.attempts == 2
+
+    def test_does_not_retry_rejected_request(self, failing_action):
+        failing_action.append(http_error(400, "bad request"))
+        message = outbox.enqueue("fail", {}, dispatch_on_commit=False)
+
+        message = outbox.dispatch(message.id)
+        assert message.status == OutboxMessage.Status.FAILED
+        assert message.last_error == "bad request"
+
+    @override_settings(OUTBOX_PROCESSING_TIMEOUT=60)
+    def test_dispatch_pending_releases_stuck_messages(self, echo_action):
+        stuck = outbox.enqueue("echo", {"stuck": True}, dispatch_on_commit=False)
+        OutboxMessage.objects.filter(id=stuck.id).update(
+            status=OutboxMessage.Status.PROCESSING,
+            modified=timezone.now() - timedelta(minutes=2),
+        )
+        outbox.enqueue("echo", {"pending": True}, dispatch_on_commit=False)
+
+        assert outbox.dispatch_pending() == 2
+        assert not OutboxMessage.objects.exclude(status=OutboxMessage.Status.DONE).exists()
+
+
+@pytest.mark.django_db
+class TestSendCredentialOfferAction:
+    @pytest.fixture
+    def send_offer(self, mocker):
+        return mocker.patch.object(
+            ACAClient, "send_credential_offer", return_value={"credential_exchange_id": "ex-1"}
+        )
+
+    @pytest.fixture
+    def records(self, mocker):
+        return mocker.patch.object(ACAClient, "list_issue_credential_records", return_value=[])
+
+    @pytest.fixture
+    def message(self, connection_invitation):
+        return outbox.enqueue(
+            "send_credential_offer",
+            {"connection_invitation": connection_invitation.id, "discard_request": True},
+            dispatch_on_commit=False,
+        )
+
+    def test_not_sent_again(self, send_offer, message, connection_invitation):
+        assert outbox.dispatch(message.id).status == OutboxMessage.Status.DONE
+        OutboxMessage.objects.filter(id=message.id).update(status=OutboxMessage.Status.PENDING)
+
+        assert outbox.dispatch(message.id).status == OutboxMessage.Status.DONE
+        send_offer.assert_called_once()
+        assert CredentialOffer.objects.get().cred_ex_id == "ex-1"
+
+    def test_retry_records_the_offer_of_a_timed_out_attempt(
+        self, send_offer, records, message, connection_invitation, second_credential_offer
+    ):
+        # an offer of another credential request over the same connection
+        second_credential_offer.connection_id = connection_invitation.connection_id
+        second_credential_offer.save()
+        send_offer.side_effect = ReadTimeout("sent, no answer")
+        outbox.dispatch(message.id)
+        OutboxMessage.objects.filter(id=message.id).update(available_at=timezone.now())
+        credential_definition_id = (
+            connection_invitation.credential_request.credential_definition.credential_id
+        )
+        records.return_value = [
+            {
+                "credential_exchange_id": second_credential_offer.cred_ex_id,
+                "credential_definition_id": credential_definition_id,
+            },
+            {"credential_exchange_id": "ex-2", "credential_definition_id": "other:definition"},
+            {
+                "credential_exchange_id": "ex-3",
+                "credential_definition_id": credential_definition_id,
+            },
+        ]
+
+        message = outbox.dispatch(message.id)
+
+        assert message.status == OutboxMessage.Status.DONE
+        send_offer.assert_called_once()
+        records.assert_called_once_with(
+            role="issuer", limit=100, offset=0, connection_id=connection_invitation.connection_id
+        )
+        offer = CredentialOffer.objects.get(
+            credential_request_id=connection_invitation.credential_request_id
+        )
+        assert offer.cred_ex_id == "ex-3"
+
+    def test_retry_sends_the_offer_no_attempt_did(self, send_offer, records, message):
+        send_offer.side_effect = [ConnectionError("refused"), {"credential_exchange_id": "ex-1"}]
+        outbox.dispatch(message.id)
+        OutboxMessage.objects.filter(id=message.id).update(available_at=timezone.now())
+
+        assert outbox.dispatch(message.id).status == OutboxMessage.Status.DONE
+        assert send_offer.call_count == 2
+        records.assert_called_once()
+        assert CredentialOffer.objects.get().cred_ex_id == "ex-1"
+
+    @pytest.mark.parametrize("invitation_created", [False, True])
+    def test_failed_offer_discards_the_credential_request(
+        self, send_offer, connection_invitation, invitation_created
+    ):
+        send_offer.side_effect = http_error(403, "Connection not ready")
+        message = outbox.enqueue(
+            "send_credential_offer",
+            {
+                "connection_invitation": connection_invitation.id,
+                "discard_request": True,
+                "invitation_created": invitation_created,
+            },
+            dispatch_on_commit=False,
+        )
+
+        assert outbox.dispatch(message.id).status == OutboxMessage.Status.FAILED
+
+        assert not CredentialRequest.objects.exists()
+        invitation = ConnectionInvitation.objects.filter(id=connection_invitation.id).first()
+        assert (invitation is None) == invitation_created
+        assert invitation is None or invitation.credential_request is None
+
+    def test_failed_offer_keeps_a_credential_request_not_created_for_it(
+        self, send_offer, connection_invitation
+    ):
+        send_offer.side_effect = http_error(403, "Connection not ready")
+        message = outbox.enqueue(
+            "send_credential_offer",
+            {"connection_invitation": connection_invitation.id},
+            dispatch_on_commit=False,
+        )
+
+        assert outbox.dispatch(message.id).status == OutboxMessage.Status.FAILED
+
+        connection_invitation.refresh_from_db()
+        assert connection_invitation.credential_request is not None
+
+
+@pytest.mark.django_db
+class TestCreateSchemaAction:
+    def test_registers_schema_and_disables_the_replaced_one(self, mocker):
+        create_schema = mocker.patch.object(
+            ACAClient, "create_schema", return_value={"schema_id": "new:schema:id"}
+        )
+        replaced, schema = SchemaFactory(), SchemaFactory(schema_id=None)
+
+        result = outbox.ACTIONS["create_schema"]({"schema": schema.id, "replaces": replaced.id})
+
+        assert result == {"schema_id": "new:schema:id"}
+        create_schema.assert_called_once_with(schema.schema_json)
+        assert Schema.objects.get(id=schema.id).schema_id == "new:schema:id"
+        assert not Schema.objects.get(id=replaced.id).enabled
+
+    def test_enables_the_schema_once_registered(self, mocker):
+        mocker.patch.object(ACAClient, "create_schema", return_value={"schema_id": "new:schema:id"})
+        replaced = SchemaFactory()
+        schema = SchemaFactory(schema_id=None, enabled=False)
+
+        outbox.ACTIONS["create_schema"]({"schema": schema.id, "replaces": replaced.id})
+
+        schema.refresh_from_db()
+        replaced.refresh_from_db()
+        assert schema.schema_id == "new:schema:id"
+        assert schema.enabled
+        assert not replaced.enabled
+
+    def test_keeps_the_schema_id_when_what_follows_fails(self, mocker):
+        mocker.patch.object(ACAClient, "create_schema", return_value={"schema_id": "new:schema:id"})
+        replaced = SchemaFactory()
+        schema = SchemaFactory(schema_id=None, enabled=False)
+        filter_schemas = Schema.objects.filter
+
+        def failing_filter(**lookups):
+            if lookups.get("id") == replaced.id:
+                raise RuntimeError("db down")
+            return filter_schemas(**lookups)
+
+        mocker.patch.object(Schema.objects, "filter", side_effect=failing_filter)
+
+        with pytest.raises(RuntimeError):
+            outbox.ACTIONS["create_schema"]({"schema": schema.id, "replaces": replaced.id})
+
+        assert Schema.objects.get(id=schema.id).schema_id == "new:schema:id"
+
+    def test_compensation_removes_the_unregistered_schema(self):
+        registered = SchemaFactory(schema_id="already:registered")
+        schema = SchemaFactory(schema_id=None, enabled=False)
+
+        outbox.COMPENSATIONS["create_schema"]({"schema": schema.id, "replaces": registered.id})
+        outbox.COMPENSATIONS["create_schema"]({"schema": registered.id})
+
+        assert not Schema.objects.filter(id=schema.id).exists()
+        assert Schema.objects.get(id=registered.id).enabled
+
+    def test_does_not_register_twice(self, mocker):
+        create_schema = mocker.patch.object(ACAClient, "create_schema")
+        schema = SchemaFactory(schema_id="already:registered")
+
+        outbox.ACTIONS["create_schema"]({"schema": schema.id})
+
+        create_schema.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_dispatch_outbox_command(echo_action):
+    outbox.enqueue("echo", {}, dispatch_on_commit=False)
+    out = StringIO()
+
+    call_command("dispatch_outbox", stdout=out)
+
+    assert "1 outbox message(s) dispatched" in out.getvalue()
+    assert echo_action == [{}]
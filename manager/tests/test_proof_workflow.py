@@ -0,0 +1,153 @@
+import base64
+import json
+
+import pytest
+
+from aca.client import ACAClient
+from manager.models import ProofDefinition, ProofRequest
+from manager.proof_workflow import (
+    deep_link,
+    proof_request_create,
+    proof_request_template,
+    proof_request_verified,
+    revealed_attributes,
+)
+
+
+@pytest.fixture
+def aca_py(mocker, proof_exchange):
+    mocker.patch.object(ACAClient, "get_public_did", return_value={"verkey": "verkey"})
+    return mocker.patch.object(ACAClient, "create_proof_request", return_value=proof_exchange)
+
+
+@pytest.fixture
+def verified_message(proof_exchange):
+    return {
+        **proof_exchange,
+        "state": "verified",
+        "verified": "true",
+        "presentation": {
+            "requested_proof": {
+                "revealed_attrs": {"email": {"raw": "holder@test.org", "encoded": "123"}},
+                "revealed_attr_groups": {
+                    "names": {"values": {"first_name": {"raw": "Jane", "encoded": "456"}}}
+                },
+            }
+        },
+    }
+
+
+@pytest.mark.django_db
+class TestProofRequestTemplate:
+    def test_template(self, aca_py, proof_definition):
+        template = proof_request_template(proof_definition.id)
+
+        assert template == {
+            "proof_definition_id": proof_definition.id,
+            "name": "proof_definition",
+            "proof_request": {
+                "name": "proof_definition",
+                "version": "1.0",
+                "requested_attributes": proof_definition.proof_request["requested_attributes"],
+                "requested_predicates": {},
+            },
+            "agent": "default",
+            "verkey": "verkey",
+            "endpoint": "aca.py.transport.url",
+        }
+
+    def test_cached(self, aca_py, proof_definition, django_assert_num_queries):
+        proof_request_template(proof_definition.id)
+
+        with django_assert_num_queries(0):
+            proof_request_template(proof_definition.id)
+
+    def test_invalidated_when_the_definition_changes(self, aca_py, proof_definition):
+        proof_request_template(proof_definition.id)
+        proof_definition.enabled = False
+        proof_definition.save()
+
+        with pytest.raises(ProofDefinition.DoesNotExist):
+            proof_request_template(proof_definition.id)
+
+
+@pytest.mark.django_db
+class TestProofRequestCreate:
+    def test_create(self, aca_py, proof_definition, admin_user, proof_exchange):
+        proof_request = proof_request_create(proof_definition.id, admin_user)
+
+        aca_py.assert_called_once_with(
+            {
+                "proof_request": proof_request_template(proof_definition.id)["proof_request"],
+                "comment": "proof_definition",
+                "trace": False,
+            }
+        )
+        assert proof_request.status == ProofRequest.Status.REQUESTED
+        assert proof_request.presentation_exchange_id == "pres-ex-1"
+        presentation = proof_request.presentation_json
+        assert presentation["@id"] == "thread-1"
+        assert presentation["~service"] == {
+            "recipientKeys": ["verkey"],
+            "routingKeys": None,
+            "serviceEndpoint": "aca.py.transport.url",
+        }
+        attachment = presentation["request_presentations~attach"][0]["data"]["base64"]
+        assert json.loads(base64.b64decode(attachment)) == proof_exchange["presentation_request"]
+
+    def test_one_aca_py_call_per_check_in(
+        self, aca_py, proof_definition, admin_user, django_assert_num_queries
+    ):
+        proof_request_create(proof_definition.id, admin_user)
+
+        with django_assert_num_queries(1):
+            aca_py.return_value = {
+                **aca_py.return_value,
+                "presentation_exchange_id": "pres-ex-2",
+            }
+            proof_request_create(proof_definition.id, admin_user)
+
+        assert aca_py.call_count == 2
+        ACAClient.get_public_did.assert_called_once()
+
+    def test_deep_link(self, proof_request):
+        link = deep_link(proof_request)
+
+        assert link.startswith("didcomm://launch?d_m=")
+        message = base64.urlsafe_b64decode(link.split("d_m=")[1])
+        assert json.loads(message) == {"@id": "thread-1"}
+
+
+@pytest.mark.django_db
+class TestProofRequestVerified:
+    def test_verified(self, proof_request, verified_message):
+        assert proof_request_verified(verified_message) == 1
+
+        proof_request.refresh_from_db()
+        assert proof_request.status == ProofRequest.Status.VERIFIED
+        assert proof_request.verified_at is not None
+        assert proof_request.revealed_attributes == {
+            "email": "holder@test.org",
+            "first_name": "Jane",
+        }
+
+    def test_rejected(self, proof_request, verified_message):
+        verified_message["verified"] = "false"
+
+        proof_request_verified(verified_message)
+
+        proof_request.refresh_from_db()
+        assert proof_request.status == ProofRequest.Status.REJECTED
+        assert proof_request.revealed_attributes == {}
+
+    def test_answered_once(self, proof_request, verified_message):
+        proof_request_verified(verified_message)
+        verified_message["verified"] = "false"
+
+        assert proof_request_verified(verified_message) == 0
+        proof_request.refresh_from_db()
+        assert proof_request.status == ProofRequest.Status.VERIFIED
+
+
+def test_revealed_attributes_without_presentation():
+    assert revealed_attributes({"verified": "true"}) == {}
@@ -0,0 +1,95 @@
+import io
+from io import StringIO
+
+import pytest
+import qrcode
+from django.core.management import call_command
+from PIL import Image
+from qrcode import constants
+from qrcode.exceptions import DataOverflowError
+
+from manager import qr_codes, qr_storage
+from manager.tests.factories import ConnectionInvitationFactory
+from manager.utils import QRCodeHandler
+
+INVITATION_URL = "http://aca-py:8020/invite?c_i=" + "eyJAdHlwZSI6ICJkaWQ6c292OkJ6Q2Jz" * 14
+
+
+def best_fit(data: str, level: str) -> int:
+    qr = qrcode.QRCode(error_correction=getattr(constants, f"ERROR_CORRECT_{level}"))
+    qr.add_data(data)
+    return qr.best_fit()
+
+
+@pytest.mark.parametrize("data", ["1", "goodreads", INVITATION_URL, "0123456789" * 300])
+def test_plan_fits_the_data_as_qrcode_does(data):
+    version, level = qr_codes.plan(data, max_version=40)
+
+    assert level == "H"
+    assert version == best_fit(data, "H")
+
+
+def test_plan_lowers_the_error_correction_to_stay_small():
+    assert best_fit(INVITATION_URL, "H") > 20
+    assert qr_codes.plan(INVITATION_URL, max_version=20) == (best_fit(INVITATION_URL, "Q"), "Q")
+    # whatever the error correction, too long for max_version: as small as possible
+    assert qr_codes.plan(INVITATION_URL, max_version=5) == (best_fit(INVITATION_URL, "L"), "L")
+
+
+def test_plan_data_too_long():
+    with pytest.raises(DataOverflowError):
+        qr_codes.plan("x" * 3000)
+
+
+def test_render_png():
+    image = Image.open(io.BytesIO(qr_codes.render("goodreads", box_size=2, border=1)))
+
+    assert image.format == "PNG"
+    assert image.mode == "P"
+    # version 2: 25 modules, and the quiet zone
+    assert image.size == (54, 54)
+    assert image.getpixel((0, 0)) == 0 and image.getpixel((2, 2)) == 1
+
+
+def test_render_svg():
+    svg = qr_codes.render("goodreads", qr_codes.SVG, border=1).decode()
+
+    assert svg.startswith('<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 27 27"')
+    # the runs of the first row of modules: the top of the finder patterns, in between
+    assert '<path stroke="#000" d="M1 1.5h7m4 0h2m1 0h1m3 0h7M1 2.5h1m5 0h1' in svg
+
+
+def test_render_many_keeps_the_order():
+    texts = [f"code-{index}" for index in range(5)]
+
+    images = list(qr_codes.render_many(texts, qr_codes.SVG, processes=2, chunksize=2))
+
+    assert images == [qr_codes.render(text, qr_codes.SVG) for text in texts]
+
+
+@pytest.mark.django_db
+def test_render_qr_codes_command(credential_request):
+    for connection_id, url in (("1", "pending.url"), ("2", "other.url")):
+        ConnectionInvitationFactory(
+            connection_id=connection_id,
+            accepted=False,
+            credential_request=credential_request,
+            invitation_json={"invitation_url": url},
+        )
+    ConnectionInvitationFactory(
+        connection_id="3",
+        accepted=True,
+        credential_request=None,
+        invitation_json={"invitation_url": "accepted.url"},
+    )
+    out = StringIO()
+
+    call_command("render_qr_codes", "--processes", "1", stdout=out)
+    call_command("render_qr_codes", "--processes", "1", stdout=out)
+
+    first, second = out.getvalue().splitlines()
+    assert first.startswith("2 QR code(s) rendered in ")
+    assert second.startswith("0 QR code(s) rendered in ") and second.endswith("(2 already there)")
+    assert qr_storage.names() == {
+        QRCodeHandler.file_name(url) for url in ("pending.url", "other.url")
+    }
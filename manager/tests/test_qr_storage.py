@@ -0,0 +1,88 @@
+import pytest
+
+from manager import qr_codes, qr_storage
+
+
+@pytest.fixture
+def render(mocker):
+    return mocker.spy(qr_codes, "render")
+
+
+def test_name_is_a_hash_of_the_rendering_inputs(settings):
+    name = qr_storage.name("some data")
+
+    assert qr_storage.NAME.match(name) and name.endswith(".png")
+    assert qr_storage.name("some data") == name
+    assert qr_storage.name("other data") != name
+    assert qr_storage.name("some data", qr_codes.SVG) != name
+    settings.QR_CODE_MAX_VERSION = 10
+    assert qr_storage.name("some data") != name
+
+
+def test_stored_once(render):
+    name = qr_storage.store("some data")
+
+    assert qr_storage.store("some data") == name
+    assert render.call_count == 1
+    assert qr_storage.names() == {name}
+    assert qr_storage.read(name).startswith(b"\x89PNG")
+
+
+@pytest.mark.parametrize(
+    "backend",
+    ["manager.tests.storage.ObjectStorage", "django.core.files.storage.FileSystemStorage"],
+)
+def test_put_concurrently(settings, tmp_path, backend):
+    # both keep a second object stored under a taken name, with a suffix
+    options = (
+        {"location": str(tmp_path)}
+        if backend.endswith("FileSystemStorage")
+        else {"file_overwrite": False}
+    )
+    settings.QR_CODE_STORAGE = {"BACKEND": backend, "OPTIONS": options}
+    name = qr_storage.name("some data")
+
+    # stored by another node between the check and the save
+    assert qr_storage.put(name, b"png") == name
+    assert qr_storage.put(name, b"png") == name
+
+    assert qr_storage.names() == {name}
+    assert qr_storage.read(name) == b"png"
+
+
+@pytest.mark.parametrize("name", ["unknown.png", "../secret.png", f"{'0' * 64}.png"])
+def test_read_unknown(name):
+    assert qr_storage.read(name) is None
+
+
+def test_url():
+    name = qr_storage.name("some data")
+
+    assert qr_storage.url(name) == f"http://test.com/qr-codes/{name}"
+
+
+class TestQRCodeImageView:
+    @pytest.mark.parametrize("image_format", [qr_codes.PNG, qr_codes.SVG])
+    def test_immutable(self, client, image_format):
+        name = qr_storage.store("some data", image_format)
+
+        response = client.get(f"/qr-codes/{name}")
+
+        assert response.status_code == 200
+        assert response["Content-Type"] == qr_codes.CONTENT_TYPES[image_format]
+        assert response["Cache-Control"] == "public, max-age=31536000, immutable"
+        assert response["ETag"] == f'"{name.split(".")[0]}"'
+        assert response.content == qr_storage.read(name)
+
+    def test_not_modified(self, client):
+        name = qr_storage.store("some data")
+        etag = client.get(f"/qr-codes/{name}")["ETag"]
+
+        response = client.get(f"/qr-codes/{name}", HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 304
+        assert not response.content
+
+    def test_not_found(self, client):
+        assert client.get(f"/qr-codes/{qr_storage.name('some data')}").status_code == 404
+        assert client.get("/qr-codes/some.png").status_code == 404
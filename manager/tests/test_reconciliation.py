@@ -0,0 +1,99 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from aca.client import ACAClient
+from manager.models import CredentialOffer, CredentialRequest
+from manager.reconciliation import (
+    issue_credential_records,
+    reconcile_credential_offers,
+    reconcile_records,
+)
+
+
+def record(offer, **fields):
+    return {"credential_exchange_id": offer.cred_ex_id, "state": "offer_sent", **fields}
+
+
+class TestIssueCredentialRecords:
+    def test_pages(self, mocker):
+        client = mocker.Mock()
+        client.list_issue_credential_records.side_effect = [
+            [{"credential_exchange_id": "1"}, {"credential_exchange_id": "2"}],
+            [{"credential_exchange_id": "3"}],
+        ]
+
+        pages = list(issue_credential_records(client, page_size=2))
+
+        assert [len(page) for page in pages] == [2, 1]
+        assert client.list_issue_credential_records.call_args_list[1] == mocker.call(
+            role="issuer", limit=2, offset=2
+        )
+
+    def test_aca_py_without_pagination(self, mocker):
+        everything = [{"credential_exchange_id": "1"}, {"credential_exchange_id": "2"}]
+        client = mocker.Mock()
+        client.list_issue_credential_records.return_value = everything
+
+        assert list(issue_credential_records(client, page_size=2)) == [everything]
+
+
+@pytest.mark.django_db
+class TestReconcileRecords:
+    def test_updates_ids_and_accepts(self, credential_offer, second_credential_offer):
+        changed, accepted = reconcile_records(
+            [
+                record(credential_offer, revocation_id="7", credential_id="cred-1"),
+                record(second_credential_offer, state="credential_acked"),
+                {"credential_exchange_id": "unknown", "revocation_id": "1"},
+            ]
+        )
+
+        assert (changed, accepted) == (2, 1)
+        credential_offer.refresh_from_db()
+        assert credential_offer.revocation_id == "7"
+        assert credential_offer.credential_id == "cred-1"
+        assert not credential_offer.accepted
+        second_credential_offer.refresh_from_db()
+        assert second_credential_offer.accepted
+        assert second_credential_offer.credential_request.status == CredentialRequest.Status.ISSUED
+
+    def test_nothing_to_do(self, credential_offer):
+        credential_offer.revocation_id = "7"
+        credential_offer.save()
+
+        assert reconcile_records([record(credential_offer, revocation_id="7")]) == (0, 0)
+
+    def test_dry_run(self, credential_offer):
+        assert reconcile_records([record(credential_offer, revocation_id="7")], dry_run=True) == (
+            1,
+            0,
+        )
+        assert CredentialOffer.objects.get().revocation_id is None
+
+
+@pytest.mark.django_db
+def test_reconcile_credential_offers_command(mocker, credential_offer):
+    list_records = mocker.patch.object(
+        ACAClient,
+        "list_issue_credential_records",
+        return_value=[record(credential_offer, state="credential_issued", revocation_id="3")],
+    )
+    out = StringIO()
+
+    call_command("reconcile_credential_offers", "--state", "credential_issued", stdout=out)
+
+    assert "1 credential offer(s) updated, 1 accepted" in out.getvalue()
+    list_records.assert_called_once_with(
+        role="issuer", limit=100, offset=0, state="credential_issued"
+    )
+    assert CredentialOffer.objects.get().accepted
+
+
+@pytest.mark.django_db
+def test_reconcile_credential_offers_with_client(mocker, credential_offer):
+    client = mocker.Mock()
+    client.list_issue_credential_records.return_value = []
+
+    assert reconcile_credential_offers(client=client) == (0, 0)
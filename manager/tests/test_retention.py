@@ -0,0 +1,175 @@
+import json
+import time
+from datetime import datetime, timezone
+
+import pytest
+from django.test import override_settings
+from freezegun import freeze_time
+
+from manager import qr_storage
+from manager.models import ConnectionInvitation, CredentialOffer
+from manager.retention import (
+    StaleInvitationsPolicy,
+    SupersededInvitationsPolicy,
+    SupersededOffersPolicy,
+    configured_policies,
+    prune,
+    prune_qr_codes,
+)
+from manager.tests.factories import ConnectionInvitationFactory
+from manager.utils import QRCodeHandler
+
+OLD = datetime(2020, 1, 1, tzinfo=timezone.utc)
+RECENT = datetime(2020, 3, 1, tzinfo=timezone.utc)
+NOW = datetime(2020, 3, 2, tzinfo=timezone.utc)
+
+
+def create_invitation(when, **kwargs):
+    with freeze_time(when):
+        return ConnectionInvitationFactory(**kwargs)
+
+
+def create_offer(when, credential_request, **kwargs):
+    with freeze_time(when):
+        return CredentialOffer.objects.create(
+            connection_id="1",
+            offer_json={},
+            credential_request=credential_request,
+            **kwargs,
+        )
+
+
+@pytest.mark.django_db
+@freeze_time(NOW)
+class TestPolicies:
+    def test_superseded_invitations(self, credential_request, second_credential_request):
+        superseded = create_invitation(
+            OLD, connection_id="1", accepted=False, credential_request=credential_request
+        )
+        latest = create_invitation(
+            RECENT, connection_id="2", accepted=True, credential_request=credential_request
+        )
+        only_one = create_invitation(
+            OLD, connection_id="3", accepted=True, credential_request=second_credential_request
+        )
+
+        selected = list(SupersededInvitationsPolicy(30).queryset())
+
+        assert selected == [superseded]
+        assert latest not in selected and only_one not in selected
+
+    def test_superseded_invitations_keeps_recent_ones(self, credential_request):
+        create_invitation(
+            RECENT, connection_id="1", accepted=False, credential_request=credential_request
+        )
+        create_invitation(
+            RECENT, connection_id="2", accepted=False, credential_request=credential_request
+        )
+
+        assert not SupersededInvitationsPolicy(30).queryset().exists()
+
+    def test_superseded_invitations_keeps_accepted_ones(self, credential_request):
+        create_invitation(
+            OLD, connection_id="1", accepted=True, credential_request=credential_request
+        )
+        create_invitation(
+            RECENT, connection_id="2", accepted=True, credential_request=credential_request
+        )
+
+        assert not SupersededInvitationsPolicy(30).queryset().exists()
+
+    def test_stale_invitations(self, credential_request):
+        stale = create_invitation(
+            OLD, connection_id="1", accepted=False, credential_request=credential_request
+        )
+        create_invitation(OLD, connection_id="2", accepted=True, credential_request=None)
+        create_invitation(RECENT, connection_id="3", accepted=False, credential_request=None)
+
+        assert list(StaleInvitationsPolicy(30).queryset()) == [stale]
+
+    def test_superseded_offers(self, credential_request):
+        superseded = create_offer(OLD, credential_request)
+        create_offer(OLD, credential_request, accepted=True)
+        create_offer(RECENT, credential_request)
+
+        assert list(SupersededOffersPolicy(30).queryset()) == [superseded]
+
+    @override_settings(
+        ISSUANCE_DATA_RETENTION={"superseded_invitations": 10, "stale_invitations": None}
+    )
+    def test_configured_policies(self):
+        policies = configured_policies()
+
+        assert [(policy.name, policy.days) for policy in policies] == [
+            ("superseded_invitations", 10)
+        ]
+
+
+@pytest.mark.django_db
+@freeze_time(NOW)
+class TestPrune:
+    @pytest.fixture
+    def stale_invitations(self):
+        return [
+            create_invitation(OLD, connection_id=str(i), accepted=False, credential_request=None)
+            for i in range(5)
+        ]
+
+    def test_prune_in_batches(self, stale_invitations):
+        deleted = prune(StaleInvitationsPolicy(30), batch_size=2)
+
+        assert deleted == 5
+        assert not ConnectionInvitation.objects.exists()
+
+    def test_max_batches(self, stale_invitations):
+        deleted = prune(StaleInvitationsPolicy(30), batch_size=2, max_batches=1)
+
+        assert deleted == 2
+        assert ConnectionInvitation.objects.count() == 3
+
+    def test_dry_run(self, stale_invitations):
+        assert prune(StaleInvitationsPolicy(30), dry_run=True) == 5
+        assert ConnectionInvitation.objects.count() == 5
+
+    def test_archive(self, stale_invitations, tmp_path):
+        prune(StaleInvitationsPolicy(30), batch_size=2, archive_dir=str(tmp_path))
+
+        (archive,) = tmp_path.iterdir()
+        assert archive.name.startswith("stale_invitations-")
+        rows = [json.loads(line) for line in archive.read_text().splitlines()]
+        assert sorted(row["pk"] for row in rows) == sorted(
+            invitation.pk for invitation in stale_invitations
+        )
+
+
+@pytest.mark.django_db
+class TestPruneQRCodes:
+    @staticmethod
+    def qr_code(data, age_days):
+        name = QRCodeHandler.file_name(data)
+        qr_storage.put(name, b"png")
+        modified = datetime.fromtimestamp(time.time() - age_days * 24 * 60 * 60, timezone.utc)
+        storage = qr_storage.storage()
+        storage.objects[name] = (storage.objects[name][0], modified)
+        return name
+
+    def test_removes_old_orphans_only(self):
+        ConnectionInvitationFactory(
+            connection_id="1",
+            accepted=False,
+            credential_request=None,
+            invitation_json={"invitation_url": "pending.url"},
+        )
+        pending = self.qr_code("pending.url", age_days=100)
+        self.qr_code("accepted.url", age_days=100)
+        recent = self.qr_code("recent.url", age_days=1)
+
+        assert prune_qr_codes(30) == 1
+
+        assert qr_storage.names() == {pending, recent}
+
+    def test_dry_run(self):
+        orphan = self.qr_code("accepted.url", age_days=100)
+
+        assert prune_qr_codes(30, dry_run=True) == 1
+        assert qr_storage.names() == {orphan}
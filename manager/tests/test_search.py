@@ -0,0 +1,112 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from manager.models import CredentialRequest
+from manager.search import (
+    SQLiteSearchBackend,
+    build_search_document,
+    search_credential_requests,
+    search_terms,
+)
+
+
+@pytest.fixture
+def fts_index():
+    with connection.schema_editor() as schema_editor:
+        SQLiteSearchBackend.install(schema_editor)
+    yield
+    with connection.schema_editor() as schema_editor:
+        SQLiteSearchBackend.uninstall(schema_editor)
+
+
+def test_search_terms():
+    assert search_terms("  Foo   BAR ") == ["foo", "bar"]
+    assert search_terms("") == []
+
+
+@pytest.mark.django_db
+class TestBuildSearchDocument:
+    def test_document_content(self, credential_request, some_organization):
+        credential_request.organization = some_organization
+        credential_request.save()
+
+        assert credential_request.search_document == (
+            "test@emails.com 12345 credential_definition unicc "
+            "credential_data_value_1 credential_data_value_2"
+        )
+
+    @override_settings(CREDENTIAL_REQUEST_SEARCH_ATTRIBUTES=["credential_data_key_2"])
+    def test_selected_attributes(self, credential_request):
+        assert build_search_document(credential_request) == (
+            "test@emails.com 12345 credential_definition credential_data_value_2"
+        )
+
+    def test_kept_in_sync_on_partial_save(self, credential_request):
+        credential_request.email = "Other@Emails.com"
+        credential_request.save(update_fields=["email"])
+
+        credential_request.refresh_from_db()
+        assert credential_request.search_document.startswith("other@emails.com ")
+
+
+@pytest.mark.django_db
+class TestSearchCredentialRequests:
+    def test_empty_term_returns_queryset(self, credential_request, second_credential_request):
+        assert search_credential_requests(CredentialRequest.objects.all(), " ").count() == 2
+
+    def test_fallback_search(self, credential_request, second_credential_request):
+        result = search_credential_requests(CredentialRequest.objects.all(), "TEST_2@emails")
+
+        assert list(result) == [second_credential_request]
+
+    def test_all_terms_must_match(self, credential_request, second_credential_request):
+        result = search_credential_requests(
+            CredentialRequest.objects.all(), "credential_data_value_1 98765"
+        )
+
+        assert list(result) == [second_credential_request]
+
+
+@pytest.mark.django_db(transaction=True)
+class TestSQLiteFullTextSearch:
+    def test_search_uses_fts_table(self, fts_index, credential_request, second_credential_request):
+        result = search_credential_requests(CredentialRequest.objects.all(), "second_credential")
+
+        assert list(result) == [second_credential_request]
+        assert "manager_credentialrequest_fts" in str(result.query)
+
+    def test_fts_table_follows_updates_and_deletes(self, fts_index, credential_request):
+        credential_request.email = "renamed@emails.com"
+        credential_request.save()
+
+        assert list(
+            search_credential_requests(CredentialRequest.objects.all(), "renamed@emails.com")
+        ) == [credential_request]
+        assert not search_credential_requests(CredentialRequest.objects.all(), "test@").exists()
+
+        credential_request.delete()
+        assert not search_credential_requests(CredentialRequest.objects.all(), "renamed").exists()
+
+
+@pytest.mark.django_db
+def test_api_search(api_client_admin, credential_request, second_credential_request):
+    response = api_client_admin.get(
+        reverse("CredentialRequestListCreate"), {"search": "test_2@emails.com"}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [item["code"] for item in response.data["results"]] == ["98765"]
+
+
+@pytest.mark.django_db
+def test_rebuild_search_index_command(credential_request):
+    CredentialRequest.objects.update(search_document="")
+
+    call_command("rebuild_search_index")
+
+    credential_request.refresh_from_db()
+    assert credential_request.search_document == build_search_document(credential_request)
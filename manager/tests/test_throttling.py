@@ -0,0 +1,125 @@
+import pytest
+from rest_framework import status
+
+from manager import throttling
+from manager.throttling import admit, parse_rate, take
+
+
+@pytest.fixture
+def clock(mocker):
+    now = [1000.0]
+    mocker.patch("manager.throttling.time.time", side_effect=lambda: now[0])
+    return now
+
+
+@pytest.fixture(autouse=True)
+def counters():
+    throttling.ADMITTED.clear()
+    throttling.REJECTED.clear()
+
+
+@pytest.mark.parametrize(
+    "rate, expected",
+    [("10/s", (10, 10)), ("60/min", (1, 60)), ("7200/hour", (2, 7200)), (None, None)],
+)
+def test_parse_rate(rate, expected):
+    assert parse_rate(rate) == expected
+
+
+def test_parse_rate_none_string():
+    assert parse_rate("None") is None
+
+
+def test_bucket_drains_and_refills(clock):
+    rate = parse_rate("2/s")
+
+    assert take("scope", "ip", "1.2.3.4", rate) == 0
+    assert take("scope", "ip", "1.2.3.4", rate) == 0
+    assert take("scope", "ip", "1.2.3.4", rate) == pytest.approx(0.5)
+    assert take("scope", "ip", "5.6.7.8", rate) == 0
+
+    clock[0] += 0.5
+    assert take("scope", "ip", "1.2.3.4", rate) == 0
+    assert take("scope", "ip", "1.2.3.4", rate) > 0
+
+
+def test_admit_per_identity(settings, clock):
+    settings.ADMISSION_CONTROL = {"deep_link": {"ip": "10/min", "code": "1/min"}}
+
+    assert admit("deep_link", {"ip": "1.2.3.4", "code": "a"}).status == 200
+    decision = admit("deep_link", {"ip": "1.2.3.4", "code": "a"})
+    assert decision.status == 429
+    assert decision.reason == "code"
+    assert decision.retry_after == pytest.approx(60)
+    assert admit("deep_link", {"ip": "1.2.3.4", "code": "b"}).status == 200
+
+    assert throttling.ADMITTED.value(scope="deep_link") == 2
+    assert throttling.REJECTED.value(scope="deep_link", reason="code") == 1
+
+
+def test_admit_sheds_load_over_the_global_budget(settings, clock):
+    settings.ADMISSION_CONTROL = {"webhooks": {"ip": None, "global": "2/s"}}
+
+    assert admit("webhooks", {"ip": "1.2.3.4"}).status == 200
+    assert admit("webhooks", {"ip": "5.6.7.8"}).status == 200
+    assert admit("webhooks", {"ip": "9.9.9.9"}) == (503, pytest.approx(0.5), "global")
+
+
+def test_admit_shed_mode(settings):
+    settings.ADMISSION_SHED_LOAD = True
+
+    assert admit("deep_link", {"ip": "1.2.3.4"}).status == 503
+    assert throttling.REJECTED.value(scope="deep_link", reason="shed") == 1
+
+
+@pytest.mark.django_db
+class TestPublicEndpoints:
+    def test_deep_link_redirect_rejected_with_429(self, api_client, settings, mocker):
+        settings.ADMISSION_CONTROL = {"deep_link": {"code": "1/min"}}
+        mocker.patch(
+            "manager.views.CredentialOfferHandler.get_credential_offer",
+            return_value=(None, "invitation", "url"),
+        )
+
+        assert api_client.get("/deep-link-redirect/code").status_code == status.HTTP_302_FOUND
+        response = api_client.get("/deep-link-redirect/code")
+
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert response["Retry-After"] == "60"
+
+    def test_deep_link_redirect_shed_with_503(self, api_client, settings):
+        settings.ADMISSION_SHED_LOAD = True
+
+        response = api_client.get("/deep-link-redirect/code")
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response["Retry-After"] == "60"
+
+    def test_webhooks_rejected_with_429(self, api_client, settings, mocker):
+        settings.ADMISSION_CONTROL = {"webhooks": {"ip": "1/min"}}
+        reconcile_records = mocker.patch("manager.webhook_handlers.reconcile_records")
+        url = f"/webhooks/{settings.ACA_PY_WEBHOOKS_API_KEY}/topic/issue_credential/"
+        message = {"state": "credential_issued", "connection_id": "1"}
+
+        assert api_client.post(url, data=message, format="json").status_code == 200
+        response = api_client.post(url, data=message, format="json")
+
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert response["Retry-After"] == "60"
+        reconcile_records.assert_called_once()
+
+    def test_webhooks_with_a_wrong_key_leave_the_budget(self, api_client, settings, mocker):
+        settings.ADMISSION_CONTROL = {"webhooks": {"global": "1/min"}}
+        take = mocker.spy(throttling, "take")
+        mocker.patch("manager.webhook_handlers.reconcile_records")
+        message = {"state": "credential_issued", "connection_id": "1"}
+
+        for _ in range(3):
+            response = api_client.post(
+                "/webhooks/wrong-key/topic/issue_credential/", data=message, format="json"
+            )
+            assert response.status_code == 200
+        url = f"/webhooks/{settings.ACA_PY_WEBHOOKS_API_KEY}/topic/issue_credential/"
+
+        assert api_client.post(url, data=message, format="json").status_code == 200
+        assert take.call_count == 1
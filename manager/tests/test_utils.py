@@ -1,12 +1,12 @@
-import os.path
 from unittest.mock import call
 
 import pytest
-from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 from django.test import override_settings
 from post_office import mail
 
 from credential_crafters.base import CredentialCrafter
+from manager import qr_storage
 from manager.utils import (
     Assets,
     EmailHelper,
@@ -95,27 +95,38 @@ class TestEmailHelper:
         post_office_mail.assert_not_called()
 
 
-@override_settings(CREDENTIAL_CRAFTERS=["module.CrafterClass"])
-def test_get_credential_crafter_class():
-    assert get_credential_crafter_class(0) == CredentialCrafter
+class CustomCrafter(CredentialCrafter):
+    pass
+
+
+def test_get_credential_crafter_class_defaults_to_base_crafter():
+    assert get_credential_crafter_class("unknown:definition") == CredentialCrafter
 
 
-@override_settings(CREDENTIAL_CRAFTERS=["module.secondmodule.TestCrafterClass"])
+@override_settings(CREDENTIAL_CRAFTERS={"cred:def:1": "manager.tests.test_utils.CustomCrafter"})
+def test_get_credential_crafter_class_configured():
+    assert get_credential_crafter_class("cred:def:1") == CustomCrafter
+    assert get_credential_crafter_class("cred:def:2") == CredentialCrafter
+
+
+@override_settings(CREDENTIAL_CRAFTERS={"cred:def:1": "module.secondmodule.TestCrafterClass"})
 def test_get_credential_crafter_class_does_not_exist():
-    assert get_credential_crafter_class(0) == CredentialCrafter
+    with pytest.raises(ImproperlyConfigured):
+        get_credential_crafter_class("cred:def:1")
 
 
-@override_settings(CREDENTIAL_CRAFTERS=["module.secondmodule.TestCrafterClass"])
-def test_get_credential_crafter_class_does_out_of_bounds():
-    assert get_credential_crafter_class(1) == CredentialCrafter
+@override_settings(CREDENTIAL_CRAFTERS=["module.CrafterClass"])
+def test_get_credential_crafter_class_invalid_setting():
+    with pytest.raises(ImproperlyConfigured):
+        get_credential_crafter_class(0)
 
 
 @pytest.mark.django_db
 class TestQRCodeHandler:
-    def test_text_to_qr_creates_qr_image(self):
+    def test_text_to_qr_stores_qr_image(self):
         data = "goodreads"
-        qr_image_path = QRCodeHandler.text_to_qr(data)
+        qr_image_url = QRCodeHandler.text_to_qr(data)
 
-        image_path = os.path.join(settings.ROOT_DIR, "assets", qr_image_path)
-        assert os.path.isfile(image_path)
-        os.remove(image_path)
+        name = QRCodeHandler.file_name(data)
+        assert qr_image_url == f"http://test.com/qr-codes/{name}"
+        assert qr_storage.read(name).startswith(b"\x89PNG")
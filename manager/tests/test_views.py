@@ -1,20 +1,27 @@
 from datetime import datetime
-from unittest.mock import call, patch
+from unittest.mock import patch
 
 import pytest
+from django.http import HttpResponseRedirect
+from django.test import override_settings
 from django.utils import timezone
 from freezegun import freeze_time
 from post_office import mail
-from requests import HTTPError
+from requests import ConnectionError, HTTPError
 from rest_framework import status
 
+from aca import resilience
 from aca.client import ACAClient
 from manager.handlers import ACAPy
 from manager.models import (
     ConnectionInvitation,
     CredentialDefinition,
+    CredentialOffer,
     CredentialRequest,
     Organization,
+    OutboxMessage,
+    ProofDefinition,
+    ProofRequest,
     Schema,
 )
 from manager.tests.api_view_test_classes import (
@@ -24,7 +31,7 @@ from manager.tests.api_view_test_classes import (
     TestRetrieveAPIView,
     TestRetrieveDestroyAPIView,
 )
-from manager.tests.factories import OrganizationFactory, SchemaFactory
+from manager.tests.factories import ConnectionInvitationFactory, OrganizationFactory, SchemaFactory
 from manager.utils import QRCodeHandler
 
 
@@ -255,6 +262,7 @@ class TestSchemaViewSet(TestListCreateAPIView, TestRetrieveAPIView):
         schema_to_update.refresh_from_db()
         new_schema = Schema.objects.get(name=body["name"])
         assert response.status_code == status.HTTP_200_OK
+        assert response.data["id"] == new_schema.id
         assert Schema.objects.count() == number_of_schemas + 1
         assert not schema_to_update.enabled
         assert body["name"] == new_schema.name
@@ -267,6 +275,57 @@ class TestSchemaViewSet(TestListCreateAPIView, TestRetrieveAPIView):
         assert new_schema.modified == self.mock_datetime
         mock_upload_schema.assert_called_once_with(body["schema_json"])
 
+    def test_update_schema_keeps_the_updated_until_the_ledger_accepts_the_new(
+        self, mocker, authenticate
+    ):
+        mocker.patch.object(ACAClient, "create_schema", side_effect=ConnectionError("refused"))
+        schema_to_update = SchemaFactory()
+        body = {
+            "name": "other_name",
+            "organization_name": OrganizationFactory().pk,
+            "schema_json": {
+                "schema_name": "other_schema_name",
+                "schema_version": "some_schema_version",
+                "attributes": ["foo", "bar"],
+            },
+        }
+
+        response = self.client.put(f"/{self.path}{schema_to_update.id}/", body, format="json")
+
+        schema_to_update.refresh_from_db()
+        new_schema = Schema.objects.get(name=body["name"])
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data["id"] == new_schema.id
+        assert schema_to_update.enabled
+        assert new_schema.schema_id is None
+        assert not new_schema.enabled
+        assert OutboxMessage.objects.get().status == OutboxMessage.Status.PENDING
+
+    def test_update_schema_refused_by_the_ledger_keeps_the_updated(self, mocker, authenticate):
+        mock_response = mocker.Mock()
+        mock_response.text = "400: Schema already exists"
+        mocker.patch.object(
+            ACAClient, "create_schema", side_effect=HTTPError(response=mock_response)
+        )
+        schema_to_update = SchemaFactory()
+        body = {
+            "name": "other_name",
+            "organization_name": OrganizationFactory().pk,
+            "schema_json": {
+                "schema_name": "other_schema_name",
+                "schema_version": "some_schema_version",
+                "attributes": ["foo", "bar"],
+            },
+        }
+
+        response = self.client.put(f"/{self.path}{schema_to_update.id}/", body, format="json")
+
+        schema_to_update.refresh_from_db()
+        assert response.status_code == status.HTTP_502_BAD_GATEWAY
+        assert schema_to_update.enabled
+        assert not Schema.objects.filter(name=body["name"]).exists()
+        assert OutboxMessage.objects.get().status == OutboxMessage.Status.FAILED
+
     def test_update_schema_with_non_valid_data_returns_error(self, authenticate):
         schema_to_update = SchemaFactory()
         non_existent_organization = getattr(Organization.objects.last(), "id", 0) + 1
@@ -325,6 +384,7 @@ class TestCredentialRequestRetrieveDestroyAPIView(TestRetrieveDestroyAPIView):
             "connection_accepted": False,
             "credential_offer_accepted": False,
             "revoked_credential": False,
+            "status": "pending",
             "connection_invitation_url": "Imludml0YXRpb24udGVzdC51cmwi",
         }
 
@@ -429,6 +489,7 @@ class TestCredentialRequestListCreateAPIView(TestListCreateAPIView):
             "invitation_url": "http://test.com/deep-link-redirect/12345",
             "id": 1,
             "revoked_credential": False,
+            "status": "pending",
             "connection_accepted": False,
             "credential_offer_accepted": False,
             "connection_invitation_url": "bnVsbA==",
@@ -460,6 +521,7 @@ class TestCredentialRequestListCreateAPIView(TestListCreateAPIView):
         assert cred_def_id == "testcredentialdefinition:1:2:3:test"
 
         mock_send.assert_called()
+        assert mock_send.call_args.kwargs["context"]["qr_code_url"] == "invitation.url"
 
     def create_multi(self, data, mock_send):
         response = self.client.post(f"/{self.path}", data, format="json")
@@ -793,8 +855,8 @@ class TestCredentialOfferListAPIView(TestListAPIView):
                     "connection_id": "2",
                     "cred_ex_id": "b4cb054e-5a08-455e-b7a9-fef47d0957e5",
                     "credential_request": 2,
-                    "revocation_id": "12",
-                    "credential_id": "3fa85f64-5717-4562-b3fc-2c963f66afa6",
+                    "revocation_id": None,
+                    "credential_id": None,
                     "offer_json": '{"offer_key_1": "offer_value_1", '
                     '"offer_key_2": "offer_value_2"}',
                     "created": "2020-01-01T00:00:00Z",
@@ -803,7 +865,7 @@ class TestCredentialOfferListAPIView(TestListAPIView):
             ],
         }
 
-        self.mock.assert_has_calls([call(second_credential_offer.cred_ex_id)])
+        self.mock.assert_not_called()
 
 
 @pytest.mark.django_db
@@ -889,6 +951,17 @@ class TestConnectionInvitationView:
         assert response.json() == "Error establishing connection, error: cannot connect"
         receive_invitation_mock.assert_called_once()
 
+    def test_503_while_aca_py_is_unavailable(self, api_client_admin, settings, requests_mock):
+        for _ in range(settings.ACA_PY_BREAKER["failures"]):
+            resilience.breaker("default").failed()
+
+        response = api_client_admin.post(self.url, data=self.body, format="json")
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert int(response["Retry-After"]) <= settings.ACA_PY_BREAKER["reset_after"]
+        assert not requests_mock.called
+        assert not ConnectionInvitation.objects.exists()
+
 
 @pytest.mark.django_db
 class TestCredentialView:
@@ -909,7 +982,7 @@ class TestCredentialView:
             "credential_data": {"schema_key_1": "1", "schema_key_2": "2"},
         }
         self.mock_cred_offer = mocker.patch(
-            "manager.views.credential_offer_create",
+            "manager.outbox.credential_offer_create",
             return_value={
                 "connection_id": "144e7275-c43b-40a9-a8d9-e42078f56427",
                 "cred_def_id": "AQupvo8VaZdQFc7Gn6Rs3d:3:CL:22:test_malawi",
@@ -972,13 +1045,41 @@ class TestCredentialView:
         mock_response.text = "403: Connection not ready"
 
         mocker_offer = mocker.patch(
-            "manager.views.credential_offer_create", side_effect=HTTPError(response=mock_response)
+            "manager.outbox.credential_offer_create", side_effect=HTTPError(response=mock_response)
         )
 
         response = api_client_admin.post(self.url, data=self.body, format="json")
 
         assert response.status_code == status.HTTP_403_FORBIDDEN
         mocker_offer.assert_called_once()
+        # as if the offer had been sent in the transaction creating the request
+        assert not CredentialRequest.objects.exists()
+        conn_invitation_without_cred_request.refresh_from_db()
+        assert conn_invitation_without_cred_request.credential_request is None
+
+    def test_returns_202_when_aca_py_is_unreachable(
+        self, mocker, api_client_admin, conn_invitation_without_cred_request
+    ):
+        mocker.patch(
+            "manager.outbox.credential_offer_create", side_effect=ConnectionError("refused")
+        )
+
+        response = api_client_admin.post(self.url, data=self.body, format="json")
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        credential_request = CredentialRequest.objects.get()
+        assert response.json() == {
+            "connection_id": self.body["connection_id"],
+            "cred_def_id": self.body["cred_def_id"],
+            "cred_request_id": credential_request.id,
+        }
+        message = OutboxMessage.objects.get()
+        assert message.status == OutboxMessage.Status.PENDING
+        assert message.payload == {
+            "connection_invitation": conn_invitation_without_cred_request.id,
+            "discard_request": True,
+            "invitation_created": False,
+        }
 
     def test_create_con_invitation_when_same_connection_invitation_given(
         self, mocker, api_client_admin, credential_definition, conn_invitation, credential_request
@@ -1025,3 +1126,288 @@ class TestCredentialView:
 
         conn_invitation.refresh_from_db()
         assert conn_invitation.credential_request == credential_request
+
+
+@pytest.mark.django_db
+class TestCredentialViewBulk:
+    url = "/credential"
+
+    @pytest.fixture(autouse=True)
+    def setup(self, mocker, credential_definition):
+        self.invitations = [
+            ConnectionInvitationFactory(
+                connection_id=f"bulk-{i}", accepted=True, credential_request=None
+            )
+            for i in range(3)
+        ]
+        self.body = [
+            {
+                "connection_id": invitation.connection_id,
+                "cred_def_id": credential_definition.credential_id,
+                "credential_data": {"schema_key_1": str(i), "schema_key_2": "2"},
+            }
+            for i, invitation in enumerate(self.invitations)
+        ]
+        self.send_offer = mocker.patch.object(
+            ACAClient,
+            "send_credential_offer",
+            side_effect=lambda offer, connection_id: {
+                "credential_exchange_id": f"cred-ex-{connection_id}"
+            },
+        )
+
+    def test_return_401_when_unauthorized_client(self, api_client):
+        response = api_client.post(self.url, data=self.body, format="json")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_returns_201_when_every_offer_is_sent(self, api_client_admin, admin_user):
+        response = api_client_admin.post(self.url, data=self.body, format="json")
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert self.send_offer.call_count == 3
+
+        credential_requests = CredentialRequest.objects.order_by("id")
+        assert credential_requests.count() == 3
+        assert [result["cred_request_id"] for result in response.json()] == [
+            credential_request.id for credential_request in credential_requests
+        ]
+        for result, item, credential_request in zip(
+            response.json(), self.body, credential_requests
+        ):
+            assert result["status"] == CredentialRequest.Status.OFFERED
+            assert result["connection_id"] == item["connection_id"]
+            assert credential_request.credential_data == item["credential_data"]
+            assert credential_request.creator == admin_user
+            assert credential_request.status == CredentialRequest.Status.OFFERED
+            assert credential_request.search_document
+
+            offer = credential_request.credential_offers.get()
+            assert offer.cred_ex_id == f"cred-ex-{item['connection_id']}"
+            assert credential_request.connection_invitations.get().connection_id == (
+                item["connection_id"]
+            )
+
+    def test_returns_207_with_per_item_errors(self, mocker, api_client_admin):
+        self.body[0]["cred_def_id"] = "unknown:definition"
+        self.body[1]["credential_data"] = {"schema_key_1": "1"}
+        self.invitations[2].accepted = False
+        self.invitations[2].save()
+
+        response = api_client_admin.post(self.url, data=self.body, format="json")
+
+        assert response.status_code == status.HTTP_207_MULTI_STATUS
+        errors = [result["errors"] for result in response.json()]
+        assert errors == [
+            ["Credential definition 'unknown:definition' does not exist"],
+            ["Attribute(s) not found in the data provided: {'schema_key_2'}"],
+            ["Connection id 'bulk-2' is not accepted"],
+        ]
+        assert CredentialRequest.objects.count() == 0
+        self.send_offer.assert_not_called()
+
+    def test_failed_offer_is_reported_without_rolling_back_the_others(
+        self, mocker, api_client_admin
+    ):
+        mock_response = mocker.Mock()
+        mock_response.text = "403: Connection not ready"
+
+        def send_credential_offer(offer, connection_id):
+            if connection_id == "bulk-1":
+                raise HTTPError(response=mock_response)
+            return {"credential_exchange_id": f"cred-ex-{connection_id}"}
+
+        self.send_offer.side_effect = send_credential_offer
+
+        response = api_client_admin.post(self.url, data=self.body, format="json")
+
+        assert response.status_code == status.HTTP_207_MULTI_STATUS
+        results = response.json()
+        assert [result["status"] for result in results] == ["offered", "error", "offered"]
+        assert results[1]["errors"] == ["403: Connection not ready"]
+        assert "cred_request_id" not in results[1]
+        assert CredentialOffer.objects.count() == 2
+        # as if the offer had been sent in the transaction creating the request
+        assert CredentialRequest.objects.count() == 2
+        assert ConnectionInvitation.objects.get(connection_id="bulk-1").credential_request is None
+        assert not OutboxMessage.objects.exists()
+
+    def test_offer_not_sent_is_left_to_the_outbox(self, api_client_admin):
+        def send_credential_offer(offer, connection_id):
+            if connection_id == "bulk-1":
+                raise ConnectionError("refused")
+            return {"credential_exchange_id": f"cred-ex-{connection_id}"}
+
+        self.send_offer.side_effect = send_credential_offer
+
+        response = api_client_admin.post(self.url, data=self.body, format="json")
+
+        assert response.status_code == status.HTTP_207_MULTI_STATUS
+        results = response.json()
+        assert [result["status"] for result in results] == ["offered", "pending", "offered"]
+        message = OutboxMessage.objects.get()
+        invitation = ConnectionInvitation.objects.get(connection_id="bulk-1")
+        assert invitation.credential_request_id == results[1]["cred_request_id"]
+        assert message.action == "send_credential_offer"
+        assert message.payload == {
+            "connection_invitation": invitation.id,
+            "discard_request": True,
+            "invitation_created": False,
+        }
+        assert (message.status, message.attempts, message.last_error) == (
+            OutboxMessage.Status.PENDING,
+            1,
+            "refused",
+        )
+
+    def test_reuses_connection_given_twice(self, api_client_admin):
+        self.body[1]["connection_id"] = self.body[0]["connection_id"]
+
+        response = api_client_admin.post(self.url, data=self.body, format="json")
+
+        assert response.status_code == status.HTTP_201_CREATED
+        invitations = ConnectionInvitation.objects.filter(connection_id="bulk-0")
+        assert invitations.count() == 2
+        assert {invitation.credential_request_id for invitation in invitations} == {
+            result["cred_request_id"] for result in response.json()[:2]
+        }
+
+    @override_settings(CREDENTIAL_BULK_MAX_ITEMS=2)
+    def test_returns_400_when_too_many_items(self, api_client_admin):
+        response = api_client_admin.post(self.url, data=self.body, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert CredentialRequest.objects.count() == 0
+
+    def test_returns_400_when_an_item_is_malformed(self, api_client_admin):
+        del self.body[1]["cred_def_id"]
+
+        response = api_client_admin.post(self.url, data=self.body, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()[1] == {"cred_def_id": ["This field is required."]}
+
+
+@pytest.mark.django_db
+class TestProofDefinitionViewSet:
+    url = "/proof-definition/"
+
+    def test_return_401_when_unauthorized_client(self, api_client):
+        assert api_client.get(self.url).status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_create(self, api_client_admin, admin_user):
+        body = {
+            "name": "age check",
+            "proof_request": {"requested_predicates": {"age": {"name": "age", "p_type": ">="}}},
+        }
+
+        response = api_client_admin.post(self.url, data=body, format="json")
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert ProofDefinition.objects.get(name="age check").creator == admin_user
+
+    def test_create_requires_something_requested(self, api_client_admin):
+        body = {"name": "empty", "proof_request": {"requested_attributes": {}}}
+
+        response = api_client_admin.post(self.url, data=body, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "proof_request" in response.json()
+
+    def test_delete_is_soft(self, api_client_admin, proof_definition):
+        response = api_client_admin.delete(f"{self.url}{proof_definition.id}/")
+
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        proof_definition.refresh_from_db()
+        assert not proof_definition.enabled
+
+
+@pytest.mark.django_db
+class TestProofRequestView:
+    url = "/proof-request"
+
+    @pytest.fixture(autouse=True)
+    def aca_py(self, mocker, proof_exchange):
+        mocker.patch.object(ACAClient, "get_public_did", return_value={"verkey": "verkey"})
+        return mocker.patch.object(ACAClient, "create_proof_request", return_value=proof_exchange)
+
+    def test_return_401_when_unauthorized_client(self, api_client):
+        response = api_client.post(self.url, data={"proof_definition": 1}, format="json")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_create(self, api_client_admin, proof_definition):
+        response = api_client_admin.post(
+            self.url, data={"proof_definition": proof_definition.id}, format="json"
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        proof_request = ProofRequest.objects.get()
+        assert response.json() == {
+            "code": proof_request.code,
+            "proof_definition": proof_definition.id,
+            "status": "requested",
+            "revealed_attributes": {},
+            "verified_at": None,
+            "invitation_url": f"http://test.com/proof-request/{proof_request.code}/deep-link",
+            "qr_code_url": f"http://test.com/proof-request/{proof_request.code}/qr-code",
+            "created": response.json()["created"],
+        }
+
+    def test_returns_400_when_definition_disabled(self, api_client_admin, proof_definition):
+        proof_definition.enabled = False
+        proof_definition.save()
+
+        response = api_client_admin.post(
+            self.url, data={"proof_definition": proof_definition.id}, format="json"
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "proof_definition" in response.json()
+
+    def test_returns_502_when_aca_py_fails(self, api_client_admin, proof_definition, aca_py):
+        aca_py.side_effect = ConnectionError("unreachable")
+
+        response = api_client_admin.post(
+            self.url, data={"proof_definition": proof_definition.id}, format="json"
+        )
+
+        assert response.status_code == status.HTTP_502_BAD_GATEWAY
+        assert ProofRequest.objects.count() == 0
+
+    def test_retrieve(self, api_client_admin, proof_request):
+        response = api_client_admin.get(f"{self.url}/{proof_request.code}")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["status"] == "requested"
+
+    def test_deep_link_redirect(self, api_client, proof_request):
+        response = api_client.get(f"{self.url}/{proof_request.code}/deep-link")
+
+        assert response.status_code == status.HTTP_302_FOUND
+        assert response["Location"].startswith("didcomm://launch?d_m=")
+
+    def test_deep_link_scheme_registered_once(self, api_client, proof_request):
+        for _ in range(3):
+            api_client.get(f"{self.url}/{proof_request.code}/deep-link")
+
+        assert HttpResponseRedirect.allowed_schemes.count("didcomm") == 1
+
+    def test_deep_link_once_answered(self, api_client, proof_request):
+        proof_request.status = ProofRequest.Status.VERIFIED
+        proof_request.save()
+
+        response = api_client.get(f"{self.url}/{proof_request.code}/deep-link")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_qr_code(self, api_client, proof_request, mocker):
+        png = mocker.patch.object(QRCodeHandler, "png", return_value=b"png")
+
+        response = api_client.get(f"{self.url}/{proof_request.code}/qr-code")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "image/png"
+        assert response.content == b"png"
+        png.assert_called_once_with(proof_request.invitation_url)
+
+    def test_qr_code_not_found(self, api_client, db):
+        assert api_client.get(f"{self.url}/unknown/qr-code").status_code == 404
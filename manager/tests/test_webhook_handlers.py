@@ -0,0 +1,114 @@
+import pytest
+
+from manager import webhook_handlers
+from manager.models import CredentialRequest
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    webhook_handlers.MESSAGES.clear()
+    webhook_handlers.HANDLER_SECONDS.clear()
+
+
+@pytest.fixture
+def registry(mocker):
+    """An empty registry for the test, the handlers of the module are put back afterwards."""
+    return mocker.patch.dict(webhook_handlers.HANDLERS, clear=True)
+
+
+def test_handler_registers_each_state(registry):
+    @webhook_handlers.handler("topic", "one", "two")
+    def handle(messages):
+        pass
+
+    assert webhook_handlers.find_handler("topic", "one") is handle
+    assert webhook_handlers.find_handler("topic", "two") is handle
+    assert webhook_handlers.find_handler("topic", "three") is None
+    assert webhook_handlers.find_handler("other", "one") is None
+
+
+def test_handler_without_states_takes_the_other_states(registry):
+    @webhook_handlers.handler("topic")
+    def any_state(messages):
+        pass
+
+    @webhook_handlers.handler("topic", "one")
+    def one(messages):
+        pass
+
+    assert webhook_handlers.find_handler("topic", "one") is one
+    assert webhook_handlers.find_handler("topic", "two") is any_state
+    assert webhook_handlers.find_handler("topic", None) is any_state
+
+
+def test_handler_registered_twice(registry):
+    webhook_handlers.ignore("topic", "one")
+
+    with pytest.raises(ValueError):
+        webhook_handlers.handler("topic", "two", "one")(lambda messages: None)
+
+
+def test_dispatch_groups_messages_by_state(registry, mocker):
+    one, two = mocker.Mock(__name__="one"), mocker.Mock(__name__="two")
+    webhook_handlers.handler("topic", "one")(one)
+    webhook_handlers.handler("topic", "two")(two)
+    messages = [{"state": "one", "id": 1}, {"state": "two", "id": 2}, {"state": "one", "id": 3}]
+
+    webhook_handlers.dispatch("topic", messages)
+
+    one.assert_called_once_with([messages[0], messages[2]])
+    two.assert_called_once_with([messages[1]])
+    assert webhook_handlers.MESSAGES.value(handler="one", outcome="ok") == 2
+    assert webhook_handlers.MESSAGES.value(handler="two", outcome="ok") == 1
+    assert webhook_handlers.HANDLER_SECONDS.value(handler="one")[0] == 1
+
+
+def test_dispatch_counts_failures_and_unhandled_messages(registry, mocker):
+    logger = mocker.patch("manager.webhook_handlers.LOGGER")
+    failing = mocker.Mock(__name__="failing", side_effect=RuntimeError("boom"))
+    webhook_handlers.handler("topic", "one")(failing)
+
+    webhook_handlers.dispatch("topic", [{"state": "one"}, {"state": "two"}, {"state": "two"}])
+
+    assert webhook_handlers.MESSAGES.value(handler="failing", outcome="error") == 1
+    assert webhook_handlers.MESSAGES.value(handler="none", outcome="invalid") == 2
+    logger.error.assert_called_once_with(
+        "webhook: failing: topic: topic - state: one - error: boom"
+    )
+    logger.info.assert_called_once_with("webhook: topic: topic and state: two is invalid")
+
+
+@pytest.mark.parametrize(
+    "topic, state",
+    [
+        ("connections", "active"),
+        ("issuer_cred_rev", "issued"),
+        ("out_of_band", "await-response"),
+        ("revocation_registry", "posted"),
+    ],
+)
+def test_progress_reports_are_not_invalid(mocker, topic, state):
+    logger = mocker.patch("manager.webhook_handlers.LOGGER")
+
+    webhook_handlers.dispatch(topic, [{"state": state}])
+
+    logger.info.assert_not_called()
+    assert webhook_handlers.MESSAGES.value(handler="none", outcome="invalid") == 0
+
+
+@pytest.mark.django_db
+def test_credential_revoked(credential_offer, second_credential_offer, django_assert_num_queries):
+    messages = [
+        {"state": "revoked", "cred_ex_id": credential_offer.cred_ex_id, "cred_rev_id": "1"},
+        {"state": "revoked", "cred_ex_id": "unknown", "cred_rev_id": "2"},
+    ]
+
+    with django_assert_num_queries(1):
+        webhook_handlers.dispatch("issuer_cred_rev", messages)
+
+    revoked = CredentialRequest.objects.get(id=credential_offer.credential_request_id)
+    assert revoked.status == CredentialRequest.Status.REVOKED
+    assert revoked.revoked_credential
+    assert revoked.revoked_at is not None
+    other = CredentialRequest.objects.get(id=second_credential_offer.credential_request_id)
+    assert other.status != CredentialRequest.Status.REVOKED
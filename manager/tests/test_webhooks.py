@@ -1,21 +1,30 @@
+from datetime import datetime, timezone
 from unittest.mock import DEFAULT, call, patch
 
 import pytest
 from django.conf import settings
+from django.db import connection
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from freezegun import freeze_time
 
 import manager.views
+import manager.webhook_handlers
+from aca.client import ACAClient
+from manager import outbox
+from manager.models import ConnectionInvitation, CredentialRequest, OutboxMessage
 from manager.tests.api_view_test_classes import (
     TestView,
     returns_status_code_http_200_ok,
     returns_status_code_http_404_not_found,
 )
+from manager.tests.factories import ConnectionInvitationFactory
 
 
 @pytest.fixture
 def dependency_mocks():
     return patch.multiple(
-        manager.views,
+        manager.webhook_handlers,
         connection_invitation_accept=DEFAULT,
         credential_offer_create=DEFAULT,
         credential_offer_accept=DEFAULT,
@@ -41,11 +50,11 @@ class TestWebhooksAPIView(TestView):
         self.path = f"{self.path_base}/{self.test_topic}/"
         mocker.patch("time.sleep")
         mocker.patch(
-            "manager.views.connection_invitation_accept",
+            "manager.webhook_handlers.connection_invitation_accept",
             return_value="mock connection invitation",
         )
-        mocker.patch("manager.views.credential_offer_create")
-        mocker.patch("manager.views.credential_offer_accept")
+        mocker.patch("manager.webhook_handlers.credential_offer_create")
+        mocker.patch("manager.webhook_handlers.credential_offer_accept")
         return credential_request
 
     def test_get_without_authentication(self, setup, get_response):
@@ -98,10 +107,6 @@ class TestWebhooksConnectionsAPIView(TestWebhooksAPIView):
             )
             mocks["LOGGER"].assert_has_calls(
                 [
-                    call.info(
-                        "webhook: received: topic: 'connections' - state: 'response' - "
-                        "message: {'state': 'response', 'connection_id': '1'}"
-                    ),
                     call.info("webhook: processing: connection accepted - connection_id: 1"),
                 ],
             )
@@ -119,10 +124,6 @@ class TestWebhooksConnectionsAPIView(TestWebhooksAPIView):
             mocks["credential_offer_create"].assert_not_called()
             mocks["LOGGER"].assert_has_calls(
                 [
-                    call.info(
-                        "webhook: received: topic: 'connections' - state: 'response' - "
-                        "message: {'state': 'response', 'connection_id': '1'}"
-                    ),
                     call.info("webhook: processing: connection accepted - connection_id: 1"),
                     call.info("webhook: credential_offer not created yet for connection_id: 1"),
                 ],
@@ -161,10 +162,6 @@ class TestWebhooksConnectionsAPIView(TestWebhooksAPIView):
             mocks["credential_offer_create"].assert_not_called()
             mocks["LOGGER"].assert_has_calls(
                 [
-                    call.info(
-                        "webhook: received: topic: 'connections' - state: 'response' - "
-                        "message: {'state': 'response', 'connection_id': '7'}"
-                    ),
                     call.error("webhook: connection_invitation_accept: connection_id: 7 not found"),
                 ]
             )
@@ -186,11 +183,6 @@ class TestWebhooksConnectionsAPIView(TestWebhooksAPIView):
             mocks["credential_offer_create"].assert_not_called()
             mocks["LOGGER"].assert_has_calls(
                 [
-                    call.info(
-                        "webhook: received: topic: 'connections' - state: 'response' - "
-                        "message: {'state': 'response', "
-                        "'connection_id': 'random test connection id'}"
-                    ),
                     call.error(
                         "webhook: connection_invitation_accept: connection_id: "
                         "random test connection id not found"
@@ -211,10 +203,6 @@ class TestWebhooksConnectionsAPIView(TestWebhooksAPIView):
             mocks["credential_offer_create"].assert_not_called()
             mocks["LOGGER"].assert_has_calls(
                 [
-                    call.info(
-                        "webhook: received: topic: 'connections' - state: 'random test state' -"
-                        " message: {'state': 'random test state', 'connection_id': '1'}"
-                    ),
                     call.info(
                         "webhook: topic: connections and state: random test state is invalid"
                     ),
@@ -234,11 +222,6 @@ class TestWebhooksConnectionsAPIView(TestWebhooksAPIView):
             mocks["credential_offer_create"].assert_not_called()
             mocks["LOGGER"].assert_has_calls(
                 [
-                    call.info(
-                        "webhook: received: topic: 'connections' - state: 'None' - "
-                        "message: {'malformed': 'penguin', "
-                        "'connections': 'sarah, michael and jonny'}"
-                    ),
                     call.info("webhook: topic: connections and state: None is invalid"),
                 ]
             )
@@ -247,7 +230,9 @@ class TestWebhooksConnectionsAPIView(TestWebhooksAPIView):
         response = self.client.post(path=f"/{self.path}", data="invalid_json", format="json")
         returns_status_code_http_200_ok(response)
 
-        mocker.patch("manager.views.connection_invitation_accept", side_effect=Exception())
+        mocker.patch(
+            "manager.webhook_handlers.connection_invitation_accept", side_effect=Exception()
+        )
         response = self.client.post(path=f"/{self.path}", data=self.post_data, format="json")
         returns_status_code_http_200_ok(response)
 
@@ -316,15 +301,26 @@ class TestWebhooksIssueCredentialAPIView(TestWebhooksAPIView):
             mocks["credential_offer_accept"].assert_called_once_with("1")
             mocks["LOGGER"].assert_has_calls(
                 [
-                    call.info(
-                        "webhook: received: topic: 'issue_credential' - "
-                        "state: 'credential_issued' - "
-                        "message: {'state': 'credential_issued', 'connection_id': '1'}"
-                    ),
                     call.info("webhook: processing: credential accepted - connection_id: 1"),
                 ]
             )
 
+    def test_stores_revocation_and_credential_ids(self, setup, credential_offer):
+        message = {
+            **self.message,
+            "credential_exchange_id": credential_offer.cred_ex_id,
+            "revocation_id": "5",
+            "credential_id": "some-credential-id",
+        }
+
+        response = self.client.post(path=f"/{self.path}", data=message, format="json")
+
+        returns_status_code_http_200_ok(response)
+        credential_offer.refresh_from_db()
+        assert credential_offer.accepted
+        assert credential_offer.revocation_id == "5"
+        assert credential_offer.credential_id == "some-credential-id"
+
     @override_settings(ACA_PY_WEBHOOKS_API_KEY="someothertoken")
     def test_calls_credential_workflow_invalid_token(self, setup, dependency_mocks):
         with dependency_mocks as mocks:
@@ -357,10 +353,6 @@ class TestWebhooksIssueCredentialAPIView(TestWebhooksAPIView):
             mocks["credential_offer_create"].assert_not_called()
             mocks["LOGGER"].assert_has_calls(
                 [
-                    call.info(
-                        "webhook: received: topic: 'issue_credential' - state: 'credential_issued' "
-                        "- message: {'state': 'credential_issued', 'connection_id': '7'}"
-                    ),
                     call.error("webhook: credential_offer_accept: connection_id: 7 not found"),
                 ]
             )
@@ -382,11 +374,6 @@ class TestWebhooksIssueCredentialAPIView(TestWebhooksAPIView):
             mocks["credential_offer_create"].assert_not_called()
             mocks["LOGGER"].assert_has_calls(
                 [
-                    call.info(
-                        "webhook: received: topic: 'issue_credential' - state: 'None' "
-                        "- message: {'malformed': 'penguin', "
-                        "'connections': 'sarah, michael and jonny'}"
-                    ),
                     call.info("webhook: topic: issue_credential and state: None is invalid"),
                 ]
             )
@@ -395,7 +382,7 @@ class TestWebhooksIssueCredentialAPIView(TestWebhooksAPIView):
         response = self.client.post(path=f"/{self.path}", data="invalid_json", format="json")
         returns_status_code_http_200_ok(response)
 
-        mocker.patch("manager.views.credential_offer_accept", side_effect=Exception())
+        mocker.patch("manager.webhook_handlers.credential_offer_accept", side_effect=Exception())
         response = self.client.post(path=f"/{self.path}", data=self.post_data, format="json")
         returns_status_code_http_200_ok(response)
 
@@ -410,3 +397,273 @@ class TestWebhooksIssueCredentialAPIViewWithoutToken(TestWebhooksAPIViewWithoutT
     put_data = message
     delete_data = message
     post_data = message
+
+
+@pytest.mark.django_db
+def test_present_proof_verified(api_client, proof_request):
+    message = {
+        "state": "verified",
+        "verified": "true",
+        "presentation_exchange_id": proof_request.presentation_exchange_id,
+    }
+
+    response = api_client.post(
+        f"/webhooks/{settings.ACA_PY_WEBHOOKS_API_KEY}/topic/present_proof/",
+        data=message,
+        format="json",
+    )
+
+    returns_status_code_http_200_ok(response)
+    proof_request.refresh_from_db()
+    assert proof_request.status == proof_request.Status.VERIFIED
+
+
+@pytest.fixture
+def webhook_logger(mocker):
+    manager.views.WEBHOOKS_REJECTED.clear()
+    return mocker.patch("manager.views.LOGGER")
+
+
+@pytest.mark.django_db
+@override_settings(WEBHOOKS_LOG_SAMPLE_RATE=1)
+def test_sampled_webhook_logs_payload_digest(api_client, webhook_logger):
+    message = {"state": "active", "connection_id": "1", "their_label": "secret"}
+
+    api_client.post(
+        f"/webhooks/{settings.ACA_PY_WEBHOOKS_API_KEY}/topic/connections/",
+        data=message,
+        format="json",
+    )
+
+    received = webhook_logger.info.call_args_list[0].args[0]
+    assert received.startswith("webhook: received: topic: 'connections' - state: 'active' - ")
+    assert "sha256: " in received
+    assert "secret" not in received
+
+
+@pytest.mark.django_db
+@override_settings(WEBHOOKS_LOG_SAMPLE_RATE=1)
+def test_unauthorized_webhook_is_not_read(api_client, webhook_logger, mocker):
+    dispatch = mocker.patch("manager.webhook_handlers.dispatch")
+
+    response = api_client.post(
+        "/webhooks/wrong-key/topic/connections/",
+        data={"state": "response", "connection_id": "secret"},
+        format="json",
+    )
+
+    returns_status_code_http_200_ok(response)
+    dispatch.assert_not_called()
+    assert manager.views.WEBHOOKS_REJECTED.value(reason="api_key") == 1
+    webhook_logger.warning.assert_called_once_with(
+        "webhook: connections : unauthorized request - invalid api key supplied"
+    )
+    webhook_logger.info.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_bad_request_logs_payload_digest(api_client, webhook_logger):
+    response = api_client.post(
+        f"/webhooks/{settings.ACA_PY_WEBHOOKS_API_KEY}/topic/connections/",
+        data="not json, secret",
+        content_type="application/json",
+    )
+
+    returns_status_code_http_200_ok(response)
+    assert manager.views.WEBHOOKS_REJECTED.value(reason="bad_request") == 1
+    logged = webhook_logger.info.call_args.args[0]
+    assert logged.startswith("webhook: connections : bad request: 16 bytes - sha256: ")
+    assert "secret" not in logged
+
+
+@pytest.mark.django_db
+class TestWebhooksBatch:
+    path = f"/webhooks/{settings.ACA_PY_WEBHOOKS_API_KEY}/batch/"
+
+    @pytest.fixture
+    def invitations(self, credential_request, second_credential_request):
+        return [
+            ConnectionInvitationFactory(
+                connection_id="1", accepted=False, credential_request=credential_request
+            ),
+            ConnectionInvitationFactory(
+                connection_id="2", accepted=False, credential_request=second_credential_request
+            ),
+        ]
+
+    def post(self, api_client, events, path=None):
+        return api_client.post(path or self.path, data=events, format="json")
+
+    def test_accepts_connections_in_bulk(self, api_client, invitations, mocker):
+        credential_offer_create = mocker.patch("manager.webhook_handlers.credential_offer_create")
+        events = [
+            {"topic": "connections", "payload": {"state": "response", "connection_id": "1"}},
+            {"topic": "connections", "payload": {"state": "response", "connection_id": "2"}},
+            {"topic": "connections", "payload": {"state": "active", "connection_id": "1"}},
+        ]
+
+        response = self.post(api_client, events)
+
+        assert response.status_code == 200
+        assert response.json() == {"events": 3}
+        for invitation in invitations:
+            invitation.refresh_from_db()
+            assert invitation.accepted
+            assert invitation.credential_request.status == CredentialRequest.Status.CONNECTED
+        credential_offer_create.assert_not_called()
+        assert not OutboxMessage.objects.exists()
+
+    def test_queries_do_not_grow_with_the_batch(
+        self, api_client, admin_user, credential_definition
+    ):
+        def accept(connection_ids):
+            for connection_id in connection_ids:
+                ConnectionInvitationFactory(
+                    connection_id=connection_id,
+                    accepted=False,
+                    credential_request=CredentialRequest.objects.create(
+                        credential_definition=credential_definition,
+                        creator=admin_user,
+                        email=f"{connection_id}@emails.com",
+                    ),
+                )
+            events = [
+                {"topic": "connections", "payload": {"state": "response", "connection_id": id}}
+                for id in connection_ids
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                self.post(api_client, events)
+            return len(queries)
+
+        assert accept(["a", "b"]) == accept([f"c{index}" for index in range(20)])
+
+    def test_queues_the_offers(self, api_client, invitations, credential_offer, mocker):
+        send_offer = mocker.patch.object(
+            ACAClient, "send_credential_offer", return_value={"credential_exchange_id": "ex-new"}
+        )
+        events = [{"topic": "connections", "payload": {"state": "response", "connection_id": "1"}}]
+
+        with freeze_time("2022-01-01 12:00:00"):
+            self.post(api_client, events)
+
+        message = OutboxMessage.objects.get()
+        assert message.action == "send_credential_offer"
+        assert message.payload == {
+            "connection_invitation": invitations[0].id,
+            "resend_after": credential_offer.id,
+        }
+        assert message.status == OutboxMessage.Status.PENDING
+        assert message.available_at == datetime(2022, 1, 1, 12, 0, 5, tzinfo=timezone.utc)
+
+        assert outbox.dispatch_pending() == 1
+        # sent once per message, whatever the dispatches
+        OutboxMessage.objects.update(status=OutboxMessage.Status.PENDING)
+        assert outbox.dispatch_pending() == 1
+
+        send_offer.assert_called_once()
+        assert OutboxMessage.objects.get().status == OutboxMessage.Status.DONE
+        offers = credential_offer.credential_request.credential_offers.order_by("id")
+        assert [offer.cred_ex_id for offer in offers] == [credential_offer.cred_ex_id, "ex-new"]
+
+    def test_accepts_credentials_in_bulk(
+        self, api_client, credential_offer, second_credential_offer
+    ):
+        events = [
+            {
+                "topic": "issue_credential",
+                "payload": {
+                    "state": "credential_issued",
+                    "connection_id": offer.connection_id,
+                    "credential_exchange_id": offer.cred_ex_id,
+                    "revocation_id": "7",
+                },
+            }
+            for offer in (credential_offer, second_credential_offer)
+        ]
+
+        self.post(api_client, events)
+
+        for offer in (credential_offer, second_credential_offer):
+            offer.refresh_from_db()
+            assert offer.accepted
+            assert offer.revocation_id == "7"
+            assert offer.credential_request.status == CredentialRequest.Status.ISSUED
+
+    def test_accepts_only_the_issued_credential_of_a_shared_connection(
+        self, api_client, credential_offer, second_credential_offer
+    ):
+        second_credential_offer.connection_id = credential_offer.connection_id
+        second_credential_offer.save()
+        events = [
+            {
+                "topic": "issue_credential",
+                "payload": {
+                    "state": "credential_issued",
+                    "connection_id": credential_offer.connection_id,
+                    "credential_exchange_id": credential_offer.cred_ex_id,
+                },
+            }
+        ]
+
+        self.post(api_client, events)
+
+        credential_offer.refresh_from_db()
+        second_credential_offer.refresh_from_db()
+        assert credential_offer.accepted
+        assert credential_offer.credential_request.status == CredentialRequest.Status.ISSUED
+        assert not second_credential_offer.accepted
+        assert second_credential_offer.credential_request.status != CredentialRequest.Status.ISSUED
+
+    def test_failing_handler_does_not_stop_the_batch(
+        self, api_client, invitations, credential_offer, mocker
+    ):
+        mocker.patch(
+            "manager.webhook_handlers.bulk_accept",
+            side_effect=[RuntimeError("boom"), 1],
+        )
+        events = [
+            {"topic": "connections", "payload": {"state": "response", "connection_id": "2"}},
+            {
+                "topic": "present_proof",
+                "payload": {"state": "verified", "presentation_exchange_id": "unknown"},
+            },
+        ]
+
+        messages = manager.webhook_handlers.MESSAGES
+        messages.clear()
+
+        response = self.post(api_client, events)
+
+        assert response.status_code == 200
+        assert messages.value(handler="connections_accepted", outcome="error") == 1
+        assert messages.value(handler="presentation_verified", outcome="ok") == 1
+
+    @pytest.mark.parametrize(
+        "events",
+        [
+            {"topic": "connections", "payload": {}},
+            [{"topic": "connections"}],
+            [{"topic": "connections", "payload": "response"}],
+        ],
+    )
+    def test_malformed_batch(self, api_client, invitations, events):
+        response = self.post(api_client, events)
+
+        assert response.status_code == 400
+        assert not ConnectionInvitation.objects.filter(accepted=True).exists()
+
+    @override_settings(WEBHOOKS_BATCH_MAX_EVENTS=1)
+    def test_batch_too_large(self, api_client):
+        events = [{"topic": "out_of_band", "payload": {"state": "done"}}] * 2
+
+        response = self.post(api_client, events)
+
+        assert response.status_code == 400
+
+    def test_invalid_api_key(self, api_client, invitations):
+        events = [{"topic": "connections", "payload": {"state": "response", "connection_id": "1"}}]
+
+        response = self.post(api_client, events, path="/webhooks/wrong-key/batch/")
+
+        assert response.status_code == 200
+        assert not ConnectionInvitation.objects.filter(accepted=True).exists()
@@ -0,0 +1,138 @@
+"""
+Admission control for the public endpoints (deep links, QR codes and ACA-Py webhooks).
+
+Each endpoint scope has token buckets in the shared cache, configured in
+``settings.ADMISSION_CONTROL``:
+
+    "deep_link": {"ip": "60/min", "code": "10/min", "global": "6000/min"}
+
+A request takes a token from the bucket of each of its identities (client IP, invitation
+code) and then from the bucket of the whole scope. An empty identity bucket rejects it with a
+429, an empty scope bucket sheds it with a 503, as does ``ADMISSION_SHED_LOAD``. Both answers
+carry ``Retry-After``.
+
+Buckets are read and written without a lock: concurrent workers may both take the last
+token, so a burst can overshoot a budget by the number of workers at most.
+"""
+import math
+import time
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+from id_manager import metrics
+from manager import cache
+from manager.exceptions import ServiceOverloaded
+
+THROTTLE_CACHE = "throttle"
+
+ADMITTED = metrics.counter(
+    "admission_admitted_total", "Requests admitted by admission control", ("scope",)
+)
+REJECTED = metrics.counter(
+    "admission_rejected_total",
+    "Requests rejected (429) or shed (503) by admission control",
+    ("scope", "reason"),
+)
+
+PERIODS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+
+def parse_rate(rate: Optional[str]) -> Optional[tuple]:
+    """
+    ``"<tokens>/<period>"`` as DRF's rates (period: s, m, h or d, only the first letter
+    counts): (tokens per second, bucket capacity). None for no limit (``None`` or "none").
+    """
+    if rate is None or rate.lower() == "none":
+        return None
+    tokens, period = rate.split("/")
+    tokens = int(tokens)
+    return tokens / PERIODS[period[0]], tokens
+
+
+def take(scope: str, name: str, identity, rate: tuple) -> float:
+    """
+    Take a token from the ``name`` bucket of ``identity``, refilled at ``rate`` (see
+    ``parse_rate``): 0 when there was one, otherwise the seconds until there is.
+    """
+    per_second, capacity = rate
+    key = f"{scope}:{name}:{identity}"
+    now = time.time()
+    tokens, updated = cache.get(THROTTLE_CACHE, key) or (capacity, now)
+    tokens = min(capacity, tokens + (now - updated) * per_second)
+    if tokens < 1:
+        return (1 - tokens) / per_second
+    # once the bucket would be full again its state is not needed any more
+    cache.set(THROTTLE_CACHE, key, (tokens - 1, now), timeout=math.ceil(capacity / per_second))
+    return 0
+
+
+class Decision(NamedTuple):
+    status: int
+    retry_after: float = 0
+    reason: str = ""
+
+    @property
+    def admitted(self) -> bool:
+        return self.status < 400
+
+
+def admit(scope: str, identities: dict) -> Decision:
+    """Whether a request of ``scope`` from ``identities`` ({name: value}) is admitted."""
+    budgets = settings.ADMISSION_CONTROL.get(scope, {})
+    decision = _decide(scope, budgets, identities)
+    if decision.admitted:
+        ADMITTED.inc(scope=scope)
+    else:
+        REJECTED.inc(scope=scope, reason=decision.reason)
+    return decision
+
+
+def _decide(scope: str, budgets: dict, identities: dict) -> Decision:
+    if settings.ADMISSION_SHED_LOAD:
+        return Decision(503, 60, "shed")
+    for name, identity in identities.items():
+        rate = parse_rate(budgets.get(name))
+        if identity is None or rate is None:
+            continue
+        retry_after = take(scope, name, identity, rate)
+        if retry_after:
+            return Decision(429, retry_after, name)
+    rate = parse_rate(budgets.get("global"))
+    if rate is not None:
+        retry_after = take(scope, "global", "", rate)
+        if retry_after:
+            return Decision(503, retry_after, "global")
+    return Decision(200)
+
+
+def client_ip(request) -> str:
+    """The client address, from ``X-Forwarded-For`` behind ``NUM_PROXIES`` proxies (DRF)."""
+    return BaseThrottle().get_ident(request)
+
+
+class AdmissionThrottle(BaseThrottle):
+    """DRF throttle admitting the requests of a view through ``admit``."""
+
+    scope = None
+
+    def get_identities(self, request, view) -> dict:
+        return {"ip": self.get_ident(request)}
+
+    def allow_request(self, request, view) -> bool:
+        decision = admit(self.scope, self.get_identities(request, view))
+        self.retry_after = decision.retry_after
+        if decision.status == 503:
+            raise ServiceOverloaded(wait=math.ceil(decision.retry_after))
+        return decision.admitted
+
+    def wait(self) -> float:
+        return self.retry_after
+
+
+class DeepLinkThrottle(AdmissionThrottle):
+    scope = "deep_link"
+
+    def get_identities(self, request, view) -> dict:
+        return {"ip": self.get_ident(request), "code": view.kwargs.get("code")}
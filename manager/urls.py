@@ -13,7 +13,7 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.urls import include, path
+from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 
 from manager import views
@@ -21,6 +21,7 @@ from manager import views
 router = DefaultRouter()
 router.register(r"schema", views.SchemaViewSet)
 router.register(r"credential-definition", views.CredentialDefinitionViewSet)
+router.register(r"proof-definition", views.ProofDefinitionViewSet)
 
 urlpatterns = [
     path(
@@ -33,7 +34,13 @@ urlpatterns = [
         views.CredentialRequestRetrieveDestroyAPIView.as_view(),
         name="CredentialRequestRetrieve",
     ),
+    re_path(
+        r"^qr-codes/(?P<name>[0-9a-f]{64}\.(?:png|svg))$",
+        views.qr_code_image,
+        name="qr_code_image",
+    ),
     path("webhooks/<str:api_key>/topic/<str:topic>/", views.webhooks, name="webhooks"),
+    path("webhooks/<str:api_key>/batch/", views.webhooks_batch, name="webhooks-batch"),
     path(
         "deep-link-redirect/<str:code>", views.DeepLinkRedirect.as_view(), name="deep_link_redirect"
     ),
@@ -50,5 +57,21 @@ urlpatterns = [
         views.CredentialView.as_view(),
         name="credential",
     ),
+    path("proof-request", views.ProofRequestCreateAPIView.as_view(), name="proof_request"),
+    path(
+        "proof-request/<str:code>",
+        views.ProofRequestRetrieveAPIView.as_view(),
+        name="proof_request_detail",
+    ),
+    path(
+        "proof-request/<str:code>/deep-link",
+        views.ProofRequestDeepLinkRedirect.as_view(),
+        name="proof_request_deep_link",
+    ),
+    path(
+        "proof-request/<str:code>/qr-code",
+        views.ProofRequestQRCode.as_view(),
+        name="proof_request_qr_code",
+    ),
     path("", include(router.urls)),
 ]
@@ -1,13 +1,12 @@
-import hashlib
-import os
 from typing import Optional
 
-import qrcode
 import structlog as logging
 from django.conf import settings
 from django.templatetags.static import static
 from post_office import mail
 
+from manager import cache, qr_codes, qr_storage
+
 LOGGER = logging.getLogger(__name__)
 
 
@@ -26,10 +25,20 @@ def generate_asset_url(filename: str) -> str:
     return f"{settings.STATIC_SERVER_URL}{static(filename)}"
 
 
+class AssetURL:
+    """Class attribute resolving the URL of an asset when read, not when the module is imported."""
+
+    def __init__(self, filename: str):
+        self.filename = filename
+
+    def __get__(self, instance, owner) -> str:
+        return generate_asset_url(self.filename)
+
+
 class Assets:
-    UN_LOGO = generate_asset_url("un_logo.png")
-    IOS_APP_STORE_LOGO = generate_asset_url("app_store_logo.png")
-    GOOGLE_PLAY_LOGO = generate_asset_url("google_play_logo.png")
+    UN_LOGO = AssetURL("un_logo.png")
+    IOS_APP_STORE_LOGO = AssetURL("app_store_logo.png")
+    GOOGLE_PLAY_LOGO = AssetURL("google_play_logo.png")
 
 
 class EmailHelper:
@@ -72,33 +81,37 @@ class EmailHelper:
 
 
 def get_credential_crafter_class(credential_definition_id: str):
-    try:
-        custom_crafter_name = settings.CREDENTIAL_CRAFTERS[credential_definition_id]
-        path_components = custom_crafter_name.split(".")
-        class_name = path_components[-1]
-        crafter_class = getattr(
-            __import__(".".join(path_components[:-1]), fromlist=[class_name]),
-            class_name,
-        )
-    except Exception:
-        from credential_crafters.base import CredentialCrafter as crafter_class
+    from credential_crafters.registry import registry
+
+    return registry.get(credential_definition_id)
 
-    return crafter_class
+
+QR_CODE_CACHE = "qr_code"
 
 
 class QRCodeHandler:
     @classmethod
-    def text_to_qr(cls, data: str, size: Optional[int] = 1) -> str:
-        qr = qrcode.QRCode(version=size)
-        qr.add_data(data)
-        img = qr.make_image()
-        full_image_path = cls.__full_image_path(data)
-        img.save(full_image_path)
-        short_path = "/".join(full_image_path.split("/")[-2:])
-        return short_path
+    def text_to_qr(cls, data: str) -> str:
+        """
+        URL of the QR image of ``data``, stored once for all the nodes in the QR code storage
+        (see ``manager.qr_storage``).
+        """
+        return qr_storage.url(qr_storage.store(data))
+
+    @classmethod
+    def png(cls, data: str, size: Optional[int] = 1) -> bytes:
+        """The QR image of ``data``, rendered once for all the nodes sharing the cache."""
+        return cache.get_or_set(
+            QR_CODE_CACHE,
+            f"{size}:{cls.file_name(data)}",
+            lambda: cls.render(data, size),
+            timeout=settings.CACHE_TIMEOUTS["qr_code"],
+        )
+
+    @classmethod
+    def render(cls, data: str, size: Optional[int] = 1) -> bytes:
+        return qr_codes.render(data, min_version=size)
 
     @classmethod
-    def __full_image_path(cls, file_name: str) -> str:
-        suffix = ".png"
-        hashed_file_name = hashlib.md5(file_name.encode()).hexdigest()
-        return f"{os.path.join(settings.ROOT_DIR, 'assets', 'qr_codes', hashed_file_name + suffix)}"
+    def file_name(cls, data: str, image_format: str = qr_codes.PNG) -> str:
+        return qr_storage.name(data, image_format)
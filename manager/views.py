@@ -1,52 +1,79 @@
+import hashlib
+import hmac
 import json
-import time
+import math
+import random
+from typing import Optional
 
 import structlog as logging
 from django.conf import settings
 from django.db import transaction
-from django.http import Http404, HttpRequest, HttpResponse, HttpResponseRedirect
+from django.http import Http404, HttpRequest, HttpResponse, HttpResponseRedirect, JsonResponse
 from django.shortcuts import redirect
 from django.urls import reverse
 from django.views.decorators.csrf import csrf_exempt
 from django_filters.rest_framework import DjangoFilterBackend
-from requests import HTTPError
+from requests import RequestException
 from rest_framework import permissions, status, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
 from rest_framework.generics import (
     CreateAPIView,
     ListAPIView,
     ListCreateAPIView,
+    RetrieveAPIView,
     RetrieveDestroyAPIView,
 )
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from aca.client import ACAClientFactory
+from aca.resilience import ACAPyUnavailable
+from id_manager import metrics
+from manager import cache, outbox, qr_codes, qr_storage, webhook_handlers
 from manager.credential_workflow import (
-    connection_invitation_accept,
-    credential_offer_accept,
-    credential_offer_create,
+    DEEP_LINK_CACHE,
+    connection_agent,
+    credential_offers_bulk_create,
+    credential_request_revoke,
 )
-from manager.exceptions import ConnectionNotReady
+from manager.exceptions import ConnectionNotReady, OutboxActionFailed, ProofRequestFailed
+from manager.filters import CredentialDataFilter, CredentialRequestSearchFilter
 from manager.handlers import ACAPy, CredentialOfferHandler
 from manager.models import (
     ConnectionInvitation,
     CredentialDefinition,
     CredentialOffer,
     CredentialRequest,
+    OutboxMessage,
+    ProofDefinition,
+    ProofRequest,
     Schema,
 )
+from manager.proof_workflow import deep_link, proof_request_create
 from manager.serializers import (
     ConnectionInvitationSerializer,
     CredentialDefinitionSerializer,
+    CredentialItemSerializer,
     CredentialOfferSerializer,
     CredentialRequestSerializer,
     CredentialSerializer,
+    ProofDefinitionSerializer,
+    ProofRequestSerializer,
     SchemaSerializer,
 )
+from manager.throttling import DeepLinkThrottle, admit, client_ip
 from manager.utils import EmailHelper, QRCodeHandler
 
 LOGGER = logging.getLogger(__name__)
 
+# Deep links redirect to the wallet app: registered once, the list belongs to the class
+if "didcomm" not in HttpResponseRedirect.allowed_schemes:
+    HttpResponseRedirect.allowed_schemes.append("didcomm")
+
+# a year, what HTTP caches take as forever
+QR_CODE_MAX_AGE = 365 * 24 * 60 * 60
+
 
 class SchemaViewSet(viewsets.ModelViewSet):
     serializer_class = SchemaSerializer
@@ -61,15 +88,32 @@ class SchemaViewSet(viewsets.ModelViewSet):
         instance.enabled = False
         instance.save()
 
-    @transaction.atomic
     def update(self, request, *args, **kwargs):
+        """
+        Replace the schema by a new one. The new row, disabled, and the outbox message
+        registering it on the ledger are committed first. Once the ledger accepted it, the new
+        schema is enabled and the replaced one disabled; if it refused, the new row is removed.
+        """
         instance = self.get_object()
-        instance.enabled = False
-        instance.save()
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.create(serializer.validated_data)
-        return Response(serializer.data)
+        with transaction.atomic():
+            schema = Schema.objects.create(
+                creator=request.user, **{**serializer.validated_data, "enabled": False}
+            )
+            message = outbox.enqueue(
+                "create_schema",
+                {"schema": schema.id, "replaces": instance.id},
+                dispatch_on_commit=False,
+            )
+
+        message = outbox.dispatch(message.id) or message
+        if message.status == OutboxMessage.Status.FAILED:
+            raise OutboxActionFailed(message.last_error)
+        schema.refresh_from_db()
+        if message.status != OutboxMessage.Status.DONE:
+            return Response(self.get_serializer(schema).data, status=status.HTTP_202_ACCEPTED)
+        return Response(self.get_serializer(schema).data)
 
 
 class CredentialDefinitionViewSet(viewsets.ModelViewSet):
@@ -98,10 +142,13 @@ class CredentialRequestRetrieveDestroyAPIView(RetrieveDestroyAPIView):
         cred_offer = instance.credential_offers.first()
 
         try:
-            ACAPy().send_revoke_credential({"cred_ex_id": cred_offer.cred_ex_id, "publish": True})
+            ACAPy(agent=connection_agent(cred_offer.connection_id)).send_revoke_credential(
+                {"cred_ex_id": cred_offer.cred_ex_id, "publish": True}
+            )
 
-            instance.revoked_credential = True
-            instance.save()
+            credential_request_revoke(instance)
+        except ACAPyUnavailable:
+            raise
         except Exception:
             msg = f"Error sending revocation credential for credential request {instance.id}"
             LOGGER.error(msg)
@@ -112,6 +159,13 @@ class CredentialRequestListCreateAPIView(ListCreateAPIView):
     serializer_class = CredentialRequestSerializer
     permission_classes = (permissions.IsAuthenticated,)
     queryset = CredentialRequest.objects.all()
+    filter_backends = (
+        DjangoFilterBackend,
+        OrderingFilter,
+        CredentialRequestSearchFilter,
+        CredentialDataFilter,
+    )
+    filterset_fields = ("status",)
 
     def get_serializer(self, *args, **kwargs):
         if isinstance(kwargs.get("data", {}), list):
@@ -133,17 +187,19 @@ class CredentialRequestListCreateAPIView(ListCreateAPIView):
             msg = f"There is not credential request with code:{code}"
             LOGGER.error(msg)
             raise Http404(msg)
+        except ACAPyUnavailable:
+            raise
         except Exception:
             LOGGER.error("Unexpected error", exc_info=True)
             raise Http404()
 
-        qr_code_img = QRCodeHandler.text_to_qr(credential_offer_url)
+        qr_code_url = QRCodeHandler.text_to_qr(credential_offer_url)
         EmailHelper.send(
             instance.email,
             template="invitation",
             context={
                 "credential_name": instance.credential_definition.name,
-                "qr_code_img": qr_code_img,
+                "qr_code_url": qr_code_url,
                 "deep_link_redirect": request.build_absolute_uri(
                     reverse("deep_link_redirect", args=[code])
                 ),
@@ -169,37 +225,25 @@ class CredentialOfferListAPIView(ListAPIView):
     filter_backends = (DjangoFilterBackend,)
     filterset_fields = ["credential_request"]
 
-    """ 
-    Calls /issue-credential/records/{cred_ex_id} endpoint of Aca-Py, 
-    to retrieve revocation_id and credential_id values 
     """
-
-    def get(self, request, *args, **kwargs):
-        cred_req_id = request.query_params.get("credential_request")
-
-        if cred_req_id is None:
-            return super().get(request)
-
-        cred_offer = CredentialOffer.objects.filter(credential_request__id=cred_req_id).first()
-        aca_client = ACAClientFactory.create_client()
-        response = aca_client.retrieve_issue_credential_by_cred_ex_id(cred_offer.cred_ex_id)
-
-        CredentialOffer.objects.filter(id=cred_offer.id).update(
-            revocation_id=response.get("revocation_id"),
-            credential_id=response.get("credential_id"),
-        )
-
-        return super().get(request)
+    revocation_id and credential_id are kept up to date by the issue_credential webhook
+    and the reconcile_credential_offers command
+    """
 
 
 class DeepLinkRedirect(APIView):
     permission_classes = []
     authentication_classes = []
+    throttle_classes = (DeepLinkThrottle,)
 
     def get(self, request, code):
-        _, invitation_b64, _ = CredentialOfferHandler.get_credential_offer(code)
+        invitation_b64 = cache.get_or_set(
+            DEEP_LINK_CACHE,
+            code,
+            lambda: CredentialOfferHandler.get_credential_offer(code)[1],
+            timeout=settings.CACHE_TIMEOUTS["deep_link"],
+        )
         deep_link = f"didcomm://launch?c_i={invitation_b64}"
-        HttpResponseRedirect.allowed_schemes.append("didcomm")  # Allow redirection to this protocol
         return redirect(deep_link)
 
 
@@ -221,6 +265,8 @@ class ConnectionInvitationView(CreateAPIView):
                 invitation_json=invitation_json,
                 accepted=True,
             )
+        except ACAPyUnavailable:
+            raise
         except Exception as error:
             msg = f"Error establishing connection, error: {error}"
             LOGGER.error(msg)
@@ -233,44 +279,97 @@ class CredentialView(CreateAPIView):
     permission_classes = (permissions.IsAuthenticated,)
     serializer_class = CredentialSerializer
 
-    @transaction.atomic
     def post(self, request, *args, **kwargs):
-        serializer = self.get_serializer(data=request.data)
+        if isinstance(request.data, list):
+            return self._post_many(request.data)
+        return self._post_one(request.data)
+
+    def _post_many(self, data: list) -> Response:
+        max_items = getattr(settings, "CREDENTIAL_BULK_MAX_ITEMS", 1000)
+        if len(data) > max_items:
+            raise ValidationError(f"At most {max_items} credentials can be offered per request")
+        serializer = CredentialItemSerializer(data=data, many=True, allow_empty=False)
         serializer.is_valid(raise_exception=True)
 
-        cred_def_id = serializer.validated_data["cred_def_id"]
-        credential_data = serializer.validated_data["credential_data"]
-        cred_request = self._create_credential_request(cred_def_id, credential_data)
+        results = credential_offers_bulk_create(serializer.validated_data, self.request.user)
+
+        all_offered = all(
+            result["status"] == CredentialRequest.Status.OFFERED for result in results
+        )
+        return Response(
+            results, status=status.HTTP_201_CREATED if all_offered else status.HTTP_207_MULTI_STATUS
+        )
+
+    def _post_one(self, data: dict) -> Response:
+        serializer = self.get_serializer(data=data)
+        serializer.is_valid(raise_exception=True)
 
-        connection_id = serializer.validated_data["connection_id"]
-        connection_invitation = self._update_connection_invitation(connection_id, cred_request)
+        cred_request, message = self.enqueue_offer(serializer.validated_data, self.request.user)
+        message = outbox.dispatch(message.id) or message
+        return Response(*self.offer_outcome(message, serializer.validated_data, cred_request))
 
-        try:
-            aca_credential_offer = credential_offer_create(connection_id, connection_invitation)
-        except HTTPError as error:
-            raise ConnectionNotReady(error.response.text)
+    @classmethod
+    @transaction.atomic
+    def enqueue_offer(cls, validated_data: dict, creator) -> (CredentialRequest, OutboxMessage):
+        """The credential request and the outbox message sending its offer, committed together."""
+        cred_request = cls._create_credential_request(
+            validated_data["cred_def_id"], validated_data["credential_data"], creator
+        )
+        connection_invitation, created = cls._update_connection_invitation(
+            validated_data["connection_id"], cred_request
+        )
+        message = outbox.enqueue(
+            "send_credential_offer",
+            {
+                "connection_invitation": connection_invitation.id,
+                # undone if the offer cannot be sent, see outbox.discard_credential_request
+                "discard_request": True,
+                "invitation_created": created,
+            },
+            dispatch_on_commit=False,
+        )
+        return cred_request, message
+
+    @staticmethod
+    def offer_outcome(
+        message: OutboxMessage, validated_data: dict, cred_request: CredentialRequest
+    ) -> (dict, int):
+        """The answer once the offer was dispatched: its body and status code."""
+        if message.status == OutboxMessage.Status.FAILED:
+            raise ConnectionNotReady(message.last_error)
+        if message.status != OutboxMessage.Status.DONE:
+            # ACA-Py could not be reached, dispatch_outbox sends the offer later on
+            response = {
+                "connection_id": validated_data["connection_id"],
+                "cred_def_id": validated_data["cred_def_id"],
+                "cred_request_id": cred_request.id,
+            }
+            return response, status.HTTP_202_ACCEPTED
 
         response = {
-            "connection_id": aca_credential_offer.get("connection_id"),
-            "cred_def_id": aca_credential_offer.get("cred_def_id"),
+            "connection_id": message.result.get("connection_id"),
+            "cred_def_id": message.result.get("cred_def_id"),
             "cred_request_id": cred_request.id,
         }
-        return Response(response, status=status.HTTP_201_CREATED)
+        return response, status.HTTP_201_CREATED
 
+    @staticmethod
     def _create_credential_request(
-        self, cred_def_id: str, credential_data: dict
+        cred_def_id: str, credential_data: dict, creator
     ) -> CredentialRequest:
-        cred_definition = CredentialDefinition.objects.get(credential_id=cred_def_id)
+        cred_definition = CredentialDefinition.objects.get_enabled(credential_id=cred_def_id)
 
         return CredentialRequest.objects.create(
             credential_definition=cred_definition,
             credential_data=credential_data,
-            creator=self.request.user,
+            creator=creator,
         )
 
+    @staticmethod
     def _update_connection_invitation(
-        self, connection_id: str, cred_request: CredentialRequest
-    ) -> ConnectionInvitation:
+        connection_id: str, cred_request: CredentialRequest
+    ) -> (ConnectionInvitation, bool):
+        """The invitation given to ``cred_request``, and whether it was created for it."""
         connection_invitation = (
             ConnectionInvitation.objects.filter(connection_id=connection_id)
             .order_by("-created")[:1]
@@ -281,84 +380,214 @@ class CredentialView(CreateAPIView):
             connection_invitation.credential_request = cred_request
             connection_invitation.save()
 
-            return connection_invitation
+            return connection_invitation, False
         else:
             new_conection_invitation = ConnectionInvitation.objects.create(
                 connection_id=connection_invitation.connection_id,
                 invitation_json=connection_invitation.invitation_json,
                 accepted=True,
                 credential_request=cred_request,
+                agent=connection_invitation.agent,
             )
-            return new_conection_invitation
+            return new_conection_invitation, True
 
 
-@csrf_exempt
-def webhooks(request, api_key, topic):
-    if not api_key == getattr(settings, "ACA_PY_WEBHOOKS_API_KEY"):
-        LOGGER.info(
-            f"webhook: {topic} : unauthorized request: '{request.body}' - invalid api key supplied"
+class ProofDefinitionViewSet(viewsets.ModelViewSet):
+    serializer_class = ProofDefinitionSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    queryset = ProofDefinition.objects.all()
+
+    def perform_create(self, serializer):
+        serializer.save(creator=self.request.user)
+
+    def perform_destroy(self, instance):
+        instance.enabled = False
+        instance.save()
+
+
+class ProofRequestCreateAPIView(CreateAPIView):
+    """
+    Start a connectionless verification: the holder scans ``qr_code_url`` (or opens
+    ``invitation_url``) and the outcome is polled on ``/proof-request/<code>``.
+    """
+
+    permission_classes = (permissions.IsAuthenticated,)
+    serializer_class = ProofRequestSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        proof_definition_id = serializer.validated_data["proof_definition_id"]
+        try:
+            proof_request = proof_request_create(proof_definition_id, request.user)
+        except ProofDefinition.DoesNotExist as error:
+            raise ValidationError({"proof_definition": [str(error)]})
+        except ACAPyUnavailable:
+            raise
+        except RequestException as error:
+            LOGGER.error(f"proof_request_create: proof_definition: {proof_definition_id} - {error}")
+            raise ProofRequestFailed()
+
+        return Response(self.get_serializer(proof_request).data, status=status.HTTP_201_CREATED)
+
+
+class ProofRequestRetrieveAPIView(RetrieveAPIView):
+    serializer_class = ProofRequestSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    queryset = ProofRequest.objects.all()
+    lookup_field = "code"
+
+
+class ProofRequestDeepLinkRedirect(APIView):
+    permission_classes = []
+    authentication_classes = []
+    throttle_classes = (DeepLinkThrottle,)
+    swagger_schema = None
+
+    def get(self, request, code):
+        proof_request = (
+            ProofRequest.objects.filter(code=code, status=ProofRequest.Status.REQUESTED)
+            .only("presentation_json")
+            .first()
         )
+        if proof_request is None:
+            raise Http404(f"No pending proof request with code:{code}")
+        return redirect(deep_link(proof_request))
+
+
+class ProofRequestQRCode(APIView):
+    """The QR code of the proof request ``invitation_url``, a short link to its deep link."""
+
+    permission_classes = []
+    authentication_classes = []
+    throttle_classes = (DeepLinkThrottle,)
+    swagger_schema = None
+
+    def get(self, request, code):
+        proof_request = ProofRequest.objects.filter(code=code).only("code").first()
+        if proof_request is None:
+            raise Http404(f"No proof request with code:{code}")
+        png = QRCodeHandler.png(proof_request.invitation_url)
+        response = HttpResponse(png, content_type="image/png")
+        response["Cache-Control"] = f"public, max-age={settings.CACHE_TIMEOUTS['qr_code']}"
+        return response
+
+
+def qr_code_image(request, name):
+    """
+    A QR image of the QR code storage. Its name is the hash of its content, which thus never
+    changes: it can be cached for good.
+    """
+    image = qr_storage.read(name)
+    if image is None:
+        raise Http404()
+    response = HttpResponse(image, content_type=qr_codes.CONTENT_TYPES[name.rsplit(".", 1)[1]])
+    response["Cache-Control"] = f"public, max-age={QR_CODE_MAX_AGE}, immutable"
+    response["ETag"] = f'"{name.split(".")[0]}"'
+    return response
+
+
+WEBHOOKS_REJECTED = metrics.counter(
+    "webhooks_rejected_total", "Webhooks rejected before being handled", ("reason",)
+)
+
+
+def _sampled() -> bool:
+    return random.random() < settings.WEBHOOKS_LOG_SAMPLE_RATE
+
+
+def _digest(body: bytes) -> str:
+    """What is logged of a payload: its size and a hash to find it in the ACA-Py logs."""
+    return f"{len(body)} bytes - sha256: {hashlib.sha256(body).hexdigest()[:16]}"
+
+
+def _reject_webhook(request, api_key: str, topic: str) -> Optional[HttpResponse]:
+    """The answer to a webhook turned away before its body is read, None if it is not."""
+    expected_key = settings.ACA_PY_WEBHOOKS_API_KEY
+    if not expected_key or not hmac.compare_digest(api_key.encode(), expected_key.encode()):
+        # neither the cache, the body nor the key are read: this is what an attack costs, and
+        # the admission budgets are left to ACA-Py
+        WEBHOOKS_REJECTED.inc(reason="api_key")
+        if _sampled():
+            LOGGER.warning(f"webhook: {topic} : unauthorized request - invalid api key supplied")
         return HttpResponse()
 
+    decision = admit("webhooks", {"ip": client_ip(request)})
+    if not decision.admitted:
+        LOGGER.info(f"webhook: {topic} : not admitted: {decision.reason}")
+        response = HttpResponse(status=decision.status)
+        response["Retry-After"] = math.ceil(decision.retry_after)
+        return response
+    return None
+
+
+def _webhook_message(request, topic: str) -> Optional[dict]:
+    """The message of a webhook, None if its body is not one."""
     try:
         message = json.loads(request.body)
-
         state = message.get("state")
+    except Exception as e:
+        WEBHOOKS_REJECTED.inc(reason="bad_request")
+        LOGGER.info(f"webhook: {topic} : bad request: {_digest(request.body)} - {e}")
+        return None
 
-        LOGGER.info(f"webhook: received: topic: '{topic}' - state: '{state}' - message: {message}")
-
-        if topic == "connections" and state == "response":
-            connection_id = message.get("connection_id")
-            try:
-                connection_invitation = connection_invitation_accept(connection_id)
-                if connection_invitation:
-                    LOGGER.info(
-                        f"webhook: processing: connection accepted - connection_id: {connection_id}"
-                    )
-
-                    try:
-                        CredentialOffer.objects.get(connection_id=connection_id)
-
-                        time.sleep(5)
-                        credential_offer_create(connection_id, connection_invitation)
-                    except CredentialOffer.DoesNotExist:
-                        LOGGER.info(
-                            f"webhook: credential_offer not created yet for connection_id:"
-                            f" {connection_id}"
-                        )
-                else:
-                    LOGGER.error(
-                        f"webhook: connection_invitation_accept: connection_id: "
-                        f"{connection_id} not found"
-                    )
-            except Exception as e:
-                LOGGER.error(
-                    f"webhook: connection_accepted: connection_id: {connection_id} - error: {e}"
-                )
-
-        elif topic == "issue_credential" and state == "credential_issued":
-            connection_id = message.get("connection_id")
-            try:
-                accepted_credential_offer = credential_offer_accept(connection_id)
-                if accepted_credential_offer:
-                    LOGGER.info(
-                        f"webhook: processing: credential accepted - connection_id: {connection_id}"
-                    )
-
-                else:
-                    LOGGER.error(
-                        f"webhook: credential_offer_accept: connection_id: "
-                        f"{connection_id} not found"
-                    )
-
-            except Exception as e:
-                LOGGER.error(
-                    f"webhook: issue_credential: connection_id: {connection_id} - error: {e}"
-                )
-        else:
-            LOGGER.info(f"webhook: topic: {topic} and state: {state} is invalid")
+    if _sampled():
+        LOGGER.info(
+            f"webhook: received: topic: '{topic}' - state: '{state}' - {_digest(request.body)}"
+        )
+    return message
 
-    except Exception as e:
-        LOGGER.info(f"webhook: {topic} : bad request: '{request.body}' - {e}")
+
+@csrf_exempt
+def webhooks(request, api_key, topic):
+    rejected = _reject_webhook(request, api_key, topic)
+    if rejected is not None:
+        return rejected
+
+    message = _webhook_message(request, topic)
+    if message is not None:
+        webhook_handlers.dispatch(topic, [message])
 
     return HttpResponse()
+
+
+def _batch_events(body: bytes) -> [dict]:
+    events = json.loads(body)
+    if not isinstance(events, list):
+        raise ValueError("expected a list of events")
+    if len(events) > settings.WEBHOOKS_BATCH_MAX_EVENTS:
+        raise ValueError(f"more than {settings.WEBHOOKS_BATCH_MAX_EVENTS} events")
+    for event in events:
+        if not (
+            isinstance(event, dict)
+            and isinstance(event.get("topic"), str)
+            and isinstance(event.get("payload"), dict)
+        ):
+            raise ValueError("each event needs a topic and a payload object")
+    return events
+
+
+@csrf_exempt
+def webhooks_batch(request, api_key):
+    """
+    Webhook events delivered together, as ``[{"topic": ..., "payload": {...}}, ...]``: they
+    are applied in one transaction, by topic and state (see ``manager.webhook_handlers``).
+    A malformed batch is answered with a 400 and nothing of it is applied.
+    """
+    rejected = _reject_webhook(request, api_key, "batch")
+    if rejected is not None:
+        return rejected
+
+    try:
+        events = _batch_events(request.body)
+    except Exception as e:
+        WEBHOOKS_REJECTED.inc(reason="bad_request")
+        LOGGER.info(f"webhook: batch : bad request: {_digest(request.body)} - {e}")
+        return JsonResponse({"detail": f"Invalid batch: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+    if _sampled():
+        LOGGER.info(f"webhook: received: batch of {len(events)} - {_digest(request.body)}")
+
+    webhook_handlers.dispatch_batch(events)
+
+    return JsonResponse({"events": len(events)})
@@ -0,0 +1,279 @@
+"""
+Handlers of the ACA-Py webhooks, registered by topic and state:
+
+    @handler("issuer_cred_rev", "revoked")
+    def credential_revoked(messages: [dict]):
+        ...
+
+A handler gets every message of its topic and state in a delivery and writes them in bulk:
+one for a webhook request, many for a batch. A handler registered without states gets the
+states that no other handler of the topic has. Messages nobody handles are logged as invalid.
+
+A handler registered with ``batch=True`` takes over the batch deliveries of its states
+(``dispatch_batch``). These run in one transaction, each handler in a savepoint of its own,
+so a handler doing work per message (or outside the database) needs such a variant.
+
+Each handler is timed and counted apart on ``/metrics``
+(``webhook_messages_total{handler,outcome}``, ``webhook_handler_seconds{handler}``).
+"""
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Optional, Tuple
+
+import structlog as logging
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+
+from id_manager import metrics
+from manager import outbox
+from manager.credential_workflow import (
+    bulk_accept,
+    connection_invitation_accept,
+    credential_offer_accept,
+    credential_offer_create,
+)
+from manager.models import ConnectionInvitation, CredentialOffer, CredentialRequest
+from manager.proof_workflow import proof_request_verified
+from manager.reconciliation import reconcile_records
+
+LOGGER = logging.getLogger(__name__)
+
+# (topic, state) -> handler; state None: any other state of the topic
+HANDLERS: Dict[Tuple[str, Optional[str]], Callable] = {}
+# the same, for the batch deliveries handled differently
+BATCH_HANDLERS: Dict[Tuple[str, Optional[str]], Callable] = {}
+
+MESSAGES = metrics.counter(
+    "webhook_messages_total", "Webhook messages by handler", ("handler", "outcome")
+)
+HANDLER_SECONDS = metrics.timer(
+    "webhook_handler_seconds", "Time spent in the webhook handlers", ("handler",)
+)
+
+
+def handler(topic: str, *states: str, batch: bool = False):
+    """Register the decorated function for the messages of ``topic`` in ``states``."""
+    registry = BATCH_HANDLERS if batch else HANDLERS
+
+    def register(function):
+        for state in states or (None,):
+            if (topic, state) in registry:
+                raise ValueError(f"webhook: {topic} - {state} is already handled")
+            registry[(topic, state)] = function
+        return function
+
+    return register
+
+
+def ignore(topic: str, *states: str):
+    """Accept the messages of ``topic`` in ``states`` without doing anything."""
+    handler(topic, *states)(ignored)
+
+
+def ignored(messages: [dict]):
+    pass
+
+
+def find_handler(topic: str, state: Optional[str], batch: bool = False) -> Optional[Callable]:
+    if batch:
+        function = BATCH_HANDLERS.get((topic, state)) or BATCH_HANDLERS.get((topic, None))
+        if function is not None:
+            return function
+    return HANDLERS.get((topic, state)) or HANDLERS.get((topic, None))
+
+
+def dispatch(topic: str, messages: [dict], batch: bool = False):
+    """Hand ``messages`` of ``topic`` to their handlers, by state."""
+    by_state = defaultdict(list)
+    for message in messages:
+        by_state[message.get("state")].append(message)
+
+    for state, state_messages in by_state.items():
+        function = find_handler(topic, state, batch)
+        if function is None:
+            LOGGER.info(f"webhook: topic: {topic} and state: {state} is invalid")
+            MESSAGES.inc(len(state_messages), handler="none", outcome="invalid")
+            continue
+        name = function.__name__
+        start = time.perf_counter()
+        try:
+            if batch:
+                # a failing handler must not leave the transaction of the batch unusable
+                with transaction.atomic():
+                    function(state_messages)
+            else:
+                function(state_messages)
+            outcome = "ok"
+        except Exception as e:
+            LOGGER.error(f"webhook: {name}: topic: {topic} - state: {state} - error: {e}")
+            outcome = "error"
+        HANDLER_SECONDS.observe(time.perf_counter() - start, handler=name)
+        MESSAGES.inc(len(state_messages), handler=name, outcome=outcome)
+
+
+@transaction.atomic
+def dispatch_batch(events: [dict]):
+    """Hand the ``{"topic": ..., "payload": {...}}`` events to their handlers, by topic."""
+    by_topic = defaultdict(list)
+    for event in events:
+        by_topic[event["topic"]].append(event["payload"])
+    for topic, messages in by_topic.items():
+        dispatch(topic, messages, batch=True)
+
+
+@handler("connections", "response")
+def connection_accepted(messages: [dict]):
+    for message in messages:
+        connection_id = message.get("connection_id")
+        try:
+            connection_invitation = connection_invitation_accept(connection_id)
+            if connection_invitation:
+                LOGGER.info(
+                    f"webhook: processing: connection accepted - connection_id: {connection_id}"
+                )
+
+                try:
+                    CredentialOffer.objects.get(connection_id=connection_id)
+
+                    time.sleep(settings.WEBHOOKS_OFFER_DELAY)
+                    credential_offer_create(connection_id, connection_invitation)
+                except CredentialOffer.DoesNotExist:
+                    LOGGER.info(
+                        f"webhook: credential_offer not created yet for connection_id:"
+                        f" {connection_id}"
+                    )
+            else:
+                LOGGER.error(
+                    f"webhook: connection_invitation_accept: connection_id: "
+                    f"{connection_id} not found"
+                )
+        except Exception as e:
+            LOGGER.error(
+                f"webhook: connection_accepted: connection_id: {connection_id} - error: {e}"
+            )
+
+
+@handler("connections", "response", batch=True)
+def connections_accepted(messages: [dict]):
+    """
+    The connections accepted in a batch. The offers to send once they are (see
+    ``connection_accepted``) are queued for ``dispatch_outbox``.
+    """
+    connection_ids = {message.get("connection_id") for message in messages} - {None}
+    accepted = bulk_accept(ConnectionInvitation, connection_ids)
+    offered = CredentialOffer.objects.filter(connection_id__in=connection_ids).values(
+        "connection_id"
+    )
+    invitations = (
+        ConnectionInvitation.objects.filter(connection_id__in=offered)
+        .order_by("connection_id", "-created")
+        .values_list("connection_id", "id", "credential_request_id")
+    )
+    latest = {}
+    for connection_id, invitation_id, credential_request_id in invitations:
+        latest.setdefault(connection_id, (invitation_id, credential_request_id))
+    # sent again, as connection_accepted does: the offers sent so far do not count
+    last_offers = dict(
+        CredentialOffer.objects.filter(
+            credential_request_id__in=[request_id for _, request_id in latest.values()]
+        )
+        .values("credential_request_id")
+        .annotate(last=Max("id"))
+        .values_list("credential_request_id", "last")
+    )
+    outbox.enqueue_later(
+        "send_credential_offer",
+        [
+            {
+                "connection_invitation": invitation_id,
+                "resend_after": last_offers.get(credential_request_id, 0),
+            }
+            for invitation_id, credential_request_id in latest.values()
+        ],
+        delay=settings.WEBHOOKS_OFFER_DELAY,
+    )
+    LOGGER.info(
+        f"webhook: processing: {accepted} connection(s) accepted - "
+        f"{len(latest)} credential offer(s) queued"
+    )
+
+
+@handler("issue_credential", "credential_issued")
+def credential_issued(messages: [dict]):
+    for message in messages:
+        connection_id = message.get("connection_id")
+        try:
+            if credential_offer_accept(connection_id):
+                LOGGER.info(
+                    f"webhook: processing: credential accepted - connection_id: {connection_id}"
+                )
+            else:
+                LOGGER.error(
+                    f"webhook: credential_offer_accept: connection_id: {connection_id} not found"
+                )
+        except Exception as e:
+            LOGGER.error(f"webhook: issue_credential: connection_id: {connection_id} - error: {e}")
+    reconcile_records(messages)
+
+
+@handler("issue_credential", "credential_issued", batch=True)
+def credentials_issued(messages: [dict]):
+    cred_ex_ids = {message.get("credential_exchange_id") for message in messages} - {None}
+    accepted = bulk_accept(CredentialOffer, cred_ex_ids, field="cred_ex_id")
+    reconcile_records(messages)
+    LOGGER.info(f"webhook: processing: {accepted} credential(s) accepted")
+
+
+@handler("present_proof", "verified")
+def presentation_verified(messages: [dict]):
+    for message in messages:
+        presentation_exchange_id = message.get("presentation_exchange_id")
+        try:
+            proof_request_verified(message)
+            LOGGER.info(
+                f"webhook: processing: presentation verified - presentation_exchange_id: "
+                f"{presentation_exchange_id} - verified: {message.get('verified')}"
+            )
+        except Exception as e:
+            LOGGER.error(
+                f"webhook: present_proof: presentation_exchange_id: "
+                f"{presentation_exchange_id} - error: {e}"
+            )
+
+
+@handler("issuer_cred_rev", "revoked")
+def credential_revoked(messages: [dict]):
+    """Revocations made in ACA-Py directly (not through the API), in one UPDATE."""
+    cred_ex_ids = {message.get("cred_ex_id") for message in messages} - {None}
+    revoked = CredentialRequest.objects.filter(
+        credential_offers__cred_ex_id__in=cred_ex_ids
+    ).advance_status(CredentialRequest.Status.REVOKED, revoked_credential=True)
+    LOGGER.info(f"webhook: processing: credentials revoked - {revoked} credential request(s)")
+
+
+@handler("revocation_registry")
+def revocation_registry_changed(messages: [dict]):
+    for message in messages:
+        if message.get("state") == "full":
+            LOGGER.warning(
+                f"webhook: revocation registry full - revoc_reg_id: {message.get('revoc_reg_id')}"
+            )
+
+
+@handler("basicmessages", "received")
+def basic_message_received(messages: [dict]):
+    for message in messages:
+        LOGGER.info(
+            f"webhook: basic message received - connection_id: {message.get('connection_id')} "
+            f"- message_id: {message.get('message_id')}"
+        )
+
+
+# Progress reports of the exchanges handled above: the outcome is all we need.
+# issuer_cred_rev "issued" comes with each credential issued with revocation support.
+ignore("connections", "invitation", "request", "active", "completed")
+ignore("issue_credential", "offer_sent", "request_received", "credential_acked")
+ignore("issuer_cred_rev", "issued")
+ignore("present_proof", "request_sent", "presentation_received", "presentation_acked")
+ignore("out_of_band")
@@ -5,9 +5,19 @@ if [ "$DEBUG" == "True" ]; then
 fi
 python3 manage.py migrate
 python3 manage.py collectstatic --no-input
+python3 manage.py generate_openapi_schema
 
 if [ "$DEBUG" == "True" ]; then
     python manage.py runserver 0.0.0.0:8082
+elif [ "$ASGI" == "True" ]; then
+    gunicorn id_manager.asgi:application \
+  --worker-class uvicorn.workers.UvicornWorker \
+  --workers "${WEB_CONCURRENCY:-4}" \
+  --bind 0.0.0.0:8082 \
+  --keep-alive 75 \
+  --graceful-timeout 30 \
+  --log-level info \
+  --access-logfile -
 else
    mod_wsgi-express start-server id_manager/wsgi.py \
   --port 8082 \